@@ -0,0 +1,40 @@
+from pyrevit import forms, revit, script
+
+
+doc = revit.doc
+
+try:
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
+except Exception as ex:
+    forms.alert(
+        "State module not found in lib folder.\n\n{}".format(ex),
+        exitscript=True,
+    )
+
+cube = rubiks_state.ensure_state(doc, require_initialized=True)["cube"]
+
+notation = forms.ask_for_string(
+    prompt="Moves to apply, e.g. R U R' U' (face turns U/D/L/R/F/B with ' or 2).",
+    title="Apply Algorithm",
+)
+if not notation or not notation.strip():
+    script.exit()
+
+try:
+    moves = rubiks_state.parse_moves(notation)
+except Exception as ex:
+    forms.alert("{}".format(ex), title="Apply Algorithm", exitscript=True)
+
+with rubiks_trace.command("Apply Algorithm"):
+    try:
+        # Each cubie is placed once by its net rotation, whatever the sequence length.
+        with rubiks_trace.TimedTransaction(revit.Transaction("Apply Algorithm")):
+            rubiks_state.apply_moves(doc, moves, cube=cube)
+    except Exception as ex:
+        forms.alert(
+            "Apply Algorithm failed.\n\n{}".format(ex),
+            exitscript=True,
+        )
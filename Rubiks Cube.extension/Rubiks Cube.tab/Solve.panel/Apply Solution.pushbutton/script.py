@@ -0,0 +1,51 @@
+from pyrevit import forms, revit
+
+
+doc = revit.doc
+
+try:
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
+    import rubiks_solve_job
+except Exception as ex:
+    forms.alert(
+        "State module not found in lib folder.\n\n{}".format(ex),
+        exitscript=True,
+    )
+
+# Searching here would wait for the background solve and freeze Revit.
+if rubiks_solve_job.solve_running():
+    forms.alert(rubiks_solve_job.BUSY_MESSAGE, title="Apply Solution", exitscript=True)
+
+with rubiks_trace.command("Apply Solution"):
+    try:
+        # Ensure preconditions before attempting a solve.
+        cube = rubiks_state.ensure_state(doc, require_initialized=True)["cube"]
+        solution = rubiks_state.solve_current(doc, cube=cube)
+    except Exception as ex:
+        forms.alert(
+            "Solver failed.\n\n{}\n\n"
+            "Check Mark values and that moves were performed using these pyRevit buttons.".format(ex),
+            exitscript=True,
+        )
+
+    if not solution:
+        forms.alert("Cube is already solved.", title="Apply Solution", exitscript=True)
+
+    try:
+        # Whole solution is one undo step; geometry and state change in one transaction.
+        with revit.TransactionGroup("Apply Solution"):
+            with rubiks_trace.TimedTransaction(revit.Transaction("Apply Solution Moves")):
+                rubiks_state.apply_moves(doc, rubiks_state.parse_moves(solution), cube=cube)
+    except Exception as ex:
+        forms.alert(
+            "Apply Solution failed.\n\n{}".format(ex),
+            exitscript=True,
+        )
+
+forms.alert(
+    "Applied {} moves:\n\n{}".format(len(solution.split()), solution),
+    title="Apply Solution",
+)
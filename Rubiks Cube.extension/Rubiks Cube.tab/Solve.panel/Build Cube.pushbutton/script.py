@@ -0,0 +1,56 @@
+from pyrevit import forms, revit, script
+
+
+doc = revit.doc
+
+try:
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
+    import rubiks_build
+    from Autodesk.Revit.DB import XYZ
+except Exception as ex:
+    forms.alert(
+        "State module not found in lib folder.\n\n{}".format(ex),
+        exitscript=True,
+    )
+
+name = forms.ask_for_string(
+    default=rubiks_build.free_name(rubiks_state, doc),
+    prompt="Name of the new cube. Leave empty for the project's only cube.",
+    title="Build Cube",
+)
+if name is None:
+    script.exit()
+name = name.strip()
+
+size = rubiks_state.CUBIE_SIZE_FT
+origin = rubiks_build.free_placement(rubiks_state, doc, size)
+placement = forms.ask_for_string(
+    default="{:g}, {:g}, {:g}, {:g}".format(origin.X, origin.Y, origin.Z, size),
+    prompt="Center X, Y, Z and cubie size, in feet.",
+    title="Build Cube",
+)
+if placement is None:
+    script.exit()
+try:
+    x, y, z, size = [float(value) for value in placement.replace(",", " ").split()]
+except ValueError:
+    forms.alert(
+        "Enter four numbers: center X, Y, Z and cubie size.",
+        exitscript=True,
+    )
+
+with rubiks_trace.command("Build Cube"):
+    try:
+        # All cubies, materials and stored state in one undo-aware transaction.
+        with rubiks_trace.TimedTransaction(revit.Transaction("Build Rubik Cube")):
+            cube = rubiks_build.build_cube(rubiks_state, doc, XYZ(x, y, z), size, name)
+    except Exception as ex:
+        forms.alert(
+            "Build Cube failed.\n\n{}".format(ex),
+            exitscript=True,
+        )
+
+forms.alert("Built cube '{}' with 26 cubies, solved and ready.".format(rubiks_state.cube_name(cube)))
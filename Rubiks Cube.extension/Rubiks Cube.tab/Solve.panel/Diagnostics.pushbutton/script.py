@@ -0,0 +1,36 @@
+import os
+
+from pyrevit import forms, script
+
+
+try:
+    import rubiks_trace
+except Exception as ex:
+    forms.alert(
+        "Timing module not found in lib folder.\n\n{}".format(ex),
+        exitscript=True,
+    )
+
+# Percentiles of every logged command and phase, then the on/off switch.
+output = script.get_output()
+records = rubiks_trace.read_records()
+if records:
+    output.print_md("## Command timings")
+    output.print_md("{} spans logged in {}".format(len(records), rubiks_trace.log_dir()))
+    output.print_md("\n".join(rubiks_trace.format_markdown(rubiks_trace.summarize(records))))
+else:
+    output.print_md("No timings logged in {}.".format(rubiks_trace.log_dir()))
+
+enabled = rubiks_trace.is_enabled()
+if os.environ.get(rubiks_trace.ENV_FLAG) == "1":
+    forms.alert(
+        "Timing is on through the {} environment variable.".format(rubiks_trace.ENV_FLAG),
+        title="Diagnostics",
+    )
+elif forms.alert(
+    "Timing is {}. Turn it {}?".format("on" if enabled else "off", "off" if enabled else "on"),
+    title="Diagnostics",
+    yes=True,
+    no=True,
+):
+    rubiks_trace.set_enabled(not enabled)
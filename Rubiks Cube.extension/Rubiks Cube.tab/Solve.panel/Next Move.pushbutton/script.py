@@ -0,0 +1,50 @@
+from pyrevit import forms, revit
+
+
+doc = revit.doc
+
+try:
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
+    import rubiks_solve_job
+except Exception as ex:
+    forms.alert(
+        "State module not found in lib folder.\n\n{}".format(ex),
+        exitscript=True,
+    )
+
+# Searching here would wait for the background solve and freeze Revit.
+if rubiks_solve_job.solve_running():
+    forms.alert(rubiks_solve_job.BUSY_MESSAGE, title="Next Move", exitscript=True)
+
+with rubiks_trace.command("Next Move"):
+    state = rubiks_state.ensure_state(doc, require_initialized=True)
+    if state["coords"] == rubiks_state.SOLVED_COORDS:
+        forms.alert("Cube is already solved.", title="Next Move", exitscript=True)
+
+    try:
+        # Searches only when the cube left the stored solution.
+        plan = rubiks_state.solution_plan(doc, state)
+    except Exception as ex:
+        forms.alert(
+            "Solver failed.\n\n{}\n\n"
+            "Check Mark values and that moves were performed using these pyRevit buttons.".format(ex),
+            exitscript=True,
+        )
+
+    try:
+        with rubiks_trace.TimedTransaction(revit.Transaction("Next Move")):
+            move = rubiks_state.advance_solution(doc, plan)
+    except Exception as ex:
+        forms.alert(
+            "Next Move failed.\n\n{}".format(ex),
+            exitscript=True,
+        )
+
+if plan["cursor"] == len(plan["moves"]):
+    forms.alert(
+        "Solved. Last move: {}\n\nThe solution took {} moves.".format(move, len(plan["moves"])),
+        title="Next Move",
+    )
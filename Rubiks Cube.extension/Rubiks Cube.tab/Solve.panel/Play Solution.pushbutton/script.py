@@ -0,0 +1,47 @@
+from pyrevit import forms, revit
+
+
+doc = revit.doc
+
+try:
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
+    import rubiks_solve_job
+    import rubiks_playback
+except Exception as ex:
+    forms.alert(
+        "State module not found in lib folder.\n\n{}".format(ex),
+        exitscript=True,
+    )
+
+# Searching here would wait for the background solve and freeze Revit.
+if rubiks_solve_job.solve_running():
+    forms.alert(rubiks_solve_job.BUSY_MESSAGE, title="Play Solution", exitscript=True)
+
+with rubiks_trace.command("Play Solution"):
+    try:
+        # Ensure preconditions before attempting a solve.
+        cube = rubiks_state.ensure_state(doc, require_initialized=True)["cube"]
+        solution = rubiks_state.solve_current(doc, cube=cube)
+    except Exception as ex:
+        forms.alert(
+            "Solver failed.\n\n{}\n\n"
+            "Check Mark values and that moves were performed using these pyRevit buttons.".format(ex),
+            exitscript=True,
+        )
+
+    if not solution:
+        forms.alert("Cube is already solved.", title="Play Solution", exitscript=True)
+
+    try:
+        # Every frame is its own transaction so the view can redraw; the group
+        # folds them into one undo step.
+        with revit.TransactionGroup("Play Solution"):
+            rubiks_playback.play_moves(rubiks_state, doc, revit.uidoc, rubiks_state.parse_moves(solution), cube=cube)
+    except Exception as ex:
+        forms.alert(
+            "Play Solution failed.\n\n{}".format(ex),
+            exitscript=True,
+        )
@@ -0,0 +1,33 @@
+from pyrevit import forms, revit
+
+
+doc = revit.doc
+
+try:
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
+except Exception as ex:
+    forms.alert(
+        "State module not found in lib folder.\n\n{}".format(ex),
+        exitscript=True,
+    )
+
+with rubiks_trace.command("Resync"):
+    cube = rubiks_state.ensure_state(doc, require_initialized=True)["cube"]
+
+    try:
+        # Adopt the cube as modeled, e.g. after cubies were moved outside these buttons.
+        with rubiks_trace.TimedTransaction(revit.Transaction("Resync Rubik Solver State")):
+            changed = rubiks_state.resync_state(doc, cube=cube)
+    except Exception as ex:
+        forms.alert(
+            "Resync failed.\n\n{}".format(ex),
+            exitscript=True,
+        )
+
+if changed:
+    forms.alert("Solver state updated from the cube geometry.", title="Resync")
+else:
+    forms.alert("Solver state already matched the cube geometry.", title="Resync")
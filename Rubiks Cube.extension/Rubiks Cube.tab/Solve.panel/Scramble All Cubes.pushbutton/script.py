@@ -0,0 +1,40 @@
+from pyrevit import forms, revit
+
+
+doc = revit.doc
+
+try:
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
+except Exception as ex:
+    forms.alert(
+        "State module not found in lib folder.\n\n{}".format(ex),
+        exitscript=True,
+    )
+
+with rubiks_trace.command("Scramble All Cubes"):
+    ready, problems = rubiks_state.cube_states(doc)
+    if not ready:
+        forms.alert(
+            "No cube is ready to scramble. Click 'Initialize' first.\n\n{}".format("\n".join(problems)),
+            title="Scramble All Cubes",
+            exitscript=True,
+        )
+
+    try:
+        # Every cube in one transaction, so a single Undo restores them all.
+        with rubiks_trace.TimedTransaction(revit.Transaction("Scramble All Cubes")):
+            for cube, _ in ready:
+                rubiks_state.apply_moves(doc, rubiks_state.scramble_moves(), cube=cube)
+    except Exception as ex:
+        forms.alert(
+            "Scramble All Cubes failed.\n\n{}".format(ex),
+            exitscript=True,
+        )
+
+message = "Scrambled {} cube(s) with {} random moves each.".format(len(ready), rubiks_state.SCRAMBLE_LENGTH)
+if problems:
+    message += "\n\nSkipped:\n{}".format("\n".join(problems))
+forms.alert(message, title="Scramble All Cubes")
@@ -0,0 +1,30 @@
+from pyrevit import forms, revit
+
+
+doc = revit.doc
+
+try:
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
+except Exception as ex:
+    forms.alert(
+        "State module not found in lib folder.\n\n{}".format(ex),
+        exitscript=True,
+    )
+
+with rubiks_trace.command("Snap to Grid"):
+    cube = rubiks_state.ensure_state(doc, require_initialized=True)["cube"]
+
+    try:
+        # Re-place every cubie exactly on its tracked slot to clear accumulated drift.
+        with rubiks_trace.TimedTransaction(revit.Transaction("Snap Cubies to Grid")):
+            corrected = rubiks_state.snap_placement(doc, cube=cube)
+    except Exception as ex:
+        forms.alert(
+            "Snap to Grid failed.\n\n{}".format(ex),
+            exitscript=True,
+        )
+
+forms.alert("Snapped {} of 26 cubies to their exact slot placement.".format(corrected), title="Snap to Grid")
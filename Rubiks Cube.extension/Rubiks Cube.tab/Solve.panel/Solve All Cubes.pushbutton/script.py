@@ -0,0 +1,57 @@
+from pyrevit import forms, revit
+
+
+doc = revit.doc
+
+try:
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
+    import rubiks_solve_job
+except Exception as ex:
+    forms.alert(
+        "State module not found in lib folder.\n\n{}".format(ex),
+        exitscript=True,
+    )
+
+# Searching here would wait for the background solve and freeze Revit.
+if rubiks_solve_job.solve_running():
+    forms.alert(rubiks_solve_job.BUSY_MESSAGE, title="Solve All Cubes", exitscript=True)
+
+with rubiks_trace.command("Solve All Cubes"):
+    ready, problems = rubiks_state.cube_states(doc)
+
+    # Solve every cube first; the searches run outside the transaction.
+    solutions = []
+    for cube, state in ready:
+        if state["coords"] == rubiks_state.SOLVED_COORDS:
+            continue
+        try:
+            solutions.append((cube, rubiks_state.parse_moves(rubiks_state.solve_current(doc, cube=cube))))
+        except Exception as ex:
+            problems.append("{}: {}".format(rubiks_state.cube_name(cube), ex))
+
+    if not solutions:
+        message = "All cubes are already solved." if ready else "No cube is ready to solve. Click 'Initialize' first."
+        if problems:
+            message += "\n\nSkipped:\n{}".format("\n".join(problems))
+        forms.alert(message, title="Solve All Cubes", exitscript=True)
+
+    try:
+        # Every solution in one transaction, so a single Undo takes them all back.
+        with rubiks_trace.TimedTransaction(revit.Transaction("Solve All Cubes")):
+            for cube, moves in solutions:
+                rubiks_state.apply_moves(doc, moves, cube=cube)
+    except Exception as ex:
+        forms.alert(
+            "Solve All Cubes failed.\n\n{}".format(ex),
+            exitscript=True,
+        )
+
+message = "Solved {} cube(s) with {} moves in total.".format(
+    len(solutions), sum(len(moves) for _, moves in solutions)
+)
+if problems:
+    message += "\n\nSkipped:\n{}".format("\n".join(problems))
+forms.alert(message, title="Solve All Cubes")
@@ -1,40 +1,93 @@
-import os
-import sys
-
-from pyrevit import forms, revit
+from pyrevit import forms, revit, script
 
 
 doc = revit.doc
 
-# Load extension-local helper module and bundled solver dependencies.
-this_dir = os.path.dirname(__file__)
-ext_dir = os.path.abspath(os.path.join(this_dir, "..", "..", ".."))
-lib_dir = os.path.join(ext_dir, "lib")
-if os.path.isdir(lib_dir) and lib_dir not in sys.path:
-    sys.path.insert(0, lib_dir)
-
 try:
-    import rubiks_state
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
+    import rubiks_solve_job
 except Exception as ex:
     forms.alert(
         "State module not found in lib folder.\n\n{}".format(ex),
         exitscript=True,
     )
 
-try:
-    # Ensure preconditions before attempting a solve.
-    rubiks_state.ensure_state(doc, require_initialized=True)
-    # Compute move notation from the currently tracked cube state.
-    solution = rubiks_state.solve_current(doc)
-except Exception as ex:
+# A second click while a solve is running cancels it.
+job = rubiks_solve_job.current_job()
+if job is not None and job.running:
+    job.cancel()
     forms.alert(
-        "Solver failed.\n\n{}\n\n"
-        "Check Mark values and that moves were performed using these pyRevit buttons.".format(ex),
+        "Cancelling the running solve. The best solution found so far will be shown.",
+        title="Rubik Solution",
         exitscript=True,
     )
 
-forms.alert(
-    "Solution:\n\n{}\n\n"
-    "Copy this move sequence for execution.".format(solution if solution else "(already solved)"),
-    title="Rubik Solution",
+with rubiks_trace.command("Solve Cube"):
+    try:
+        # Ensure preconditions before attempting a solve.
+        state = rubiks_state.ensure_state(doc, require_initialized=True)
+    except Exception as ex:
+        forms.alert(
+            "Solver failed.\n\n{}\n\n"
+            "Check Mark values and that moves were performed using these pyRevit buttons.".format(ex),
+            exitscript=True,
+        )
+
+    if state["coords"] == rubiks_state.SOLVED_COORDS:
+        forms.alert("Solution:\n\n(already solved)", title="Rubik Solution", exitscript=True)
+
+    # A solution computed earlier for this exact cube is shown without searching.
+    cached = rubiks_state.cached_solution(doc, state)
+    if cached:
+        forms.alert(
+            "Solution:\n\n{}\n\n"
+            "Copy this move sequence for execution.".format(" ".join(cached)),
+            title="Rubik Solution",
+            exitscript=True,
+        )
+
+output = script.get_output()
+
+
+def show_progress(info):
+    # Runs on the UI thread through the ExternalEvent.
+    best = info["best_length"]
+    output.print_md(
+        "Phase 1 depth {}, best solution {}, {:.1f} s".format(
+            info["phase1_depth"],
+            "{} moves".format(best) if best is not None else "not found yet",
+            info["elapsed"],
+        )
+    )
+
+
+def show_result(job):
+    if job.error is not None:
+        forms.alert(
+            "Solver failed.\n\n{}\n\n"
+            "Check Mark values and that moves were performed using these pyRevit buttons.".format(job.error),
+        )
+    elif not job.best:
+        forms.alert("Solve cancelled before a solution was found.", title="Rubik Solution")
+    else:
+        rubiks_state.remember_solution(job.coords, job.best)
+        forms.alert(
+            "Solution:\n\n{}\n\n"
+            "Copy this move sequence for execution.".format(job.solution()),
+            title="Rubik Solution",
+        )
+
+
+# Search runs on a worker thread; Revit stays responsive meanwhile.
+rubiks_solve_job.start_solve(
+    rubiks_state,
+    state["coords"],
+    rubiks_solve_job.ExternalEventDispatcher(),
+    on_progress=show_progress,
+    on_done=show_result,
+    seed=rubiks_state.history_solution(doc, state),
 )
+output.print_md("Solving in the background. Click Solve Cube again to cancel.")
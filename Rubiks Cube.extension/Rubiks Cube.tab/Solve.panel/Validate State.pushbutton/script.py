@@ -1,27 +1,29 @@
-import os
-import sys
-
 from pyrevit import forms, revit
 
 
 doc = revit.doc
 
-# Load extension-local helper module.
-this_dir = os.path.dirname(__file__)
-ext_dir = os.path.abspath(os.path.join(this_dir, "..", "..", ".."))
-lib_dir = os.path.join(ext_dir, "lib")
-if os.path.isdir(lib_dir) and lib_dir not in sys.path:
-    sys.path.insert(0, lib_dir)
-
 try:
-    import rubiks_state
+    from rubiks_engine import warm_state
+
+    rubiks_state = warm_state()
+    import rubiks_trace
 except Exception as ex:
     forms.alert(
         "State module not found in lib folder.\n\n{}".format(ex),
         exitscript=True,
     )
 
-# Run structural + saved-state checks and show a readable report.
-ok, report = rubiks_state.validate_state(doc)
+# Run structural + saved-state checks and show a readable report, per cube.
+with rubiks_trace.command("Validate State"):
+    cubes = rubiks_state.list_cubes(doc)
+    if len(cubes) > 1:
+        ok, report = True, []
+        for cube in cubes:
+            cube_ok, lines = rubiks_state.validate_state(doc, cube=cube)
+            ok = ok and cube_ok
+            report.extend(lines + [""])
+    else:
+        ok, report = rubiks_state.validate_state(doc)
 title = "Validate State - OK" if ok else "Validate State - Issues Found"
 forms.alert("\n".join(report), title=title)
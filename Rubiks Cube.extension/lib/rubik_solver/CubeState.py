@@ -0,0 +1,131 @@
+'''
+Value-type cube for the Beginner and CFOP stage solvers.
+
+The whole cube is a flat list of the 54 facelet colours in NaiveCube order,
+so cloning is a list copy and every move, including rotations and slices,
+is a single precomputed permutation. cubies and search_by_colors mirror the
+Cubie.Cube API the stage solvers rely on.
+'''
+from .Cubie import Cube, Sticker
+from .Move import Move
+from .NaiveCube import NaiveCube
+
+_t_key = Cube._t_key
+
+# (sorted cubie key, facing) -> facelet index
+POSITIONS = dict(((_t_key(cubie), face), i) for i, (cubie, face) in enumerate(Cube.CUBE_MAP))
+
+# sorted cubie key -> [(facing, facelet index)]
+CUBIE_FACELETS = {}
+for (_key, _face), _index in sorted(POSITIONS.items(), key=lambda item: item[1]):
+    CUBIE_FACELETS.setdefault(_key, []).append((_face, _index))
+
+# Moves never mutate Stickers, so one shared instance per colour is enough
+STICKERS = dict((colour, Sticker(colour)) for colour in Sticker.COLOURS)
+
+
+def _quarter_turn(face):
+    '''Permutation p such that after the move facelet i holds old facelet p[i]'''
+    permutation = list(range(len(Cube.CUBE_MAP)))
+    for c_origin, c_dest in Cube.MOVES[face]:
+        for origin_facing, dest_facing in zip(c_origin, c_dest):
+            origin = POSITIONS[(_t_key(c_origin), origin_facing)]
+            permutation[POSITIONS[(_t_key(c_dest), dest_facing)]] = origin
+    return permutation
+
+
+def _build_permutations():
+    permutations = {}
+    for face in Cube.MOVES:
+        quarter = _quarter_turn(face)
+        double = [quarter[i] for i in quarter]
+        permutations[face] = quarter
+        permutations[face + '2'] = double
+        permutations[face + "'"] = [quarter[i] for i in double]
+    return permutations
+
+PERMUTATIONS = _build_permutations()
+
+
+class CubieView(object):
+    '''
+    Cubie look-alike for one position. Like the Cubie objects of Cube, it
+    keeps reflecting that position while the state moves
+    '''
+    __slots__ = ('state', 'key')
+
+    def __init__(self, state, key):
+        self.state = state
+        self.key = key
+
+    @property
+    def facings(self):
+        facelets = self.state.facelets
+        return dict((face, STICKERS[facelets[i]]) for face, i in CUBIE_FACELETS[self.key])
+
+    @property
+    def faces(self):
+        return self.facings.keys()
+
+    @property
+    def colors(self):
+        return self.facings.values()
+
+    def color_facing(self, c):
+        for facing, color in self.facings.items():
+            if color == c:
+                return facing
+        return None
+
+
+class CubieMap(object):
+    __slots__ = ('state',)
+
+    def __init__(self, state):
+        self.state = state
+
+    def __getitem__(self, key):
+        return CubieView(self.state, key)
+
+
+class CubeState(object):
+    __slots__ = ('facelets',)
+
+    def __init__(self, configuration=None):
+        if configuration is None:
+            configuration = Cube().to_naive_cube().get_cube()
+        self.facelets = list(configuration)
+
+    @staticmethod
+    def from_cube(cube):
+        return CubeState(cube.to_naive_cube().get_cube())
+
+    def copy(self):
+        state = CubeState.__new__(CubeState)
+        state.facelets = self.facelets[:]
+        return state
+
+    @property
+    def cubies(self):
+        return CubieMap(self)
+
+    def move(self, move):
+        if not isinstance(move, Move):
+            raise ValueError("Move must be an instance of Move")
+        key = move.face + ('2' if move.double else "'" if move.counterclockwise else '')
+        facelets = self.facelets
+        self.facelets = [facelets[i] for i in PERMUTATIONS[key]]
+
+    def search_by_colors(self, *args):
+        args = tuple(sorted(set(map(str.upper, map(str, args)))))
+        facelets = self.facelets
+        for key, positions in CUBIE_FACELETS.items():
+            if len(positions) == len(args):
+                if args == tuple(sorted(facelets[i].upper() for _, i in positions)):
+                    return key
+        return None
+
+    def to_naive_cube(self):
+        nc = NaiveCube()
+        nc.set_cube(''.join(self.facelets))
+        return nc
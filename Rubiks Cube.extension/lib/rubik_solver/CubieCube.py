@@ -191,6 +191,22 @@ class CubieCube(object):
                 if c.co[corn] < 0:
                     c.co[corn] += 3
 
+    def toFaceCube(self):
+        '''Return the facelet representation of the cube'''
+        from .FaceCube import FaceCube
+        fcRet = FaceCube()
+        for c in Corner.reverse_mapping.keys():
+            j = self.cp[c] # cornercubie with index j is at cornerposition with index c
+            ori = self.co[c] # Orientation of this cubie
+            for n in range(3):
+                fcRet.f[FaceCube.cornerFacelet[c][(n + ori) % 3]] = FaceCube.cornerColor[j][n]
+        for e in Edge.reverse_mapping.keys():
+            j = self.ep[e] # edgecubie with index j is at edgeposition with index e
+            ori = self.eo[e] # Orientation of this cubie
+            for n in range(2):
+                fcRet.f[FaceCube.edgeFacelet[e][(n + ori) % 2]] = FaceCube.edgeColor[j][n]
+        return fcRet
+
     def getTwist(self):
         '''return the twist of the 8 corners. 0 <= twist < 3^7'''
         ret = 0
@@ -43,8 +43,6 @@ class NaiveCube(object):
                     self.faces[face].set_colour(i, j, configuration[c])
                     c += 1
 
-        self.set_cube(configuration)
-
     @staticmethod
     def _from_facelet_to_color(configuration):
         return configuration.replace('D', 'w').replace('U', 'y').replace('R', 'g').replace('B', 'o').replace('F', 'r').replace('L', 'b')
@@ -0,0 +1,101 @@
+'''
+Turns solver output into a strictly face-turn sequence (U/D/L/R/F/B).
+
+Whole-cube rotations (X/Y/Z) are removed by relabeling the faces of the
+moves that follow them, slice moves (M/E/S) are rewritten as a pair of
+outer-layer turns plus a rotation, and adjacent moves on the same axis are
+merged or cancelled.
+'''
+from .Move import Move
+
+# Faces that share an axis commute, so they can be merged across each other
+AXIS = {
+    'U': 'UD', 'D': 'UD',
+    'L': 'LR', 'R': 'LR',
+    'F': 'FB', 'B': 'FB',
+}
+
+# Quarter turn of a whole-cube rotation: for each face label, the label
+# whose physical face takes its place afterwards
+ROTATIONS = {
+    'X': {'U': 'F', 'F': 'D', 'D': 'B', 'B': 'U', 'L': 'L', 'R': 'R'},
+    'Y': {'F': 'R', 'R': 'B', 'B': 'L', 'L': 'F', 'U': 'U', 'D': 'D'},
+    'Z': {'U': 'L', 'L': 'D', 'D': 'R', 'R': 'U', 'F': 'F', 'B': 'B'},
+}
+
+# Slice quarter turn as (outer turns, rotation), e.g. M = R L' X'
+SLICES = {
+    'M': ([('R', 1), ('L', 3)], ('X', 3)),
+    'E': ([('U', 1), ('D', 3)], ('Y', 3)),
+    'S': ([('F', 3), ('B', 1)], ('Z', 1)),
+}
+
+SUFFIXES = [None, '', '2', "'"]
+
+
+def _amount(move):
+    '''Number of clockwise quarter turns performed by move'''
+    return 2 if move.double else 3 if move.counterclockwise else 1
+
+
+def _rotate(frame, axis, amount):
+    for _ in range(amount % 4):
+        frame = dict((face, frame[source]) for face, source in ROTATIONS[axis].items())
+    return frame
+
+
+def remove_rotations(moves):
+    '''
+    Returns a list of (face, amount) tuples with every rotation and slice
+    move replaced by outer-layer turns expressed in the original frame
+    '''
+    frame = dict((face, face) for face in 'UDLRFB')
+    turns = []
+    for move in moves:
+        if not isinstance(move, Move):
+            move = Move(move)
+        face, amount = move.face, _amount(move)
+
+        if face in ROTATIONS:
+            frame = _rotate(frame, face, amount)
+        elif face in SLICES:
+            outer, (axis, direction) = SLICES[face]
+            for outer_face, outer_amount in outer:
+                turns.append((frame[outer_face], outer_amount * amount % 4))
+            frame = _rotate(frame, axis, direction * amount)
+        else:
+            turns.append((frame[face], amount))
+    return turns
+
+
+def cancel_moves(turns):
+    '''
+    Merges (face, amount) turns on the same face, looking back across
+    turns of the opposite face on the same axis, and drops the ones that
+    cancel out
+    '''
+    stack = []
+    for face, amount in turns:
+        amount %= 4
+        if amount == 0:
+            continue
+        i = len(stack) - 1
+        while i >= 0 and AXIS[stack[i][0]] == AXIS[face] and stack[i][0] != face:
+            i -= 1
+        if i >= 0 and stack[i][0] == face:
+            amount = (stack[i][1] + amount) % 4
+            if amount:
+                stack[i] = (face, amount)
+            else:
+                del stack[i]
+        else:
+            stack.append((face, amount))
+    return stack
+
+
+def optimize(moves):
+    '''
+    Returns moves as a rotation-free, cancellation-free list of Move
+    instances using only U, D, L, R, F and B turns
+    '''
+    return [Move(face + SUFFIXES[amount]) for face, amount in cancel_moves(remove_rotations(moves))]
@@ -1,5 +1,5 @@
-import copy
 from rubik_solver.Move import Move
+from rubik_solver.CubeState import CubeState
 from .. import Solver
 from . import WhiteCrossSolver
 from . import WhiteFaceSolver
@@ -9,7 +9,8 @@ from . import YellowFaceSolver
 
 class BeginnerSolver(Solver):
     def solution(self):
-        cube = copy.deepcopy(self.cube)
+        # All stages share one value-type state instead of a deep copy
+        cube = CubeState.from_cube(self.cube)
         solution = WhiteCrossSolver.WhiteCrossSolver(cube).solution()
         solution += WhiteFaceSolver.WhiteFaceSolver(cube).solution()
         solution += SecondLayerSolver.SecondLayerSolver(cube).solution()
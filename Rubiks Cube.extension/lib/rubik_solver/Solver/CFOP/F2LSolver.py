@@ -1,4 +1,6 @@
+import time
 from rubik_solver.Move import Move
+from rubik_solver.Optimizer import optimize
 from .. import Solver
 from ..Beginner.WhiteFaceSolver import WhiteFaceSolver
 
@@ -83,58 +85,115 @@ class F2LSolver(Solver):
         self.cube.move(Move(s))
         solution.append(s)
 
-    def solution(self):
+    def solve_pair(self, solution):
+        '''Solves the corner/edge pair that belongs in the FR slot'''
+        front_color = self.cube.cubies['F'].facings['F'].color
+        right_color = self.cube.cubies['R'].facings['R'].color
+
+        corner = self.cube.search_by_colors(front_color, right_color, 'W')
+        step_solution = WhiteFaceSolver.first_step(corner, self.cube.cubies[corner].color_facing('W'))
+        solution.extend(step_solution)
+        for s in step_solution:
+            self.cube.move(Move(s))
+        edge = self.cube.search_by_colors(front_color, right_color)
+
+        # If edge is in BL or BR, WAF!, this case is not expected in any manual
+        if edge == 'BL':
+            self.move("B'", solution)
+            self.move("U'", solution)
+            self.move("B", solution)
+        elif edge == 'BR':
+            self.move("B", solution)
+            self.move("U", solution)
+            self.move("B'", solution)
+        elif edge == 'FL':
+            self.move("L'", solution)
+            self.move("U'", solution)
+            self.move("L", solution)
+
+        corner = self.cube.search_by_colors(front_color, right_color, 'W')
+        #Place corner in FRU if needed
+        if 'U' in corner:
+            while corner != 'FRU':
+                self.move("U", solution)
+                corner = self.cube.search_by_colors(front_color, right_color, 'W')
+
+        edge = self.cube.search_by_colors(front_color, right_color)
+
+        corner_facings = ''.join([
+            self.cube.cubies[corner].color_facing(front_color),
+            self.cube.cubies[corner].color_facing(right_color),
+            self.cube.cubies[corner].color_facing('W')
+        ])
+        edge_facings = ''.join([
+            self.cube.cubies[edge].color_facing(front_color),
+            self.cube.cubies[edge].color_facing(right_color)
+        ])
+
+        step_solution = F2LSolver.get_step(corner_facings, edge_facings)
+        solution.extend(step_solution)
+        for s in step_solution:
+            self.cube.move(Move(s))
+
+    def solution(self, lookahead=False, time_budget=1.0):
+        '''
+        Solves the four pairs in fixed Y order. With lookahead, every pair
+        ordering is tried on cube copies and the one with the fewest face
+        turns found within time_budget seconds is applied
+        '''
+        if lookahead:
+            return self.lookahead_solution(time_budget)
+
         solution = []
         for _ in range(4):
-            front_color = self.cube.cubies['F'].facings['F'].color
-            right_color = self.cube.cubies['R'].facings['R'].color
-
-            corner = self.cube.search_by_colors(front_color, right_color, 'W')
-            step_solution = WhiteFaceSolver.first_step(corner, self.cube.cubies[corner].color_facing('W'))
-            solution.extend(step_solution)
-            for s in step_solution:
-                self.cube.move(Move(s))
-            edge = self.cube.search_by_colors(front_color, right_color)
-
-            # If edge is in BL or BR, WAF!, this case is not expected in any manual
-            if edge == 'BL':
-                self.move("B'", solution)
-                self.move("U'", solution)
-                self.move("B", solution)
-            elif edge == 'BR':
-                self.move("B", solution)
-                self.move("U", solution)
-                self.move("B'", solution)
-            elif edge == 'FL':
-                self.move("L'", solution)
-                self.move("U'", solution)
-                self.move("L", solution)
-
-            corner = self.cube.search_by_colors(front_color, right_color, 'W')
-            #Place corner in FRU if needed
-            if 'U' in corner:
-                while corner != 'FRU':
-                    self.move("U", solution)
-                    corner = self.cube.search_by_colors(front_color, right_color, 'W')
-
-            edge = self.cube.search_by_colors(front_color, right_color)
-
-            corner_facings = ''.join([
-                self.cube.cubies[corner].color_facing(front_color),
-                self.cube.cubies[corner].color_facing(right_color),
-                self.cube.cubies[corner].color_facing('W')
-            ])
-            edge_facings = ''.join([
-                self.cube.cubies[edge].color_facing(front_color),
-                self.cube.cubies[edge].color_facing(right_color)
-            ])
-
-            step_solution = F2LSolver.get_step(corner_facings, edge_facings)
-            solution.extend(step_solution)
-            for s in step_solution:
-                self.cube.move(Move(s))
-
-            self.cube.move(Move("Y"))
-            solution.append("Y")
+            self.solve_pair(solution)
+            self.move("Y", solution)
 
         return solution
+
+    def lookahead_solution(self, time_budget=1.0):
+        self._deadline = time.time() + time_budget
+        # The fixed order is the baseline, an ordering replaces it only when
+        # it optimizes to fewer face turns
+        baseline = F2LSolver(self.cube.copy())
+        fixed = []
+        for _ in range(4):
+            baseline.solve_pair(fixed)
+            baseline.move("Y", fixed)
+        self._best = (len(optimize(fixed)), fixed)
+        # Slots are numbered by the Y turns needed to bring them to FR
+        self._search(self.cube, 0, [0, 1, 2, 3], [])
+
+        _, solution = self._best
+        for s in solution:
+            self.cube.move(Move(s))
+        return solution
+
+    def _search(self, cube, slot, pending, solution):
+        if not pending:
+            cost = len(optimize(solution))
+            if cost < self._best[0]:
+                # Restore the original orientation, like the fixed order does
+                self._best = (cost, solution + ["Y"] * ((4 - slot) % 4))
+            return
+
+        candidates = []
+        for target in pending:
+            child = F2LSolver(cube.copy())
+            step_solution = []
+            for _ in range((target - slot) % 4):
+                child.move("Y", step_solution)
+            child.solve_pair(step_solution)
+            candidates.append((len(optimize(solution + step_solution)), target, child.cube, step_solution))
+
+        # Cheapest pair first, so the first complete ordering is the greedy one.
+        # Pruning on the optimized length of a partial sequence is a heuristic,
+        # not a bound: later moves can cancel into it, so an ordering that
+        # would end shorter may be cut. The fixed-order baseline keeps the
+        # result from getting longer than the plain solution
+        candidates.sort(key=lambda candidate: candidate[0])
+        for cost, target, child_cube, step_solution in candidates:
+            if cost >= self._best[0] or time.time() > self._deadline:
+                break
+            remaining = [p for p in pending if p != target]
+            self._search(child_cube, target, remaining, solution + step_solution)
@@ -1,4 +1,6 @@
 from rubik_solver.Move import Move
+from rubik_solver.CubeState import CubeState
+from rubik_solver.Optimizer import optimize
 from .. import Solver
 
 class OLLSolver(Solver):
@@ -76,18 +78,44 @@ class OLLSolver(Solver):
             cube.cubies['FRU'].color_facing(color)
         ])
 
+    # Pre-AUF turns, indexed by the number of U' turns they undo
+    AUF = [[], ["U"], ["U2"], ["U'"]]
+
+    _table = None
+
+    @staticmethod
+    def get_table():
+        '''
+        Maps the orientation string of every OLL case, under each of the four
+        pre-AUF turns, to its (pre-AUF, algorithm, post-AUF) moves. Built on
+        first use by undoing each rotation-free algorithm on a solved cube
+        '''
+        if OLLSolver._table is None:
+            table = {}
+            cases = [[]] + [[str(m) for m in optimize(steps)] for _, steps in sorted(OLLSolver.STEPS.items())]
+            for algorithm in cases:
+                cube = CubeState()
+                for s in reversed(algorithm):
+                    cube.move(Move(s).reverse())
+                for pre in OLLSolver.AUF:
+                    key = OLLSolver.get_orientations(cube)
+                    if key not in table or len(pre + algorithm) < len(table[key][0] + table[key][1]):
+                        table[key] = (pre, algorithm, [])
+                    cube.move(Move("U'"))
+            OLLSolver._table = table
+        return OLLSolver._table
+
     def move(self, s, solution):
         self.cube.move(Move(s))
         solution.append(s)
 
     def solution(self):
         solution = []
-        for _ in range(4):
-            orientation = OLLSolver.get_orientations(self.cube)
-            if orientation in OLLSolver.STEPS:
-                step_solution = OLLSolver.STEPS[orientation]
-                for s in step_solution:
-                    self.move(s, solution)
-                break
-            self.move("Y", solution)
-        return solution 
+        orientation = OLLSolver.get_orientations(self.cube)
+        try:
+            pre, algorithm, post = OLLSolver.get_table()[orientation]
+        except KeyError:
+            raise ValueError("Unknown OLL case %s" % orientation)
+        for s in pre + algorithm + post:
+            self.move(s, solution)
+        return solution
@@ -1,4 +1,6 @@
 from rubik_solver.Move import Move
+from rubik_solver.CubeState import CubeState
+from rubik_solver.Optimizer import optimize
 from .. import Solver
 
 class PLLSolver(Solver):
@@ -35,6 +37,35 @@ class PLLSolver(Solver):
             orientation.append(str(cubies.index(o)))
         return ''.join(orientation)
 
+    # AUF turns, indexed by the number of U' turns they undo
+    AUF = [[], ["U"], ["U2"], ["U'"]]
+
+    _table = None
+
+    @staticmethod
+    def get_table():
+        '''
+        Maps the permutation string of every PLL case, under each of the four
+        pre-AUF and post-AUF turns, to its (pre-AUF, algorithm, post-AUF)
+        moves. Built on first use by undoing each rotation-free algorithm on
+        a solved cube
+        '''
+        if PLLSolver._table is None:
+            table = {}
+            cases = [[]] + [[str(m) for m in optimize(steps)] for _, steps in sorted(PLLSolver.STEPS.items())]
+            for algorithm in cases:
+                for post in PLLSolver.AUF:
+                    cube = CubeState()
+                    for s in reversed(algorithm + post):
+                        cube.move(Move(s).reverse())
+                    for pre in PLLSolver.AUF:
+                        key = PLLSolver.get_orientations(cube)
+                        if key not in table or len(pre + algorithm + post) < len(sum(table[key], [])):
+                            table[key] = (pre, algorithm, post)
+                        cube.move(Move("U'"))
+            PLLSolver._table = table
+        return PLLSolver._table
+
     def move(self, s, solution):
         self.cube.move(Move(s))
         solution.append(s)
@@ -46,18 +77,11 @@ class PLLSolver(Solver):
 
     def solution(self):
         solution = []
-        while True:
-            for _ in range(4):
-                self.move('U', solution)
-                for _ in range(4):
-                    self.move('Y', solution)
-                    orientation = PLLSolver.get_orientations(self.cube)
-
-                    if orientation in PLLSolver.STEPS:
-                        for s in PLLSolver.STEPS[orientation]:
-                            self.move(s, solution)
-                        return solution
-            # Apply shortest and expect to be solvable after that
-            for s in PLLSolver.STEPS["072543618"]:
-                self.move(s, solution)
-        return []
+        permutation = PLLSolver.get_orientations(self.cube)
+        try:
+            pre, algorithm, post = PLLSolver.get_table()[permutation]
+        except KeyError:
+            raise ValueError("Unknown PLL case %s" % permutation)
+        for s in pre + algorithm + post:
+            self.move(s, solution)
+        return solution
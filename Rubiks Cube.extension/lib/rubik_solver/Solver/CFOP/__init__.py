@@ -1,5 +1,6 @@
-import copy
 from rubik_solver.Move import Move
+from rubik_solver.CubeState import CubeState
+from rubik_solver.Optimizer import optimize
 from .. import Solver
 from ..Beginner import WhiteCrossSolver
 from . import F2LSolver
@@ -7,10 +8,20 @@ from . import OLLSolver
 from . import PLLSolver
 
 class CFOPSolver(Solver):
-    def solution(self):
-        cube = copy.deepcopy(self.cube)
+    def solution(self, lookahead=False, time_budget=1.0):
+        if not lookahead:
+            return self._solve(False, time_budget)
+        # A shorter F2L can leave a costlier OLL/PLL case, so the lookahead
+        # pair order is kept only when the whole solution optimizes shorter
+        fixed = self._solve(False, time_budget)
+        ahead = self._solve(True, time_budget)
+        return ahead if len(optimize(ahead)) < len(optimize(fixed)) else fixed
+
+    def _solve(self, lookahead, time_budget):
+        # All stages share one value-type state instead of a deep copy
+        cube = CubeState.from_cube(self.cube)
         solution = WhiteCrossSolver.WhiteCrossSolver(cube).solution()
-        solution += F2LSolver.F2LSolver(cube).solution()
+        solution += F2LSolver.F2LSolver(cube).solution(lookahead, time_budget)
         solution += OLLSolver.OLLSolver(cube).solution()
         solution += PLLSolver.PLLSolver(cube).solution()
         # Align top layer
@@ -67,7 +67,7 @@ class Search(object):
         return s
 
     @staticmethod
-    def solution(facelets, maxDepth, timeOut, useSeparator=False):
+    def solution(facelets, maxDepth, timeOut, useSeparator=False, progress=None):
         '''
         * Computes the solver string for a given cube.
         *
@@ -86,6 +86,10 @@ class Search(object):
         * @param useSeparator
         *          determines if a " . " separates the phase1 and phase2 parts of the solver string like in F' R B R L2 F .
         *          U2 U D for example.<br>
+        *
+        * @param progress
+        *          optional callable, called with the current phase1 depth whenever the search backtracks; raising
+        *          from it aborts the search, which is how callers cancel it.
         * @return The solution string or an error code:<br>
         *         Error 1: There is not exactly one facelet of each colour<br>
         *         Error 2: Not all 12 edges exist exactly once<br>
@@ -110,6 +114,17 @@ class Search(object):
                 raise DupedEdge("Not all 12 edges exist exactly once")
 
         cc = FaceCube.FaceCube(facelets).toCubieCube()
+        return Search.solutionFromCubieCube(cc, maxDepth, timeOut, useSeparator, progress)
+
+    @staticmethod
+    def solutionFromCubieCube(cc, maxDepth, timeOut, useSeparator=False, progress=None):
+        '''
+        * Same as solution, for a cube already on the cubie level. Callers that keep the cube as coordinates use this
+        * to skip the facelet string entirely.
+        *
+        * @param cc
+        *          is the CubieCube to solve; it is checked with verify() first.
+        '''
         try:
             s = cc.verify()
         except Exception as e:
@@ -156,6 +171,8 @@ class Search(object):
                                 if time.time() - tStart > timeOut:
                                     raise SolverTimeoutError(
                                         "Timeout, no solution within given time")
+                                if progress is not None:
+                                    progress(depthPhase1)
 
                                 if n == 0:
                                     if depthPhase1 >= maxDepth:
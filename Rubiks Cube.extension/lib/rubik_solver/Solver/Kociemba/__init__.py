@@ -4,11 +4,12 @@ from . import Search
 
 
 class KociembaSolver(Solver):
-    def solution(self, maxDepth=23, timeOut=100):
+    def solution(self, maxDepth=23, timeOut=100, progress=None):
         solution = Search.Search.solution(
             self.cube.to_naive_cube().to_face_cube().to_String(),
             maxDepth,
-            timeOut
+            timeOut,
+            progress=progress
         )
 
         return [Move(m) for m in solution]
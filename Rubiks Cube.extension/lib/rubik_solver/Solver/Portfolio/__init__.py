@@ -0,0 +1,114 @@
+import time
+from rubik_solver.Move import Move
+from .. import Solver
+
+try:
+    import multiprocessing
+except ImportError:
+    # IronPython has no multiprocessing, methods run one after another there
+    multiprocessing = None
+
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+
+def _run_method(method, cube, timeout=None):
+    '''Returns (method, moves, seconds, error) for one portfolio member,
+    Kociemba searches at most timeout seconds when one is given'''
+    from rubik_solver import utils
+    kwargs = {'timeOut': timeout} if method == 'Kociemba' and timeout is not None else {}
+    start = time.time()
+    try:
+        moves = [str(m) for m in utils.solve(cube, method, optimize=True, **kwargs)]
+        return method, moves, time.time() - start, None
+    except Exception as e:
+        return method, None, time.time() - start, '%s: %s' % (e.__class__.__name__, e)
+
+
+def _worker(method, cube, results):
+    results.put(_run_method(method, cube))
+
+
+class PortfolioSolver(Solver):
+    '''
+    Races several methods and returns the shortest optimized solution found
+    within the wall-clock budget, or the first one if the budget runs out
+    before any method finishes. After solving, winner holds the name of the
+    method whose solution was returned and results maps every finished
+    method to (moves, seconds, error)
+    '''
+    METHODS = ('Beginner', 'CFOP', 'Kociemba')
+    POLL_INTERVAL = 0.05
+
+    def solution(self, methods=METHODS, budget=5.0, processes=True):
+        for method in methods:
+            if method not in PortfolioSolver.METHODS:
+                raise ValueError('Invalid portfolio method %s, must be one of (%s)' %
+                    (method, ', '.join(PortfolioSolver.METHODS))
+                )
+
+        self.winner = None
+        self.results = {}
+        cube = self.cube.to_naive_cube().get_cube()
+        deadline = time.time() + budget
+
+        if processes and multiprocessing is not None:
+            self._race_processes(methods, cube, deadline)
+        else:
+            self._race_in_process(methods, cube, deadline)
+
+        best = None
+        for method in methods:
+            moves, _, _ = self.results.get(method, (None, None, None))
+            if moves is not None and (best is None or len(moves) < len(best[1])):
+                best = (method, moves)
+
+        if best is None:
+            raise ValueError('No method solved the cube: %s' % ', '.join(
+                '%s (%s)' % (method, error) for method, (_, _, error) in self.results.items()
+            ))
+
+        self.winner = best[0]
+        return [Move(m) for m in best[1]]
+
+    def _record(self, result):
+        method, moves, seconds, error = result
+        self.results[method] = (moves, seconds, error)
+        return moves is not None
+
+    def _race_processes(self, methods, cube, deadline):
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_worker, args=(method, cube, results)) for method in methods]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+
+        solved = False
+        try:
+            while len(self.results) < len(workers):
+                if solved and time.time() >= deadline:
+                    break
+                try:
+                    solved = self._record(results.get(timeout=PortfolioSolver.POLL_INTERVAL)) or solved
+                except Empty:
+                    if not any(worker.is_alive() for worker in workers) and results.empty():
+                        break
+        finally:
+            # Cancel the methods still searching
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+
+    def _race_in_process(self, methods, cube, deadline):
+        # Sequential fallback: once a method has solved the cube the next
+        # ones only get what is left of the budget, and none once it is spent
+        solved = False
+        for method in methods:
+            remaining = deadline - time.time()
+            if solved and remaining <= 0:
+                break
+            result = _run_method(method, cube, remaining if solved else None)
+            solved = self._record(result) or solved
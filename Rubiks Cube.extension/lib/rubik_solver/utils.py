@@ -5,9 +5,11 @@ from .Solver import Solver
 from .Solver import Beginner
 from .Solver import CFOP
 from .Solver import Kociemba
+from .Solver import Portfolio
 from .NaiveCube import NaiveCube
 from .Cubie import Cube
 from .Printer import TtyPrinter
+from .Optimizer import optimize as optimize_moves
 
 __author__ = 'Victor Cabezas'
 
@@ -16,7 +18,8 @@ basestring = str
 METHODS = {
     'Beginner': Beginner.BeginnerSolver,
     'CFOP': CFOP.CFOPSolver,
-    'Kociemba': Kociemba.KociembaSolver
+    'Kociemba': Kociemba.KociembaSolver,
+    'Portfolio': Portfolio.PortfolioSolver
 }
 
 def _check_valid_cube(cube):
@@ -39,6 +42,14 @@ def _check_valid_cube(cube):
     return cube
 
 def solve(cube, method = Beginner.BeginnerSolver, *args, **kwargs):
+    '''Solves cube with method, pass optimize=True to get a rotation-free,
+    cancelled face-turn sequence'''
+    return solve_with_solver(cube, method, *args, **kwargs)[0]
+
+def solve_with_solver(cube, method = Beginner.BeginnerSolver, *args, **kwargs):
+    '''Same as solve, but returns (solution, solver) so callers can read
+    what the solver recorded, e.g. PortfolioSolver.winner'''
+    optimize = kwargs.pop('optimize', False)
     if isinstance(method, basestring):
         if not method in METHODS:
             raise ValueError('Invalid method name, must be one of (%s)' %
@@ -55,7 +66,10 @@ def solve(cube, method = Beginner.BeginnerSolver, *args, **kwargs):
 
     solver = method(cube)
 
-    return solver.solution(*args, **kwargs)
+    solution = solver.solution(*args, **kwargs)
+    if optimize:
+        solution = optimize_moves(solution)
+    return solution, solver
 
 def pprint(cube, color = True):
     cube = _check_valid_cube(cube)
@@ -67,6 +81,7 @@ def main(argv = None):
     arg_parser.add_argument('-i', '--cube', dest = 'cube', required = True, help = 'Cube definition string')
     arg_parser.add_argument('-c', '--color', dest = 'color', default = True, action = 'store_false', help = 'Disable use of colors with TtyPrinter')
     arg_parser.add_argument('-s', '--solver', dest = 'solver', default = 'Beginner', choices = METHODS.keys(), help = 'Solver method to use')
+    arg_parser.add_argument('-o', '--optimize', dest = 'optimize', default = False, action = 'store_true', help = 'Remove rotations and cancel redundant moves')
     args = arg_parser.parse_args(argv)
 
     cube = args.cube.lower()
@@ -74,5 +89,8 @@ def main(argv = None):
     pprint(cube, args.color)
 
     start = time.time()
-    print ("Solution", ', '.join(map(str, solve(cube, METHODS[args.solver]))))
+    solution, solver = solve_with_solver(cube, METHODS[args.solver], optimize = args.optimize)
+    print ("Solution", ', '.join(map(str, solution)))
+    if getattr(solver, 'winner', None):
+        print ("Winner", solver.winner)
     print ("Solved in", time.time() - start, "seconds")
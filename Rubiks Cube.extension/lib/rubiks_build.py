@@ -0,0 +1,168 @@
+from Autodesk.Revit.DB import (
+    BuiltInCategory,
+    BuiltInParameter,
+    Color,
+    CurveLoop,
+    DirectShape,
+    DirectShapeLibrary,
+    ElementId,
+    FilteredElementCollector,
+    GeometryCreationUtilities,
+    GeometryObject,
+    Line,
+    Material,
+    SolidOptions,
+    Transform,
+    XYZ,
+)
+from System import Guid
+from System.Collections.Generic import List
+
+# The functions take state, the rubiks_state module from
+# rubiks_engine.warm_state(), so the new cube is recorded in the module the
+# buttons use.
+
+# Side of a cubie body and of a sticker, and sticker thickness, as
+# fractions of the grid step. The gaps keep neighbouring layers apart.
+BODY_RATIO = 0.95
+STICKER_RATIO = 0.85
+STICKER_DEPTH_RATIO = 0.01
+# Material names and RGB colours; existing materials of that name are reused.
+BODY_MATERIAL = ("Cubeys Body", (24, 24, 24))
+STICKER_MATERIALS = {
+    "U": ("Cubeys Yellow", (255, 213, 0)),
+    "D": ("Cubeys White", (255, 255, 255)),
+    "R": ("Cubeys Green", (0, 155, 72)),
+    "L": ("Cubeys Blue", (0, 70, 173)),
+    "F": ("Cubeys Red", (183, 18, 52)),
+    "B": ("Cubeys Orange", (255, 88, 0)),
+}
+# DirectShapeLibrary definition ids; the cubie size is part of the id.
+DEFINITION_PREFIX = "RubiksCube"
+APPLICATION_ID = "RubiksCube"
+APPLICATION_DATA_ID = "Cubie"
+
+
+def _materials(doc):
+    # Material ids by key ("body" or face letter), created on first use.
+    existing = dict(
+        (m.Name, m.Id) for m in FilteredElementCollector(doc).OfClass(Material).ToElements()
+    )
+    wanted = [("body", BODY_MATERIAL)] + sorted(STICKER_MATERIALS.items())
+    out = {}
+    for key, (name, rgb) in wanted:
+        material_id = existing.get(name)
+        if material_id is None:
+            material_id = Material.Create(doc, name)
+            doc.GetElement(material_id).Color = Color(*rgb)
+        out[key] = material_id
+    return out
+
+
+def _box(center, half, material_id):
+    # Axis-aligned box solid, its bottom rectangle extruded along +Z.
+    z0 = center.Z - half[2]
+    corners = [
+        XYZ(center.X - half[0], center.Y - half[1], z0),
+        XYZ(center.X + half[0], center.Y - half[1], z0),
+        XYZ(center.X + half[0], center.Y + half[1], z0),
+        XYZ(center.X - half[0], center.Y + half[1], z0),
+    ]
+    loop = CurveLoop()
+    for a, b in zip(corners, corners[1:] + corners[:1]):
+        loop.Append(Line.CreateBound(a, b))
+    options = SolidOptions(material_id, ElementId.InvalidElementId)
+    return GeometryCreationUtilities.CreateExtrusionGeometry(
+        List[CurveLoop]([loop]), XYZ.BasisZ, 2.0 * half[2], options
+    )
+
+
+def _definitions(state, doc, size, materials):
+    # Definition ids of the body and of the sticker on each face, for a
+    # cubie centered on the origin. Each is built once per document and
+    # size; every cubie then only places instances of them.
+    library = DirectShapeLibrary.GetDirectShapeLibrary(doc)
+    body_id = "{}.Body:{!r}".format(DEFINITION_PREFIX, size)
+    if not library.Contains(body_id):
+        half = size * BODY_RATIO * 0.5
+        library.AddDefinition(body_id, List[GeometryObject]([_box(XYZ.Zero, (half,) * 3, materials["body"])]))
+
+    sticker_ids = {}
+    for face, normal in state.FACE_NORMALS.items():
+        sticker_id = "{}.Sticker.{}:{!r}".format(DEFINITION_PREFIX, face, size)
+        if not library.Contains(sticker_id):
+            depth = size * STICKER_DEPTH_RATIO
+            offset = size * BODY_RATIO * 0.5 + depth * 0.5
+            center = XYZ(*[v * offset for v in normal])
+            half = tuple(depth * 0.5 if v else size * STICKER_RATIO * 0.5 for v in normal)
+            library.AddDefinition(sticker_id, List[GeometryObject]([_box(center, half, materials[face])]))
+        sticker_ids[face] = sticker_id
+    return body_id, sticker_ids
+
+
+def cube_marks(name):
+    # Marks of the 26 cubies in slot order; named cubes get their own prefix
+    # so the Marks stay unique across the project.
+    prefix = "{}-".format(name) if name else "C"
+    return ["{}{:02d}".format(prefix, i + 1) for i in range(26)]
+
+
+def build_cube(state, doc, origin, size, name=""):
+    # Create the 26 cubies of a solved cube centered on origin, with
+    # Comments, Marks, tags and the cube's stored state, ready for moves.
+    # Must run inside a transaction. Returns the new cube.
+    if size <= 0:
+        raise Exception("Cubie size must be positive.")
+    if name in state.cube_names(doc):
+        raise Exception(
+            "Cubies with Comments='{}' already exist. Choose another name."
+            .format(state.cube_comments(name))
+        )
+
+    origin = XYZ(round(origin.X, 6), round(origin.Y, 6), round(origin.Z, 6))
+    size = round(size, 6)
+    cube = {"name": name, "origin": origin, "size": size, "host": None}
+    body_id, sticker_ids = _definitions(state, doc, size, _materials(doc))
+    comments = state.cube_comments(name)
+    category = ElementId(BuiltInCategory.OST_GenericModel)
+
+    cubies = []
+    for slot, mark in zip(state.SLOTS, cube_marks(name)):
+        center = state.slot_point(cube, slot)
+        placement = Transform.CreateTranslation(center)
+        geometry = List[GeometryObject](DirectShape.CreateGeometryInstance(doc, body_id, placement))
+        for face in state.slot_faces(slot):
+            geometry.AddRange(DirectShape.CreateGeometryInstance(doc, sticker_ids[face], placement))
+
+        shape = DirectShape.CreateElement(doc, category)
+        shape.ApplicationId = APPLICATION_ID
+        shape.ApplicationDataId = APPLICATION_DATA_ID
+        shape.SetShape(geometry)
+        shape.get_Parameter(BuiltInParameter.ALL_MODEL_MARK).Set(mark)
+        shape.get_Parameter(BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS).Set(comments)
+        cubies.append((shape, center, mark))
+
+    cube["id"] = cube["key"] = Guid.NewGuid().ToString()
+    state.add_solved_cube(doc, cube, cubies)
+    return cube
+
+
+def free_placement(state, doc, size):
+    # Origin for a new cube of the given cubie size: beside the cubes already
+    # in the model along +X, one cubie apart, or the project origin.
+    cubes = state.list_cubes(doc)
+    if not cubes:
+        return XYZ(0, 0, 0)
+    right = max(cube["origin"].X + 1.5 * cube["size"] for cube in cubes)
+    return XYZ(right + 2.5 * size, 0, 0)
+
+
+def free_name(state, doc):
+    # "" for the first cube, so it keeps the plain "Cubeys" Comments.
+    used = state.cube_names(doc)
+    if "" not in used:
+        return ""
+    n = 2
+    while "Cube {}".format(n) in used:
+        n += 1
+    return "Cube {}".format(n)
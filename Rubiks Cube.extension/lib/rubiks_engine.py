@@ -0,0 +1,168 @@
+import os
+import time
+
+from System import AppDomain
+
+import rubiks_trace
+
+# AppDomain slot holding the warm move engine shared by all buttons.
+ENGINE_SLOT = "RubiksCube.MoveEngine"
+LIB_DIR = os.path.dirname(os.path.abspath(__file__))
+# Queued clicks are played once no new click came for this many seconds.
+FLUSH_DELAY = 0.15
+FACE_NAMES = {
+    "U": "Up",
+    "D": "Down",
+    "L": "Left",
+    "R": "Right",
+    "F": "Front",
+    "B": "Back",
+}
+
+
+def _source_stamp():
+    # Reloading the extension changes the sources; a stale engine is rebuilt.
+    stamp = []
+    for name in ("rubiks_engine.py", "rubiks_state.py"):
+        try:
+            stamp.append(os.path.getmtime(os.path.join(LIB_DIR, name)))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _transaction_name(moves):
+    if len(moves) > 1:
+        return "Rotate Faces ({})".format(" ".join(moves))
+    move = moves[0]
+    suffix = " CCW" if move.endswith("'") else " Twice" if move.endswith("2") else ""
+    return "Rotate {} Face{}".format(FACE_NAMES[move[0]], suffix)
+
+
+class MoveEngine(object):
+    # Built once per session. Its methods run against the modules imported
+    # when it was built, so later clicks reuse the loaded solver tables and
+    # the precomputed slot permutations and axis lines.
+    #
+    # A rotation click only queues its move for the active cube. The queues
+    # are played from the Idling event once the clicks stop, so a burst of
+    # clicks costs one transaction per cube, with one RotateElements call
+    # per distinct net cubie rotation. Cubies are squared to the grid only
+    # as often as for single turns.
+
+    def __init__(self, stamp):
+        import rubiks_state
+        from pyrevit import HOST_APP, forms, revit
+
+        self.stamp = stamp
+        self.state = rubiks_state
+        self.forms = forms
+        self.revit = revit
+        self.uiapp = HOST_APP.uiapp
+        self.pending = {}
+        self.last_click = 0.0
+        self.flush_delay = FLUSH_DELAY
+        # One bound method, so the same delegate is added and removed.
+        self._idling_handler = self._on_idling
+        self._attached = False
+        rubiks_state._get_solver_modules()
+
+    def enqueue(self, doc, move_notation):
+        # Require explicit Initialize and validate target cubie identity set,
+        # so errors still surface on the click itself. The cube is fixed now,
+        # while the selection that picked it is still current.
+        cube = self.state.ensure_state(doc, require_initialized=True)["cube"]
+
+        key = (doc, cube["key"])
+        if key not in self.pending:
+            self.pending[key] = (doc, cube, [])
+        self.pending[key][2].append(move_notation)
+        self.last_click = time.time()
+        if not self._attached:
+            self.uiapp.Idling += self._idling_handler
+            self._attached = True
+
+    def _on_idling(self, sender, args):
+        # Keep being raised while clicks are still coming in.
+        try:
+            if time.time() - self.last_click < self.flush_delay:
+                args.SetRaiseWithoutDelay()
+                return
+            self.flush()
+        except Exception as ex:
+            # Moves left in the queue would never be played; drop them and
+            # say so, so the user knows which clicks did not happen.
+            dropped = sum(len(moves) for _, _, moves in self.pending.values())
+            self.pending.clear()
+            self._detach()
+            self.forms.alert(
+                "Queued rotations could not be played; {} move(s) were dropped.\n\n{}".format(dropped, ex)
+            )
+
+    def _detach(self):
+        if self._attached:
+            self.uiapp.Idling -= self._idling_handler
+            self._attached = False
+
+    def flush(self, doc=None):
+        # Play the queued moves, one transaction per cube. With doc, only
+        # that document's queues are played.
+        for key, (queued_doc, cube, moves) in list(self.pending.items()):
+            if doc is not None and not queued_doc.Equals(doc):
+                continue
+            del self.pending[key]
+            if queued_doc.IsValidObject:
+                self._play(queued_doc, cube, moves)
+        if not self.pending:
+            self._detach()
+
+    def _play(self, doc, cube, moves):
+        state, forms = self.state, self.forms
+        name = _transaction_name(moves)
+        try:
+            # Inverse pairs such as U U' cancel and repeats merge into U2.
+            net = state.simplify_moves(moves)
+            if not net:
+                return
+            name = _transaction_name(net)
+            # Geometry rotation and logical state update happen in one transaction so Undo stays consistent.
+            with rubiks_trace.command("Rotate" if len(net) == 1 else "Rotate Batch"):
+                with rubiks_trace.TimedTransaction(self.revit.Transaction(name, doc=doc)):
+                    if len(net) == 1:
+                        state.rotate_layer(doc, net[0], cube=cube)
+                    else:
+                        state.apply_moves(doc, net, cube=cube, snap=False)
+        except Exception as ex:
+            forms.alert("{} failed.\n\n{}".format(name, ex))
+
+
+def get_engine():
+    domain = AppDomain.CurrentDomain
+    stamp = _source_stamp()
+    engine = domain.GetData(ENGINE_SLOT)
+    if engine is None or engine.stamp != stamp:
+        if engine is not None:
+            engine.flush()
+        engine = MoveEngine(stamp)
+        domain.SetData(ENGINE_SLOT, engine)
+    return engine
+
+
+def warm_state(doc=None):
+    # rubiks_state as loaded by the session engine, solver tables included.
+    # Queued rotations are played first so commands see the current cube.
+    engine = get_engine()
+    if engine.pending:
+        if doc is None:
+            from pyrevit import revit
+            doc = revit.doc
+        engine.flush(doc)
+    return engine.state
+
+
+def run_move(move_notation, doc=None):
+    if doc is None:
+        from pyrevit import revit
+        doc = revit.doc
+    with rubiks_trace.command("Rotate Click"):
+        get_engine().enqueue(doc, move_notation)
@@ -0,0 +1,93 @@
+import time
+
+from Autodesk.Revit.DB import ElementId, ElementTransformUtils, Transaction
+from System.Collections.Generic import List
+
+from rubiks_trace import span
+
+# Frames each quarter turn is split into.
+FRAMES_PER_TURN = 6
+# Target redraws per second; RefreshActiveView is never called faster.
+FRAME_RATE = 24.0
+
+
+class FrameScheduler(object):
+    # Paces turns of frames_per_turn frames at frame_rate. Frame n of the
+    # whole playback is due at start + n / frame_rate. When drawing falls
+    # behind, the frames already overdue are skipped, but the last frame
+    # of each turn is always drawn so every turn completes. Clock and
+    # sleep are injectable so the pacing can be tested without Revit.
+
+    def __init__(self, frames_per_turn=FRAMES_PER_TURN, frame_rate=FRAME_RATE, clock=time.time, sleep=time.sleep):
+        self.frames_per_turn = frames_per_turn
+        self.frame_rate = frame_rate
+        self.clock = clock
+        self.sleep = sleep
+        self.drawn = 0
+        self.skipped = 0
+
+    def frames(self, turns):
+        # Yields (turn, frame) for each frame to draw, frame in 1..K.
+        k = self.frames_per_turn
+        period = 1.0 / self.frame_rate
+        start = self.clock()
+        for turn in range(turns):
+            frame = 0
+            while frame < k:
+                due = start + (turn * k + frame + 1) * period
+                now = self.clock()
+                if now < due:
+                    self.sleep(due - now)
+                    target = frame + 1
+                else:
+                    overdue = int((now - start) / period) - turn * k
+                    target = max(frame + 1, min(k, overdue))
+                self.skipped += target - frame - 1
+                self.drawn += 1
+                frame = target
+                yield turn, frame
+
+
+def play_moves(state, doc, uidoc, moves, scheduler=None, cube=None):
+    # Animate moves, one transaction and redraw per drawn frame. Each move
+    # is recorded with its last frame and placement is snapped at the end.
+    # Run inside a TransactionGroup and assimilate it for one undo entry.
+    # state is rubiks_state as returned by rubiks_engine.warm_state().
+    if cube is None:
+        cube = state.active_cube(doc, exitscript_on_error=False)
+    if scheduler is None:
+        scheduler = FrameScheduler()
+    k = scheduler.frames_per_turn
+    current = shown = None
+    for turn, frame in scheduler.frames(len(moves)):
+        move = moves[turn]
+        if turn != current:
+            face_layer = state.layer_cubies(doc, move[0], exitscript_on_error=False, cube=cube)
+            ids = List[ElementId]([cubey.Id for cubey in face_layer])
+            axis, angle = state.move_axis(move, cube)
+            current, shown = turn, 0
+
+        t = Transaction(doc, "Play Solution Frame")
+        t.Start()
+        try:
+            ElementTransformUtils.RotateElements(doc, ids, axis, angle * (frame - shown) / k)
+            if frame == k:
+                state.apply_move(doc, move, cube=cube)
+            t.Commit()
+        except Exception:
+            t.RollBack()
+            raise
+        shown = frame
+        with span("redraw"):
+            uidoc.RefreshActiveView()
+
+    # Fractional angles leave rounding behind; land exactly on the slots.
+    t = Transaction(doc, "Play Solution Snap")
+    t.Start()
+    try:
+        state.snap_placement(doc, cube=cube)
+        t.Commit()
+    except Exception:
+        t.RollBack()
+        raise
+    return scheduler
@@ -0,0 +1,186 @@
+import threading
+import time
+
+from System import AppDomain
+
+import rubiks_trace
+
+# AppDomain slot holding the running solve job so a second click can cancel it.
+JOB_SLOT = "RubiksCube.SolveJob"
+# Seconds allowed for the first solution, as the synchronous solve used.
+FIRST_SOLUTION_TIMEOUT = 100.0
+# Seconds spent looking for shorter solutions once one is found.
+IMPROVE_SECONDS = 3.0
+# Shown by commands that search on the UI thread while a solve runs: waiting
+# for the search lock there would freeze Revit until the solve ends.
+BUSY_MESSAGE = (
+    "A solve is running in the background. Wait for its result, "
+    "or click Solve Cube again to cancel it."
+)
+
+
+class SolveCancelled(Exception):
+    pass
+
+
+class SolveJob(object):
+    # Runs the Kociemba search on a worker thread. The thread never touches
+    # the Revit API: progress and the result are handed to the dispatcher,
+    # whose post(callback) must run callback on the UI thread later.
+    #
+    # state is rubiks_state as returned by rubiks_engine.warm_state(), so the
+    # search uses the session's loaded solver tables instead of a fresh copy.
+
+    def __init__(self, state, coords, dispatcher, on_progress=None, on_done=None, seed=None):
+        self.state = state
+        self.coords = coords
+        self.seed = seed
+        self.dispatcher = dispatcher
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.best = None
+        self.depth = 0
+        self.error = None
+        self.cancelled = False
+        self.running = False
+        self.started = None
+        self._cancel = threading.Event()
+        self._reported = None
+        self._thread = None
+
+    def start(self):
+        # The search lock is created here, on the UI thread, not by the worker.
+        self.state.search_lock()
+        self.running = True
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name="RubiksSolveJob")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        # Takes effect at the search's next backtrack; the best solution so
+        # far is still delivered.
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def progress(self):
+        return {
+            "phase1_depth": self.depth,
+            "best_length": len(self.best) if self.best is not None else None,
+            "elapsed": time.time() - self.started,
+        }
+
+    def _on_search_progress(self, depth):
+        if self._cancel.is_set():
+            raise SolveCancelled()
+        self.depth = depth
+        self._report()
+
+    def _report(self):
+        # Post only when something the user sees has changed. Once a
+        # solution exists, only shorter solutions are worth a message.
+        info = self.progress()
+        key = (info["phase1_depth"], None) if self.best is None else (None, info["best_length"])
+        if key == self._reported or self.on_progress is None:
+            return
+        self._reported = key
+        callback = self.on_progress
+        self.dispatcher.post(lambda: callback(info))
+
+    def _search(self, max_depth, time_out):
+        return self.state.search_coords(self.coords, max_depth, time_out, progress=self._on_search_progress)
+
+    def _run(self):
+        try:
+            search_failed = self.state.search_errors()
+            max_depth = self.state.SEARCH_MAX_DEPTH
+            # A known solution, e.g. the inverted move history, skips the
+            # first search; the search then only has to beat it. A seed
+            # longer than the search depth is kept only if the search fails.
+            if self.seed and len(self.seed) <= max_depth + 1:
+                self.best = list(self.seed)
+            else:
+                try:
+                    self.best = self._search(max_depth, FIRST_SOLUTION_TIMEOUT)
+                except search_failed:
+                    if not self.seed:
+                        raise
+                    self.best = list(self.seed)
+            self._report()
+            # Iterative deepening from above: each hit lowers the bound by one.
+            deadline = time.time() + IMPROVE_SECONDS
+            while self.best and time.time() < deadline:
+                try:
+                    self.best = self._search(len(self.best) - 1, deadline - time.time())
+                except search_failed:
+                    break
+                self._report()
+        except SolveCancelled:
+            self.cancelled = True
+        except Exception as ex:
+            self.error = ex
+        finally:
+            self.running = False
+            elapsed = time.time() - self.started
+            rubiks_trace.record("Solve Cube Search", [("search", elapsed), ("total", elapsed)])
+            if self.on_done is not None:
+                callback = self.on_done
+                self.dispatcher.post(lambda: callback(self))
+
+    def solution(self):
+        return " ".join(self.best) if self.best else ""
+
+
+class ExternalEventDispatcher(object):
+    # Runs posted callbacks on the Revit UI thread through one ExternalEvent.
+    # Must be created inside a valid API context, e.g. a button click.
+
+    def __init__(self):
+        from Autodesk.Revit.UI import ExternalEvent, IExternalEventHandler
+        from pyrevit import forms
+
+        pending = self.pending = []
+        lock = self.lock = threading.Lock()
+
+        class _Handler(IExternalEventHandler):
+            def Execute(self, uiapp):
+                with lock:
+                    callbacks = pending[:]
+                    del pending[:]
+                for callback in callbacks:
+                    try:
+                        callback()
+                    except Exception as ex:
+                        forms.alert("Showing the solve result failed.\n\n{}".format(ex))
+
+            def GetName(self):
+                return "Rubik Solve Progress"
+
+        self.handler = _Handler()
+        self.event = ExternalEvent.Create(self.handler)
+
+    def post(self, callback):
+        with self.lock:
+            self.pending.append(callback)
+        self.event.Raise()
+
+
+def current_job():
+    return AppDomain.CurrentDomain.GetData(JOB_SLOT)
+
+
+def solve_running():
+    job = current_job()
+    return job is not None and job.running
+
+
+def start_solve(state, coords, dispatcher, on_progress=None, on_done=None, seed=None):
+    if solve_running():
+        raise Exception("A solve is already running.")
+    job = SolveJob(state, coords, dispatcher, on_progress, on_done, seed)
+    AppDomain.CurrentDomain.SetData(JOB_SLOT, job)
+    return job.start()
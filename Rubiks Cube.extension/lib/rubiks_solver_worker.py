@@ -0,0 +1,256 @@
+"""Optional out-of-process solver.
+
+The worker is a CPython process that imports rubik_solver once, keeping
+the Kociemba tables loaded, and answers newline-delimited JSON requests on
+a localhost socket:
+
+    {"token": "...", "op": "solve", "cube": "<54 chars>", "method": "Kociemba"}
+    -> {"ok": true, "moves": "R U R' ..."}
+
+    {"token": "...", "op": "ping"}      -> {"ok": true}
+    {"token": "...", "op": "shutdown"}  -> {"ok": true}
+
+Errors come back as {"ok": false, "error": "..."}. The client half of this
+module is what rubiks_state uses under IronPython: solve() finds a running
+worker through its port file, starts one on demand with the CPython named
+by RUBIKS_SOLVER_PYTHON, and raises WorkerUnavailable whenever the caller
+should fall back to solving in-process. With start_timeout=0 it does not
+wait for a new worker to load its tables; the port file marks the worker
+as starting, and later calls use it once it is up.
+
+Run by hand for testing on Linux:
+
+    python rubiks_solver_worker.py --serve --port-file /tmp/w.json --token t
+    python rubiks_solver_worker.py <54-char cube>
+"""
+from __future__ import print_function
+
+import binascii
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+LIB_DIR = os.path.dirname(os.path.abspath(__file__))
+PYTHON_ENV = "RUBIKS_SOLVER_PYTHON"
+PORT_FILE = os.path.join(tempfile.gettempdir(), "rubiks_solver_worker.json")
+# Seconds to wait for a new worker to load its tables and publish its port.
+START_TIMEOUT = 60.0
+# Seconds a solve may take before the client gives up on the worker.
+SOLVE_TIMEOUT = 120.0
+# The worker exits after this many idle seconds.
+IDLE_TIMEOUT = 1800.0
+
+
+class WorkerUnavailable(Exception):
+    pass
+
+
+def _read_port_file(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _request(info, payload, timeout):
+    payload = dict(payload, token=info["token"])
+    sock = socket.create_connection(("127.0.0.1", info["port"]), timeout)
+    try:
+        sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        sock.close()
+    if not data:
+        raise socket.error("Worker closed the connection.")
+    return json.loads(data.decode("utf-8"))
+
+
+def _is_starting(info):
+    # Port file written by start_worker before the worker published its port.
+    return "port" not in info and time.time() - info.get("starting", 0) < START_TIMEOUT
+
+
+def _launch(args):
+    try:
+        import subprocess
+        subprocess.Popen(args, cwd=LIB_DIR, close_fds=True)
+    except ImportError:
+        # IronPython builds without subprocess: start it through .NET.
+        from System.Diagnostics import Process, ProcessStartInfo
+        start = ProcessStartInfo(args[0], " ".join('"{}"'.format(a) for a in args[1:]))
+        start.UseShellExecute = False
+        start.CreateNoWindow = True
+        start.WorkingDirectory = LIB_DIR
+        Process.Start(start)
+
+
+def start_worker(python=None, port_file=PORT_FILE, timeout=START_TIMEOUT):
+    python = python or os.environ.get(PYTHON_ENV)
+    if not python:
+        raise WorkerUnavailable("{} is not set.".format(PYTHON_ENV))
+
+    token = binascii.hexlify(os.urandom(16)).decode("ascii")
+    # The worker replaces this once its tables are loaded; until then it
+    # keeps other clients from launching a second worker.
+    with open(port_file, "w") as f:
+        json.dump({"token": token, "starting": time.time()}, f)
+    try:
+        _launch([python, os.path.join(LIB_DIR, "rubiks_solver_worker.py"),
+                 "--serve", "--port-file", port_file, "--token", token])
+    except Exception as ex:
+        os.remove(port_file)
+        raise WorkerUnavailable("Solver worker could not be started: {}".format(ex))
+    if timeout <= 0:
+        raise WorkerUnavailable("Solver worker is starting.")
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = _read_port_file(port_file)
+        if info and info.get("token") == token and "port" in info:
+            return info
+        time.sleep(0.1)
+    raise WorkerUnavailable("Solver worker did not start within {:.0f} s.".format(timeout))
+
+
+def solve(config, method="Kociemba", port_file=PORT_FILE, timeout=SOLVE_TIMEOUT, start_timeout=START_TIMEOUT):
+    # Returns the solution as a notation string, starting a worker if needed.
+    payload = {"op": "solve", "cube": config, "method": method}
+    info = _read_port_file(port_file)
+    reply = None
+    if info and _is_starting(info):
+        raise WorkerUnavailable("Solver worker is starting.")
+    if info and "port" in info:
+        try:
+            reply = _request(info, payload, timeout)
+        except (socket.error, ValueError):
+            reply = None
+    if reply is None:
+        info = start_worker(port_file=port_file, timeout=start_timeout)
+        try:
+            reply = _request(info, payload, timeout)
+        except (socket.error, ValueError) as ex:
+            raise WorkerUnavailable("Solver worker did not answer: {}".format(ex))
+    if not reply.get("ok"):
+        # The cube itself is at fault; solving in-process would fail the same way.
+        raise ValueError(reply.get("error", "Solver worker failed."))
+    return reply["moves"]
+
+
+def stop_worker(port_file=PORT_FILE):
+    info = _read_port_file(port_file)
+    if not info or "port" not in info:
+        return False
+    try:
+        _request(info, {"op": "shutdown"}, 5.0)
+    except (socket.error, ValueError):
+        return False
+    return True
+
+
+def _handle(request, token, utils):
+    if request.get("token") != token:
+        return {"ok": False, "error": "Bad token."}
+    op = request.get("op")
+    if op == "ping":
+        return {"ok": True}
+    if op == "shutdown":
+        return {"ok": True}
+    if op == "solve":
+        try:
+            moves = utils.solve(request["cube"], request.get("method", "Kociemba"))
+        except Exception as ex:
+            return {"ok": False, "error": "{}".format(ex)}
+        return {"ok": True, "moves": " ".join(str(m) for m in moves)}
+    return {"ok": False, "error": "Unknown op {!r}.".format(op)}
+
+
+def serve(port_file, token, port=0, idle_timeout=IDLE_TIMEOUT):
+    if LIB_DIR not in sys.path:
+        sys.path.insert(0, LIB_DIR)
+    # Loading the solver also loads the Kociemba tables, once per worker.
+    from rubik_solver import utils
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", port))
+    server.listen(5)
+    server.settimeout(idle_timeout)
+
+    # Publish the port only once the tables are loaded and we can accept.
+    partial = port_file + ".tmp"
+    with open(partial, "w") as f:
+        json.dump({"port": server.getsockname()[1], "token": token, "pid": os.getpid()}, f)
+    if os.path.exists(port_file):
+        os.remove(port_file)
+    os.rename(partial, port_file)
+
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                break
+            conn.settimeout(None)
+            stream = conn.makefile("rb")
+            try:
+                line = stream.readline()
+                try:
+                    request = json.loads(line.decode("utf-8"))
+                    reply = _handle(request, token, utils)
+                except ValueError:
+                    request, reply = {}, {"ok": False, "error": "Malformed request."}
+                conn.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+            finally:
+                stream.close()
+                conn.close()
+            if request.get("op") == "shutdown" and reply.get("ok"):
+                break
+    finally:
+        server.close()
+        info = _read_port_file(port_file)
+        if info and info.get("token") == token:
+            os.remove(port_file)
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description="Rubik solver worker and test client")
+    parser.add_argument("cube", nargs="?", help="Cube to solve through the worker (client mode)")
+    parser.add_argument("--serve", action="store_true", help="Run the worker")
+    parser.add_argument("--port-file", default=PORT_FILE)
+    parser.add_argument("--token", default=None)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT)
+    parser.add_argument("--stop", action="store_true", help="Stop the running worker")
+    parser.add_argument("--python", default=None, help="CPython used to start a worker (default: ${})".format(PYTHON_ENV))
+    args = parser.parse_args(argv)
+    if args.python:
+        os.environ[PYTHON_ENV] = args.python
+
+    if args.serve:
+        if not args.token:
+            parser.error("--serve needs --token")
+        serve(args.port_file, args.token, args.port, args.idle_timeout)
+    elif args.stop:
+        print("stopped" if stop_worker(args.port_file) else "no worker running")
+    elif args.cube:
+        start = time.time()
+        try:
+            print(solve(args.cube, port_file=args.port_file))
+        except (WorkerUnavailable, ValueError) as ex:
+            parser.exit(1, "{}\n".format(ex))
+        print("{:.1f} ms".format(1000.0 * (time.time() - start)), file=sys.stderr)
+    else:
+        parser.error("give a cube, --serve or --stop")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
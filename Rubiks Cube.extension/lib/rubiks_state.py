@@ -1,24 +1,208 @@
+import binascii
+import math
+import os
+import random
+import socket
+import threading
+
 from Autodesk.Revit.DB import (
     BuiltInCategory,
     BuiltInParameter,
+    DataStorage,
     DirectShape,
+    ElementId,
+    ElementTransformUtils,
     FilteredElementCollector,
+    GeometryInstance,
+    Line,
     LocationPoint,
+    Options,
+    PlanarFace,
+    Solid,
+    XYZ,
+)
+from Autodesk.Revit.DB.ExtensibleStorage import (
+    AccessLevel,
+    Entity,
+    ExtensibleStorageFilter,
+    Schema,
+    SchemaBuilder,
 )
-from Autodesk.Revit.DB.ExtensibleStorage import AccessLevel, Entity, Schema, SchemaBuilder
 from pyrevit import forms
-from System import Guid, String
+from rubiks_trace import span, timed
+from System import AppDomain, Byte, Guid, Int32, String
+from System.Collections.Generic import IList, List
+
+# Schema v4: the cube as packed cubie coordinates plus a hash of the Marks.
+SCHEMA_GUID = Guid("C5E1A7B3-2F64-4D8E-9B10-7A3C6E2D5F84")
+FIELD_CORNER_PERMUTATION = "corner_permutation"
+FIELD_TWIST = "twist"
+FIELD_EDGE_PERMUTATION = "edge_permutation"
+FIELD_FLIP = "flip"
+FIELD_MARK_HASH = "mark_hash"
+FIELD_PROJECT_KEY = "project_key"
+COORD_FIELDS = (FIELD_CORNER_PERMUTATION, FIELD_TWIST, FIELD_EDGE_PERMUTATION, FIELD_FLIP)
 
-# New GUID (schema v3) for strict project-bound state.
-SCHEMA_GUID = Guid("6A22FE1F-C4AF-4E74-8A5C-1D1F8946E1D7")
+# Schema v3 kept the facelet config and the sorted Mark list as strings.
+# It is only read, to migrate documents saved before v4.
+LEGACY_SCHEMA_GUID = Guid("6A22FE1F-C4AF-4E74-8A5C-1D1F8946E1D7")
 FIELD_CONFIG = "config"
 FIELD_SIGNATURE = "mark_signature"
-FIELD_PROJECT_KEY = "project_key"
+# Separate small schema for the slot -> Mark map so the v3 state stays readable.
+SLOT_SCHEMA_GUID = Guid("3F0B7C52-9D1E-4A8B-B6E4-52C1A7D09E31")
+FIELD_SLOT_MARKS = "slot_marks"
+FIELD_MOVES_SINCE_CHECK = "moves_since_check"
+# Per-cubie tag stamped by Initialize: owning cube and home slot index.
+TAG_SCHEMA_GUID = Guid("B8E2D4A1-5C73-4F0E-9A26-7D3E1F84C5B9")
+FIELD_CUBE_ID = "cube_id"
+FIELD_HOME_SLOT = "home_slot"
+# One DataStorage element per cube holds its record and all its state
+# entities. The record carries the name, origin and cubie size.
+CUBE_SCHEMA_GUID = Guid("7B4E1D92-3C58-4A6F-8E21-D95A0C3F6B17")
+FIELD_CUBE_NAME = "name"
+FIELD_PLACEMENT = "placement"
+HISTORY_SCHEMA_GUID = Guid("E4A9C2D7-6B15-4F38-8D0A-3C7B9E1F2A65")
+FIELD_HISTORY_MOVES = "moves"
+# Longer histories are compacted, and dropped if they stay this long.
+HISTORY_LIMIT = 200
+# Longest solution the Kociemba search is asked for.
+SEARCH_MAX_DEPTH = 23
+# Seconds a search gets to beat the inverted history.
+HISTORY_SEARCH_SECONDS = 0.25
+SOLUTION_SCHEMA_GUID = Guid("9D3F6B21-A84C-4E57-B2E9-1F6C0A7D8E43")
+FIELD_SOLUTION_START = "start"
+FIELD_SOLUTION_MOVES = "moves"
+FIELD_SOLUTION_CURSOR = "cursor"
+FIELD_SOLUTION_EXPECTED = "expected"
+# Solutions remembered per session, keyed by the coordinates they solve.
+SOLUTION_MEMO_SIZE = 32
+# Geometric verification of the slot map runs every this many moves.
+SLOT_VERIFY_INTERVAL = 20
+# Comments of the cubies: "Cubeys", or "Cubeys:<name>" for one of several cubes.
 TARGET_COMMENTS = "Cubeys"
+# Cubie size of cubes initialized before per-cube records, around the origin.
 CUBIE_SIZE_FT = 1.0
-GRID_TOLERANCE_FT = 0.2
+# Allowed distance from a grid position, in cubie sizes.
+GRID_TOLERANCE = 0.2
+QUARTER_TURN_RADIANS = math.pi / 2
+# Placement corrections below this are not worth an API call.
+SNAP_TOLERANCE_FT = 1e-9
+# Orientation corrections below this angle, in radians, are skipped too.
+SNAP_TOLERANCE_RAD = 1e-9
 SOLVED_CONFIG = "yyyyyyyyybbbbbbbbbrrrrrrrrrgggggggggooooooooowwwwwwwww"
+# (URFtoDLB, twist, URtoBR, flip) of the solved cube.
+SOLVED_COORDS = (0, 0, 0, 0)
+# Kociemba move axis order; CubieCube.moveCube holds one quarter turn each.
+COORD_AXES = "URFDLB"
+# Length of the random sequences Scramble All Cubes plays.
+SCRAMBLE_LENGTH = 20
+# AppDomain slot holding the per-document cubie indexes across button clicks.
+INDEX_SLOT = "RubiksCube.CubieIndex"
+# AppDomain slot holding the lock every Kociemba search runs under. Search
+# keeps its state in class-level arrays, so two searches at once, e.g. the
+# background solve and Apply Solution, would corrupt each other.
+SEARCH_LOCK_SLOT = "RubiksCube.SearchLock"
+_search_lock_guard = threading.Lock()
+# Changes when the extension is reloaded with new sources; indexes built by
+# the previous code are dropped then.
+_SOURCE_STAMP = os.path.getmtime(os.path.abspath(__file__))
 _solver_cache = None
+_schemas = {}
+_solutions = {}
+_state_fields = None
+# Cube last worked on per document, used while nothing is selected. Keyed by
+# the document itself, like the cubie indexes.
+_active_cubes = {}
+
+# Logical slots in cubie-size units; the slot map stores one Mark per slot.
+SLOTS = [
+    (x, y, z)
+    for x in (-1, 0, 1)
+    for y in (-1, 0, 1)
+    for z in (-1, 0, 1)
+    if (x, y, z) != (0, 0, 0)
+]
+SLOT_INDEX = dict((slot, i) for i, slot in enumerate(SLOTS))
+
+# Outward normal of each face; buttons rotate clockwise about it.
+FACE_NORMALS = {
+    "U": (0, 0, 1),
+    "D": (0, 0, -1),
+    "R": (1, 0, 0),
+    "L": (-1, 0, 0),
+    "F": (0, -1, 0),
+    "B": (0, 1, 0),
+}
+
+# Config colour of each face (the center facelets of the solved config).
+FACE_COLOURS = dict(zip("ULFRBD", SOLVED_CONFIG[4::9]))
+
+
+def _on_face(slot, normal):
+    return sum(a * b for a, b in zip(slot, normal)) == 1
+
+
+def slot_faces(slot):
+    # Faces whose layer holds the slot, i.e. the stickers a cubie there shows.
+    return [face for face, normal in sorted(FACE_NORMALS.items()) if _on_face(slot, normal)]
+
+
+def _turn_slot(slot, normal):
+    # Clockwise quarter turn seen from outside: p' = n(n.p) - n x p.
+    x, y, z = slot
+    nx, ny, nz = normal
+    dot = nx * x + ny * y + nz * z
+    cross = (ny * z - nz * y, nz * x - nx * z, nx * y - ny * x)
+    return (nx * dot - cross[0], ny * dot - cross[1], nz * dot - cross[2])
+
+
+def _build_slot_permutations():
+    # perm[i] = slot whose cubie ends up in slot i after the move.
+    perms = {}
+    for face, normal in FACE_NORMALS.items():
+        quarter = list(range(len(SLOTS)))
+        for j, slot in enumerate(SLOTS):
+            if _on_face(slot, normal):
+                quarter[SLOT_INDEX[_turn_slot(slot, normal)]] = j
+        double = [quarter[i] for i in quarter]
+        perms[face] = quarter
+        perms[face + "2"] = double
+        perms[face + "'"] = [quarter[i] for i in double]
+    return perms
+
+
+SLOT_PERMUTATIONS = _build_slot_permutations()
+
+# Slot indexes of the 9 cubies in each face layer.
+FACE_LAYERS = dict(
+    (face, [i for i, slot in enumerate(SLOTS) if _on_face(slot, normal)])
+    for face, normal in FACE_NORMALS.items()
+)
+
+IDENTITY = ((1, 0, 0), (0, 1, 0), (0, 0, 1))
+
+
+def _mat_mul(a, b):
+    return tuple(
+        tuple(sum(a[r][k] * b[k][c] for k in range(3)) for c in range(3))
+        for r in range(3)
+    )
+
+
+def _build_move_matrices():
+    # Integer rotation matrix of every move, columns = images of the axes.
+    matrices = {}
+    for face, normal in FACE_NORMALS.items():
+        columns = [_turn_slot(axis, normal) for axis in IDENTITY]
+        quarter = tuple(tuple(columns[c][r] for c in range(3)) for r in range(3))
+        double = _mat_mul(quarter, quarter)
+        matrices[face] = quarter
+        matrices[face + "2"] = double
+        matrices[face + "'"] = _mat_mul(double, quarter)
+    return matrices
+
+
+MOVE_MATRICES = _build_move_matrices()
 
 
 def _get_center(element):
@@ -48,7 +232,75 @@ def _get_comments(element):
     return (p.AsString() or p.AsValueString() or "").strip()
 
 
-def _collect_target_cubies(doc):
+def _cached_schema(guid, build):
+    # Schemas are session-wide, so each is looked up or built once.
+    key = str(guid)
+    schema = _schemas.get(key)
+    if schema is None or not schema.IsValidObject:
+        schema = Schema.Lookup(guid) or build()
+        _schemas[key] = schema
+    return schema
+
+
+def _get_tag_schema():
+    return _cached_schema(TAG_SCHEMA_GUID, _build_tag_schema)
+
+
+def _build_tag_schema():
+    builder = SchemaBuilder(TAG_SCHEMA_GUID)
+    builder.SetSchemaName("RubiksCubeCubie")
+    builder.SetReadAccessLevel(AccessLevel.Public)
+    builder.SetWriteAccessLevel(AccessLevel.Public)
+    builder.AddSimpleField(FIELD_CUBE_ID, String)
+    builder.AddSimpleField(FIELD_HOME_SLOT, Int32)
+    return builder.Finish()
+
+
+def _read_tag(elem):
+    ent = elem.GetEntity(_get_tag_schema())
+    if not ent or not ent.IsValid():
+        return None
+    try:
+        return {
+            "cube_id": ent.Get[String](FIELD_CUBE_ID),
+            "home_slot": ent.Get[Int32](FIELD_HOME_SLOT),
+        }
+    except Exception:
+        return None
+
+
+def _stamp_cubie(elem, cube_id, home_slot):
+    schema = _get_tag_schema()
+    ent = Entity(schema)
+    ent.Set[String](schema.GetField(FIELD_CUBE_ID), cube_id)
+    ent.Set[Int32](schema.GetField(FIELD_HOME_SLOT), home_slot)
+    elem.SetEntity(ent)
+
+
+def _cube_label(comments):
+    # Cube name in a cubie's Comments: "" for plain "Cubeys", "A" for
+    # "Cubeys:A", None when the Comments do not mark a cubie.
+    head, _, name = comments.partition(":")
+    if head.strip().lower() != TARGET_COMMENTS.lower():
+        return None
+    return name.strip()
+
+
+def cube_comments(name):
+    return "{}:{}".format(TARGET_COMMENTS, name) if name else TARGET_COMMENTS
+
+
+def _cubie_entries(elems):
+    out = []
+    for elem in elems:
+        center = _get_center(elem)
+        if not center:
+            continue
+        out.append((elem, center, _get_mark(elem)))
+    return out
+
+
+def _commented_elements(doc):
     # Restrict scope to the dedicated Rubik cubies only.
     elems = (
         FilteredElementCollector(doc)
@@ -56,17 +308,453 @@ def _collect_target_cubies(doc):
         .WhereElementIsNotElementType()
         .ToElements()
     )
-    out = []
+    return [
+        elem for elem in elems
+        if isinstance(elem, DirectShape)
+        and _cube_label(_get_comments(elem)) is not None
+    ]
+
+
+def _collect_commented_cubies(doc):
+    return _cubie_entries(_commented_elements(doc))
+
+
+def cube_names(doc):
+    # Names in use in cubie Comments; reads no geometry, so it stays cheap.
+    elems = (
+        FilteredElementCollector(doc)
+        .OfClass(DirectShape)
+        .WhereElementIsNotElementType()
+        .ToElements()
+    )
+    names = set(_cube_label(_get_comments(elem)) for elem in elems)
+    names.discard(None)
+    return names
+
+
+def _group_commented_cubies(doc):
+    # Comments name -> cubie entries; Initialize forms one cube per name.
+    groups = {}
+    for entry in _collect_commented_cubies(doc):
+        groups.setdefault(_cube_label(_get_comments(entry[0])), []).append(entry)
+    return groups
+
+
+def _tagged_elements(doc):
+    # Server-side filter: cost follows the tagged cubies, not the model size.
+    return list(
+        FilteredElementCollector(doc)
+        .OfClass(DirectShape)
+        .WherePasses(ExtensibleStorageFilter(_get_tag_schema().GUID))
+        .ToElements()
+    )
+
+
+def _collect_tagged_cubies(doc):
+    return _cubie_entries(_tagged_elements(doc))
+
+
+def _collect_target_cubies(doc):
+    # Tagged cubies plus the untagged ones named in Comments, so a cube
+    # added after Initialize is listed before it is initialized too.
+    elems = _tagged_elements(doc)
+    tagged = set(elem.Id for elem in elems)
+    elems.extend(elem for elem in _commented_elements(doc) if elem.Id not in tagged)
+    return _cubie_entries(elems)
+
+
+def _cubie_cube_key(elem):
+    # Tagged cubies belong to the cube in their tag, untagged ones to the
+    # cube named in their Comments; None when elem is not a cubie.
+    tag = _read_tag(elem)
+    if tag is not None:
+        return tag["cube_id"]
+    label = _cube_label(_get_comments(elem))
+    return None if label is None else cube_comments(label)
+
+
+def _is_target_cubie(elem):
+    if not isinstance(elem, DirectShape):
+        return False
+    return _cubie_cube_key(elem) is not None
+
+
+def _get_cube_schema():
+    return _cached_schema(CUBE_SCHEMA_GUID, _build_cube_schema)
+
+
+def _build_cube_schema():
+    builder = SchemaBuilder(CUBE_SCHEMA_GUID)
+    builder.SetSchemaName("RubiksCubeInstance")
+    builder.SetReadAccessLevel(AccessLevel.Public)
+    builder.SetWriteAccessLevel(AccessLevel.Public)
+    builder.AddSimpleField(FIELD_CUBE_ID, String)
+    builder.AddSimpleField(FIELD_CUBE_NAME, String)
+    # "x y z size" in feet. Double fields need a unit spec, and that API
+    # differs between Revit versions.
+    builder.AddSimpleField(FIELD_PLACEMENT, String)
+    return builder.Finish()
+
+
+def _read_cube_record(host):
+    if not isinstance(host, DataStorage):
+        return None
+    ent = host.GetEntity(_get_cube_schema())
+    if not ent or not ent.IsValid():
+        return None
+    try:
+        x, y, z, size = [float(v) for v in ent.Get[String](FIELD_PLACEMENT).split()]
+        return {
+            "id": ent.Get[String](FIELD_CUBE_ID),
+            "name": ent.Get[String](FIELD_CUBE_NAME),
+            "origin": XYZ(x, y, z),
+            "size": size,
+            "host": host,
+        }
+    except Exception:
+        return None
+
+
+def _record_signature(record):
+    origin = record["origin"]
+    return (record["id"], record["name"], origin.X, origin.Y, origin.Z, record["size"])
+
+
+def _save_cube_record(cube):
+    schema = _get_cube_schema()
+    origin = cube["origin"]
+    ent = Entity(schema)
+    ent.Set[String](schema.GetField(FIELD_CUBE_ID), cube["id"])
+    ent.Set[String](schema.GetField(FIELD_CUBE_NAME), cube["name"])
+    ent.Set[String](
+        schema.GetField(FIELD_PLACEMENT),
+        " ".join(repr(float(v)) for v in (origin.X, origin.Y, origin.Z, cube["size"])),
+    )
+    cube["host"].SetEntity(ent)
+
+
+def _collect_cube_records(doc):
+    # cube id -> record of every cube initialized with per-cube storage.
+    elems = (
+        FilteredElementCollector(doc)
+        .OfClass(DataStorage)
+        .WherePasses(ExtensibleStorageFilter(_get_cube_schema().GUID))
+        .ToElements()
+    )
+    records = {}
     for elem in elems:
-        if not isinstance(elem, DirectShape):
-            continue
-        if _get_comments(elem).lower() != TARGET_COMMENTS.lower():
-            continue
-        center = _get_center(elem)
-        if not center:
-            continue
-        out.append((elem, center, _get_mark(elem)))
-    return out
+        record = _read_cube_record(elem)
+        if record is not None:
+            records[record["id"]] = record
+    return records
+
+
+def _placement_from_cubies(cubies):
+    # Origin and cubie size from the 26 centers: the shell is symmetric, so
+    # the mean is its center, and every cubie lies one cubie size from it
+    # along its farthest axis.
+    centers = [center or _get_center(elem) for elem, center, _ in cubies]
+    n = float(len(centers))
+    origin = XYZ(
+        sum(c.X for c in centers) / n,
+        sum(c.Y for c in centers) / n,
+        sum(c.Z for c in centers) / n,
+    )
+    size = sum(
+        max(abs(c.X - origin.X), abs(c.Y - origin.Y), abs(c.Z - origin.Z))
+        for c in centers
+    ) / n
+    return origin, size
+
+
+def _has_project_state(doc):
+    # A v4 or v3 state on ProjectInformation, saved before per-cube records.
+    host = doc.ProjectInformation
+    for guid in (SCHEMA_GUID, LEGACY_SCHEMA_GUID):
+        schema = Schema.Lookup(guid)
+        if schema:
+            ent = host.GetEntity(schema)
+            if ent and ent.IsValid():
+                return True
+    return False
+
+
+def _legacy_cube(doc, cube_id):
+    # Cube initialized before per-cube records: its state stays on
+    # ProjectInformation, around the internal origin, until Initialize.
+    return {
+        "id": cube_id,
+        "name": "",
+        "origin": XYZ(0, 0, 0),
+        "size": CUBIE_SIZE_FT,
+        "host": doc.ProjectInformation,
+    }
+
+
+class _CubieIndex(object):
+    # Session cache of the cubies of one document, grouped by cube. The full
+    # collector scan runs once; DocumentChanged then refreshes only the
+    # tracked cubies that were modified and drops the index when the cubie
+    # set, the cube of a cubie or a cube record may have changed. Closing
+    # the document detaches the index and removes it from the AppDomain.
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.stamp = _SOURCE_STAMP
+        # One bound method each, so the same delegates are added and removed.
+        self._changed_handler = self.on_document_changed
+        self._closing_handler = self.on_document_closing
+        self.invalidate()
+
+    def attach(self):
+        app = self.doc.Application
+        app.DocumentChanged += self._changed_handler
+        app.DocumentClosing += self._closing_handler
+
+    def detach(self):
+        app = self.doc.Application
+        app.DocumentChanged -= self._changed_handler
+        app.DocumentClosing -= self._closing_handler
+        self.invalidate()
+
+    def invalidate(self):
+        self.entries = None
+        self.groups = {}
+        self.keys = {}
+        self.records = {}
+        self.cube_list = None
+        self.stale = set()
+        self.marks_hashes = {}
+
+    @timed("collect")
+    def _rebuild(self):
+        self.invalidate()
+        self.entries = {}
+        for elem, center, mark in _collect_target_cubies(self.doc):
+            key = _cubie_cube_key(elem)
+            self.entries[elem.Id] = (elem, center, mark)
+            self.keys[elem.Id] = key
+            self.groups.setdefault(key, {})[elem.Id] = (elem, center, mark)
+        for record in _collect_cube_records(self.doc).values():
+            self.records[record["host"].Id] = record
+
+    def _refresh(self, elem_id):
+        # The center is not read here: moves find layers through the slot
+        # map, so a modified cubie keeps None until a caller needs it.
+        elem = self.doc.GetElement(elem_id)
+        if elem is None or not elem.IsValidObject:
+            self.invalidate()
+            return
+        key = self.keys[elem_id]
+        if _cubie_cube_key(elem) != key:
+            # Left its cube or stopped being a cubie: regroup everything.
+            self.invalidate()
+            return
+        entry = (elem, None, _get_mark(elem))
+        self.entries[elem_id] = entry
+        self.groups[key][elem_id] = entry
+        self.marks_hashes.pop(key, None)
+
+    def _current(self):
+        if self.entries is None:
+            self._rebuild()
+        for elem_id in list(self.stale):
+            if self.entries is None:
+                break
+            if elem_id in self.entries:
+                self._refresh(elem_id)
+        if self.entries is None:
+            self._rebuild()
+        self.stale = set()
+
+    def cubies(self, key):
+        self._current()
+        group = self.groups.get(key, {})
+        for elem, _, _ in group.values():
+            if not elem.IsValidObject:
+                self._rebuild()
+                group = self.groups.get(key, {})
+                break
+        return list(group.values())
+
+    def cube_key_of(self, elem_id):
+        self._current()
+        return self.keys.get(elem_id)
+
+    def cubes(self):
+        self._current()
+        if self.cube_list is None:
+            by_id = dict((record["id"], record) for record in self.records.values())
+            # Tagged cubies without a record hold the state on
+            # ProjectInformation. Failing those, the untagged default
+            # "Cubeys" of a document saved by the original add-in do, as long
+            # as that state is there.
+            legacy = set(key for key in self.groups if key not in by_id and _cube_label(key) is None)
+            if not legacy and TARGET_COMMENTS in self.groups and _has_project_state(self.doc):
+                legacy.add(TARGET_COMMENTS)
+            cubes = []
+            for key, group in self.groups.items():
+                if key in by_id:
+                    cube = dict(by_id[key])
+                elif key in legacy:
+                    cube = _legacy_cube(self.doc, key)
+                else:
+                    # Not initialized yet: placement as the cubies stand.
+                    origin, size = _placement_from_cubies(list(group.values()))
+                    cube = {
+                        "id": None,
+                        "name": _cube_label(key),
+                        "origin": origin,
+                        "size": size or CUBIE_SIZE_FT,
+                        "host": None,
+                    }
+                cube["key"] = key
+                cubes.append(cube)
+            cubes.sort(key=lambda c: (c["name"].lower(), c["key"]))
+            self.cube_list = cubes
+        return list(self.cube_list)
+
+    def mark_hash(self, key):
+        # Recomputed only after the cube's cubie set or a cubie changed.
+        cubies = self.cubies(key)
+        if key not in self.marks_hashes:
+            self.marks_hashes[key] = _mark_hash([mark for _, _, mark in cubies])
+        return self.marks_hashes[key]
+
+    def on_document_changed(self, sender, args):
+        # Runs for every change in the session, so it only looks at the
+        # changed ids and never scans the document.
+        try:
+            if self.entries is None or not args.GetDocument().Equals(self.doc):
+                return
+            for elem_id in args.GetDeletedElementIds():
+                if elem_id in self.entries or elem_id in self.records:
+                    self.invalidate()
+                    return
+            for elem_id in args.GetModifiedElementIds():
+                if elem_id in self.entries:
+                    self.stale.add(elem_id)
+                elif elem_id in self.records:
+                    # Every move rewrites the state next to the record;
+                    # only a changed record matters here.
+                    record = _read_cube_record(self.doc.GetElement(elem_id))
+                    if record is None or _record_signature(record) != _record_signature(self.records[elem_id]):
+                        self.invalidate()
+                        return
+                elif _is_target_cubie(self.doc.GetElement(elem_id)):
+                    self.invalidate()
+                    return
+            for elem_id in args.GetAddedElementIds():
+                elem = self.doc.GetElement(elem_id)
+                if _is_target_cubie(elem) or _read_cube_record(elem) is not None:
+                    self.invalidate()
+                    return
+        except Exception:
+            self.invalidate()
+
+    def on_document_closing(self, sender, args):
+        if not args.Document.Equals(self.doc):
+            return
+        self.detach()
+        _active_cubes.pop(self.doc, None)
+        indexes = AppDomain.CurrentDomain.GetData(INDEX_SLOT)
+        if indexes is not None and indexes.get(self.doc) is self:
+            del indexes[self.doc]
+
+
+def _get_cubie_index(doc):
+    # Script engines do not share module globals between clicks, so the
+    # indexes live on the AppDomain together with their event handlers.
+    # They are keyed by the document itself: Document.Equals tells apart
+    # documents whose hash codes collide.
+    domain = AppDomain.CurrentDomain
+    indexes = domain.GetData(INDEX_SLOT)
+    if indexes is None:
+        indexes = {}
+        domain.SetData(INDEX_SLOT, indexes)
+
+    index = indexes.get(doc)
+    if index is None or index.stamp != _SOURCE_STAMP:
+        # Indexes built before an extension reload run the old code.
+        for old_doc, old in list(indexes.items()):
+            if getattr(old, "stamp", None) != _SOURCE_STAMP:
+                if hasattr(old, "detach"):
+                    old.detach()
+                del indexes[old_doc]
+        index = _CubieIndex(doc)
+        index.attach()
+        indexes[doc] = index
+    return index
+
+
+def invalidate_cubie_index(doc):
+    _get_cubie_index(doc).invalidate()
+
+
+def list_cubes(doc):
+    # Every cube of the document from one grouped collector pass, as dicts
+    # with key, id, name, origin, size and host (None before Initialize).
+    return _get_cubie_index(doc).cubes()
+
+
+def cube_name(cube):
+    return cube["name"] or "Cube"
+
+
+def _selected_ids(doc):
+    try:
+        from pyrevit import revit
+        uidoc = revit.uidoc
+        if uidoc is None or not uidoc.Document.Equals(doc):
+            return set()
+        return set(uidoc.Selection.GetElementIds())
+    except Exception:
+        return set()
+
+
+def _selected_cube_keys(doc, index):
+    keys = set(index.cube_key_of(elem_id) for elem_id in _selected_ids(doc))
+    keys.discard(None)
+    return keys
+
+
+def active_cube(doc, exitscript_on_error=True):
+    # The cube whose cubies are selected, else the cube last worked on, else
+    # the only cube of the document. None when there is no cube at all.
+    index = _get_cubie_index(doc)
+    cubes = index.cubes()
+    by_key = dict((cube["key"], cube) for cube in cubes)
+    selected = _selected_cube_keys(doc, index)
+    if len(selected) > 1:
+        msg = "The selection holds cubies of {} cubes. Select cubies of one cube only.".format(len(selected))
+        if exitscript_on_error:
+            forms.alert(msg, exitscript=True)
+        raise Exception(msg)
+
+    if selected:
+        key = selected.pop()
+    elif _active_cubes.get(doc) in by_key:
+        key = _active_cubes[doc]
+    elif len(cubes) == 1:
+        key = cubes[0]["key"]
+    elif not cubes:
+        return None
+    else:
+        msg = "This model holds {} cubes. Select a cubie of the cube to work on.".format(len(cubes))
+        if exitscript_on_error:
+            forms.alert(msg, exitscript=True)
+        raise Exception(msg)
+    _active_cubes[doc] = key
+    return by_key[key]
+
+
+def set_active_cube(doc, cube):
+    # Make cube the one buttons work on while nothing is selected.
+    _active_cubes[doc] = cube["key"]
+
+
+def _resolve_cube(doc, cube, exitscript_on_error=False):
+    return cube if cube is not None else active_cube(doc, exitscript_on_error)
 
 
 def _solved_config():
@@ -108,113 +796,894 @@ def _project_key(doc):
     return "title:{}|proj:{}".format((doc.Title or "").strip().lower(), proj_uid)
 
 
-def _nearest_grid_value(value):
-    candidates = (-CUBIE_SIZE_FT, 0.0, CUBIE_SIZE_FT)
-    best = min(candidates, key=lambda c: abs(value - c))
-    if abs(value - best) > GRID_TOLERANCE_FT:
-        return None
-    return best
+def _grid_slot(point, cube):
+    # Slot of a point in the cube's -1/0/+1 grid, or None when off the grid.
+    origin, size = cube["origin"], cube["size"]
+    slot = []
+    for value in ((point.X - origin.X) / size, (point.Y - origin.Y) / size, (point.Z - origin.Z) / size):
+        nearest = int(round(value))
+        if abs(nearest) > 1 or abs(value - nearest) > GRID_TOLERANCE:
+            return None
+        slot.append(nearest)
+    return tuple(slot)
 
 
-def _grid_slot(point):
-    gx = _nearest_grid_value(point.X)
-    gy = _nearest_grid_value(point.Y)
-    gz = _nearest_grid_value(point.Z)
-    if gx is None or gy is None or gz is None:
-        return None
-    return (gx, gy, gz)
+def slot_point(cube, slot):
+    origin, size = cube["origin"], cube["size"]
+    return XYZ(origin.X + slot[0] * size, origin.Y + slot[1] * size, origin.Z + slot[2] * size)
+
+
+def _get_coord_modules():
+    # Cubie-level cube and the Kociemba search, for state kept as coordinates.
+    _get_solver_modules()
+    from rubik_solver.CubieCube import CubieCube
+    from rubik_solver.Solver.Kociemba.Search import Search
+    return CubieCube, Search
+
+
+def _cubie_from_coords(coords):
+    CubieCube, _ = _get_coord_modules()
+    cc = CubieCube()
+    corners, twist, edges, flip = coords
+    cc.setURFtoDLB(corners)
+    cc.setTwist(twist)
+    cc.setURtoBR(edges)
+    cc.setFlip(flip)
+    return cc
+
+
+def _coords_from_cubie(cc):
+    return (cc.getURFtoDLB(), cc.getTwist(), cc.getURtoBR(), cc.getFlip())
+
+
+def _coords_from_config(config):
+    # Raises for configs no legal sequence of moves can reach.
+    _, _, NaiveCube, _ = _get_solver_modules()
+    nc = NaiveCube()
+    nc.set_cube(config)
+    cc = nc.to_face_cube().toCubieCube()
+    cc.verify()
+    return _coords_from_cubie(cc)
+
+
+def _config_from_coords(coords):
+    _, _, NaiveCube, _ = _get_solver_modules()
+    nc = NaiveCube()
+    nc.from_face_cube(_cubie_from_coords(coords).toFaceCube())
+    return nc.get_cube()
+
+
+@timed("move_coords")
+def _move_coords(coords, moves):
+    # Moves act on the cubie level directly: a quarter turn is one multiply.
+    CubieCube, _ = _get_coord_modules()
+    cc = _cubie_from_coords(coords)
+    for move in moves:
+        turn = CubieCube.moveCube[COORD_AXES.index(move[0])]
+        for _ in range(2 if move.endswith("2") else 3 if move.endswith("'") else 1):
+            cc.cornerMultiply(turn)
+            cc.edgeMultiply(turn)
+    return _coords_from_cubie(cc)
+
+
+def state_config(state):
+    # Facelet config of a state, for display, geometry checks and the worker.
+    if "config" not in state:
+        state["config"] = _config_from_coords(state["coords"])
+    return state["config"]
+
+
+def _mark_hash(marks):
+    # Stable across sessions and runtimes, unlike hash(); stored as Int32.
+    value = binascii.crc32("|".join(sorted(marks)).encode("utf-8")) & 0xFFFFFFFF
+    return value - 0x100000000 if value >= 0x80000000 else value
 
 
 def _get_schema():
-    # Reuse schema if it already exists in the document session.
-    schema = Schema.Lookup(SCHEMA_GUID)
-    if schema:
-        return schema
+    return _cached_schema(SCHEMA_GUID, _build_schema)
 
+
+def _build_schema():
     builder = SchemaBuilder(SCHEMA_GUID)
-    builder.SetSchemaName("RubiksCubeState")
+    builder.SetSchemaName("RubiksCubeStateV4")
     builder.SetReadAccessLevel(AccessLevel.Public)
     builder.SetWriteAccessLevel(AccessLevel.Public)
-    builder.AddSimpleField(FIELD_CONFIG, String)
-    builder.AddSimpleField(FIELD_SIGNATURE, String)
+    for name in COORD_FIELDS:
+        builder.AddSimpleField(name, Int32)
+    builder.AddSimpleField(FIELD_MARK_HASH, Int32)
     builder.AddSimpleField(FIELD_PROJECT_KEY, String)
     return builder.Finish()
 
 
-def _get_state_host(doc):
-    # ProjectInformation exists in all projects and is transaction/undo aware.
-    return doc.ProjectInformation
+def _get_state_fields():
+    # Schema and Field handles are session-wide, so they are looked up once.
+    global _state_fields
+    if _state_fields is None or not _state_fields["schema"].IsValidObject:
+        schema = _get_schema()
+        fields = dict((name, schema.GetField(name)) for name in COORD_FIELDS)
+        fields[FIELD_MARK_HASH] = schema.GetField(FIELD_MARK_HASH)
+        fields[FIELD_PROJECT_KEY] = schema.GetField(FIELD_PROJECT_KEY)
+        fields["schema"] = schema
+        _state_fields = fields
+    return _state_fields
+
+
+def _get_state_host(doc, cube):
+    # The cube's DataStorage element, or ProjectInformation for a cube
+    # initialized before per-cube records. Both are transaction/undo aware.
+    if cube is None or cube["host"] is None:
+        return None
+    return cube["host"]
+
+
+def _require_state_host(doc, cube):
+    host = _get_state_host(doc, cube)
+    if host is None:
+        raise Exception("State is not initialized. Click 'Initialize' before rotating or solving.")
+    return host
 
 
-def _load_state(doc):
-    # Read persisted state from ProjectInformation extensible storage.
-    schema = _get_schema()
-    host = _get_state_host(doc)
+def _load_legacy_state(host):
+    # v3 entity, converted in memory; the next save writes v4 and drops it.
+    schema = Schema.Lookup(LEGACY_SCHEMA_GUID)
+    if not schema:
+        return None
     ent = host.GetEntity(schema)
     if not ent or not ent.IsValid():
         return None
-
-    # Pull fields from the Entity's own schema to avoid mismatches with
-    # stale/legacy schema objects after upgrades or undo/redo boundaries.
-    ent_schema = ent.Schema
-    if ent_schema is None:
+    try:
+        config = ent.Get[String](FIELD_CONFIG)
+        signature = ent.Get[String](FIELD_SIGNATURE)
+        project_key = ent.Get[String](FIELD_PROJECT_KEY)
+        coords = _coords_from_config(config)
+    except Exception:
         return None
+    return {
+        "coords": coords,
+        "mark_hash": _mark_hash(signature.split("|")),
+        "project_key": project_key,
+        "legacy": True,
+    }
+
 
-    field_config = ent_schema.GetField(FIELD_CONFIG)
-    field_sig = ent_schema.GetField(FIELD_SIGNATURE)
-    field_proj = ent_schema.GetField(FIELD_PROJECT_KEY)
-    if field_config is None or field_sig is None or field_proj is None:
+@timed("load_state")
+def _load_state(doc, cube):
+    # Read the persisted state from the cube's extensible storage.
+    fields = _get_state_fields()
+    host = _get_state_host(doc, cube)
+    if host is None:
         return None
+    ent = host.GetEntity(fields["schema"])
+    if not ent or not ent.IsValid():
+        return _load_legacy_state(host)
 
     try:
-        config = ent.Get[String](field_config)
-        signature = ent.Get[String](field_sig)
-        project_key = ent.Get[String](field_proj)
+        coords = tuple(ent.Get[Int32](fields[name]) for name in COORD_FIELDS)
+        mark_hash = ent.Get[Int32](fields[FIELD_MARK_HASH])
+        project_key = ent.Get[String](fields[FIELD_PROJECT_KEY])
     except Exception:
         return None
 
     return {
-        "config": config,
-        "mark_signature": signature,
+        "coords": coords,
+        "mark_hash": mark_hash,
         "project_key": project_key,
     }
 
 
-def _save_state(doc, state):
+@timed("save_state")
+def _save_state(doc, cube, state):
     if not doc.IsModifiable:
         raise Exception("State save requires an open Revit transaction.")
 
-    schema = _get_schema()
-    host = _get_state_host(doc)
+    fields = _get_state_fields()
+    host = _require_state_host(doc, cube)
 
-    ent = Entity(schema)
-    ent.Set[String](schema.GetField(FIELD_CONFIG), state["config"])
-    ent.Set[String](schema.GetField(FIELD_SIGNATURE), state["mark_signature"])
-    ent.Set[String](schema.GetField(FIELD_PROJECT_KEY), state["project_key"])
+    ent = Entity(fields["schema"])
+    for name, value in zip(COORD_FIELDS, state["coords"]):
+        ent.Set[Int32](fields[name], value)
+    ent.Set[Int32](fields[FIELD_MARK_HASH], state["mark_hash"])
+    ent.Set[String](fields[FIELD_PROJECT_KEY], state["project_key"])
     host.SetEntity(ent)
 
+    # Only a state read from the v3 entity has one to drop.
+    if state.pop("legacy", False):
+        legacy = Schema.Lookup(LEGACY_SCHEMA_GUID)
+        if legacy:
+            host.DeleteEntity(legacy)
 
-def _build_cube_from_config(config):
-    # Build Cubie representation from the stored 54-char facelet config.
-    Cube, _, NaiveCube, _ = _get_solver_modules()
-    nc = NaiveCube()
-    nc.set_cube(config)
-    c = Cube()
-    c.from_naive_cube(nc)
-    return c
+
+def _get_slot_schema():
+    return _cached_schema(SLOT_SCHEMA_GUID, _build_slot_schema)
+
+
+def _build_slot_schema():
+    builder = SchemaBuilder(SLOT_SCHEMA_GUID)
+    builder.SetSchemaName("RubiksCubeSlots")
+    builder.SetReadAccessLevel(AccessLevel.Public)
+    builder.SetWriteAccessLevel(AccessLevel.Public)
+    builder.AddSimpleField(FIELD_SLOT_MARKS, String)
+    builder.AddSimpleField(FIELD_MOVES_SINCE_CHECK, Int32)
+    return builder.Finish()
+
+
+@timed("load_slot_map")
+def _load_slot_map(doc, cube):
+    # Slot map lives next to the state on the cube's storage element.
+    host = _get_state_host(doc, cube)
+    if host is None:
+        return None
+    ent = host.GetEntity(_get_slot_schema())
+    if not ent or not ent.IsValid():
+        return None
+
+    ent_schema = ent.Schema
+    field_marks = ent_schema.GetField(FIELD_SLOT_MARKS)
+    field_moves = ent_schema.GetField(FIELD_MOVES_SINCE_CHECK)
+    if field_marks is None or field_moves is None:
+        return None
+
+    try:
+        marks = ent.Get[String](field_marks).split("|")
+        moves = ent.Get[Int32](field_moves)
+    except Exception:
+        return None
+
+    if len(marks) != len(SLOTS):
+        return None
+    return {"marks": marks, "moves_since_check": moves}
+
+
+@timed("save_slot_map")
+def _save_slot_map(doc, cube, slot_map):
+    if not doc.IsModifiable:
+        raise Exception("Slot map save requires an open Revit transaction.")
+
+    schema = _get_slot_schema()
+    ent = Entity(schema)
+    ent.Set[String](schema.GetField(FIELD_SLOT_MARKS), "|".join(slot_map["marks"]))
+    ent.Set[Int32](schema.GetField(FIELD_MOVES_SINCE_CHECK), slot_map["moves_since_check"])
+    _require_state_host(doc, cube).SetEntity(ent)
+
+
+def _get_history_schema():
+    return _cached_schema(HISTORY_SCHEMA_GUID, _build_history_schema)
+
+
+def _build_history_schema():
+    builder = SchemaBuilder(HISTORY_SCHEMA_GUID)
+    builder.SetSchemaName("RubiksCubeHistory")
+    builder.SetReadAccessLevel(AccessLevel.Public)
+    builder.SetWriteAccessLevel(AccessLevel.Public)
+    builder.AddArrayField(FIELD_HISTORY_MOVES, Byte)
+    return builder.Finish()
+
+
+def _encode_turn(face, amount):
+    # One byte per move: 3 * Kociemba axis + quarter turns - 1, as in Search.
+    return 3 * COORD_AXES.index(face) + amount - 1
+
+
+def _decode_turn(code):
+    return COORD_AXES[code // 3], code % 3 + 1
+
+
+def _move_turn(move):
+    return move[0], 2 if move.endswith("2") else 3 if move.endswith("'") else 1
 
 
-def collect_target_cubies(doc):
-    return _collect_target_cubies(doc)
+def _turn_move(face, amount):
+    return face + ("", "2", "'")[amount - 1]
 
 
-def ensure_state(doc, exitscript_on_error=True, require_initialized=False):
+def _load_history(doc, cube):
+    host = _get_state_host(doc, cube)
+    if host is None:
+        return []
+    ent = host.GetEntity(_get_history_schema())
+    if not ent or not ent.IsValid():
+        return []
+    try:
+        return [int(code) for code in ent.Get[IList[Byte]](FIELD_HISTORY_MOVES)]
+    except Exception:
+        return []
+
+
+def _save_history(doc, cube, codes):
+    schema = _get_history_schema()
+    ent = Entity(schema)
+    ent.Set[IList[Byte]](schema.GetField(FIELD_HISTORY_MOVES), List[Byte](codes))
+    _require_state_host(doc, cube).SetEntity(ent)
+
+
+@timed("save_history")
+def _append_history(doc, cube, moves, coords):
+    # Written in the move's own transaction, so Undo/Redo keep it in step
+    # with the state. Reaching solved leaves nothing to undo.
+    if coords == SOLVED_COORDS:
+        _save_history(doc, cube, [])
+        return
+    from rubik_solver.Optimizer import cancel_moves
+
+    codes = _load_history(doc, cube) + [_encode_turn(*_move_turn(m)) for m in moves]
+    if len(codes) > HISTORY_LIMIT:
+        codes = [_encode_turn(face, amount) for face, amount in cancel_moves(_decode_turn(c) for c in codes)]
+        if len(codes) > HISTORY_LIMIT:
+            codes = []
+    _save_history(doc, cube, codes)
+
+
+def history_solution(doc, state):
+    # Simplified inverse of the move log, or None when the log does not
+    # lead from solved to the saved cube. Callers keep it unless a search
+    # finds a shorter solution.
+    from rubik_solver.Optimizer import cancel_moves
+
+    turns = [_decode_turn(code) for code in _load_history(doc, state["cube"])]
+    if _move_coords(SOLVED_COORDS, [_turn_move(*turn) for turn in turns]) != state["coords"]:
+        return None
+    inverse = cancel_moves((face, 4 - amount) for face, amount in reversed(turns))
+    return [_turn_move(*turn) for turn in inverse]
+
+
+def _get_solution_schema():
+    return _cached_schema(SOLUTION_SCHEMA_GUID, _build_solution_schema)
+
+
+def _build_solution_schema():
+    builder = SchemaBuilder(SOLUTION_SCHEMA_GUID)
+    builder.SetSchemaName("RubiksCubeSolution")
+    builder.SetReadAccessLevel(AccessLevel.Public)
+    builder.SetWriteAccessLevel(AccessLevel.Public)
+    builder.AddArrayField(FIELD_SOLUTION_START, Int32)
+    builder.AddArrayField(FIELD_SOLUTION_MOVES, Byte)
+    builder.AddSimpleField(FIELD_SOLUTION_CURSOR, Int32)
+    builder.AddArrayField(FIELD_SOLUTION_EXPECTED, Int32)
+    return builder.Finish()
+
+
+def _load_solution(doc, cube):
+    # Solution being stepped through: the coordinates it was computed for,
+    # its moves in history encoding, and the cursor with the coordinates
+    # the cube must have there for the solution to still apply.
+    host = _get_state_host(doc, cube)
+    if host is None:
+        return None
+    ent = host.GetEntity(_get_solution_schema())
+    if not ent or not ent.IsValid():
+        return None
+    try:
+        return {
+            "start": tuple(int(v) for v in ent.Get[IList[Int32]](FIELD_SOLUTION_START)),
+            "moves": [int(code) for code in ent.Get[IList[Byte]](FIELD_SOLUTION_MOVES)],
+            "cursor": ent.Get[Int32](FIELD_SOLUTION_CURSOR),
+            "expected": tuple(int(v) for v in ent.Get[IList[Int32]](FIELD_SOLUTION_EXPECTED)),
+            "cube": cube,
+        }
+    except Exception:
+        return None
+
+
+def _save_solution(doc, plan):
+    schema = _get_solution_schema()
+    ent = Entity(schema)
+    ent.Set[IList[Int32]](schema.GetField(FIELD_SOLUTION_START), List[Int32](plan["start"]))
+    ent.Set[IList[Byte]](schema.GetField(FIELD_SOLUTION_MOVES), List[Byte](plan["moves"]))
+    ent.Set[Int32](schema.GetField(FIELD_SOLUTION_CURSOR), plan["cursor"])
+    ent.Set[IList[Int32]](schema.GetField(FIELD_SOLUTION_EXPECTED), List[Int32](plan["expected"]))
+    _require_state_host(doc, plan["cube"]).SetEntity(ent)
+
+
+def remember_solution(coords, moves):
+    # Session memo for solutions found outside a transaction, e.g. by the
+    # background solve; they reach the document with the next Next Move.
+    if len(_solutions) >= SOLUTION_MEMO_SIZE:
+        _solutions.clear()
+    _solutions[tuple(coords)] = list(moves)
+
+
+def cached_solution(doc, state):
+    # Remaining moves of the stored solution if the cube is where its
+    # cursor expects it, else a solution remembered this session.
+    plan = _load_solution(doc, state["cube"])
+    if plan is not None and plan["expected"] == state["coords"]:
+        return [_turn_move(*_decode_turn(code)) for code in plan["moves"][plan["cursor"]:]]
+    moves = _solutions.get(state["coords"])
+    return list(moves) if moves is not None else None
+
+
+def solution_plan(doc, state):
+    # Plan for Next Move. Continues the stored solution while the cube is
+    # still on it and only solves otherwise. Nothing is written here, so
+    # a search runs outside the transaction.
+    plan = _load_solution(doc, state["cube"])
+    if plan is not None and plan["expected"] == state["coords"] and plan["cursor"] < len(plan["moves"]):
+        return plan
+    moves = parse_moves(solve_current(doc, cube=state["cube"]))
+    return {
+        "start": state["coords"],
+        "moves": [_encode_turn(*_move_turn(m)) for m in moves],
+        "cursor": 0,
+        "expected": state["coords"],
+        "cube": state["cube"],
+    }
+
+
+def advance_solution(doc, plan):
+    # Play the move at the cursor and store the plan, in the caller's
+    # transaction so Undo restores cube and cursor together.
+    move = _turn_move(*_decode_turn(plan["moves"][plan["cursor"]]))
+    plan["expected"] = rotate_layer(doc, move, cube=plan["cube"])
+    plan["cursor"] += 1
+    _save_solution(doc, plan)
+    return move
+
+
+@timed("slots_from_geometry")
+def _slot_marks_from_geometry(cubies, cube):
+    # Read fresh centers: index entries may predate an open transaction.
+    marks = [None] * len(SLOTS)
+    for elem, _, mark in cubies:
+        center = _get_center(elem)
+        slot = _grid_slot(center, cube) if center else None
+        if slot is None:
+            return None
+        i = SLOT_INDEX.get(slot)
+        if i is None or marks[i] is not None:
+            return None
+        marks[i] = mark
+    if any(m is None for m in marks):
+        return None
+    return marks
+
+
+def _slot_map_matches(slot_map, cubies):
+    if not slot_map:
+        return False
+    return sorted(slot_map["marks"]) == sorted(m for _, _, m in cubies)
+
+
+def verify_slot_map(doc, cube=None):
+    # On-demand geometric check: returns Marks whose cubie left its tracked slot.
+    cube = _resolve_cube(doc, cube)
+    cubies = collect_target_cubies(doc, cube)
+    slot_map = _load_slot_map(doc, cube)
+    if not _slot_map_matches(slot_map, cubies):
+        return None
+    tracked = dict((mark, SLOTS[i]) for i, mark in enumerate(slot_map["marks"]))
+    drifted = []
+    for elem, _, mark in cubies:
+        center = _get_center(elem)
+        if center is None or _grid_slot(center, cube) != tracked[mark]:
+            drifted.append(mark)
+    return sorted(drifted)
+
+
+def layer_cubies(doc, face, exitscript_on_error=True, cube=None):
+    # O(9) lookup of the cubies in a face layer from the persisted slot map.
+    cube = _resolve_cube(doc, cube, exitscript_on_error)
+    cubies = collect_target_cubies(doc, cube)
+    by_mark = dict((mark, elem) for elem, _, mark in cubies)
+    slot_map = _load_slot_map(doc, cube)
+
+    if not _slot_map_matches(slot_map, cubies):
+        # State initialized before slot tracking: derive the map once.
+        marks = _slot_marks_from_geometry(cubies, cube)
+    elif slot_map["moves_since_check"] >= SLOT_VERIFY_INTERVAL:
+        marks = _slot_marks_from_geometry(cubies, cube)
+        if marks != slot_map["marks"]:
+            msg = (
+                "Cubie positions no longer match the tracked slots. "
+                "Click 'Initialize' to reset solver state."
+            )
+            if exitscript_on_error:
+                forms.alert(msg, exitscript=True)
+            raise Exception(msg)
+    else:
+        marks = slot_map["marks"]
+
+    if marks is None:
+        msg = "Cubies are not on the expected -1/0/+1 grid."
+        if exitscript_on_error:
+            forms.alert(msg, exitscript=True)
+        raise Exception(msg)
+
+    return [by_mark[marks[i]] for i in FACE_LAYERS[face]]
+
+
+def _apply_slot_move(doc, cube, move_notation):
+    # Called after the geometry moved, inside the same transaction.
+    cubies = collect_target_cubies(doc, cube)
+    slot_map = _load_slot_map(doc, cube)
+    if _slot_map_matches(slot_map, cubies):
+        perm = SLOT_PERMUTATIONS[move_notation]
+        old = slot_map["marks"]
+        slot_map["marks"] = [old[j] for j in perm]
+        slot_map["moves_since_check"] += 1
+    else:
+        doc.Regenerate()
+        marks = _slot_marks_from_geometry(cubies, cube)
+        if marks is None:
+            raise Exception("Cubies are not on the expected -1/0/+1 grid.")
+        slot_map = {"marks": marks, "moves_since_check": 0}
+    _snap_when_due(doc, cube, slot_map)
+    _save_slot_map(doc, cube, slot_map)
+
+
+def _snap_when_due(doc, cube, slot_map):
+    if slot_map["moves_since_check"] > SLOT_VERIFY_INTERVAL:
+        # Periodic re-placement keeps single-turn drift from accumulating.
+        snap_placement(doc, slot_map["marks"], cube=cube)
+        slot_map["moves_since_check"] = 0
+
+
+def _build_move_axes(origin):
+    # Axis through the cube origin along the face normal; clockwise seen
+    # from outside the face is a negative angle about it.
+    axes = {}
+    for move in SLOT_PERMUTATIONS:
+        nx, ny, nz = FACE_NORMALS[move[0]]
+        axis = Line.CreateBound(origin, origin + XYZ(nx * 10, ny * 10, nz * 10))
+        suffix = move[1:]
+        if suffix == "'":
+            axes[move] = (axis, QUARTER_TURN_RADIANS)
+        elif suffix == "2":
+            axes[move] = (axis, -2 * QUARTER_TURN_RADIANS)
+        else:
+            axes[move] = (axis, -QUARTER_TURN_RADIANS)
+    return axes
+
+
+def move_axis(move_notation, cube):
+    # Axis lines are built once per cube and kept on the cube dict.
+    axes = cube.get("axes")
+    if axes is None:
+        axes = cube["axes"] = _build_move_axes(cube["origin"])
+    return axes[move_notation]
+
+
+def rotate_layer(doc, move_notation, face_layer=None, cube=None):
+    # Rotate one layer with a single RotateElements call and record the move.
+    # Must run inside the caller's transaction so Undo stays consistent.
+    cube = _resolve_cube(doc, cube)
+    if face_layer is None:
+        face_layer = layer_cubies(doc, move_notation[0], exitscript_on_error=False, cube=cube)
+    axis, angle = move_axis(move_notation, cube)
+    ids = List[ElementId]([cubey.Id for cubey in face_layer])
+    with span("RotateElements"):
+        ElementTransformUtils.RotateElements(doc, ids, axis, angle)
+    return apply_move(doc, move_notation, cube=cube)
+
+
+def parse_moves(notation):
+    # Split "R U' F2" style notation into moves the slot tables know.
+    moves = notation.replace(u"\u2019", "'").split()
+    for move in moves:
+        if move not in SLOT_PERMUTATIONS:
+            raise Exception("Unsupported move '{}'.".format(move))
+    return moves
+
+
+def simplify_moves(moves):
+    # Merge turns of one face, also across turns of the opposite face, and
+    # drop the ones that cancel, e.g. U U' or U D U'.
+    from rubik_solver.Optimizer import cancel_moves
+    return [_turn_move(*turn) for turn in cancel_moves(_move_turn(m) for m in moves)]
+
+
+def compose_moves(moves):
+    # Net effect of a sequence: after it, slot i holds the cubie that started
+    # in slot origin[i], turned by the integer rotation matrix rotation[i].
+    origin = list(range(len(SLOTS)))
+    rotation = [IDENTITY] * len(SLOTS)
+    for move in moves:
+        perm = SLOT_PERMUTATIONS[move]
+        matrix = MOVE_MATRICES[move]
+        layer = FACE_LAYERS[move[0]]
+        origin = [origin[j] for j in perm]
+        rotation = [rotation[j] for j in perm]
+        for i in layer:
+            rotation[i] = _mat_mul(matrix, rotation[i])
+    return origin, rotation
+
+
+def _axis_angle(matrix):
+    # Axis and angle of an integer cube rotation (right-hand rule).
+    trace = matrix[0][0] + matrix[1][1] + matrix[2][2]
+    angle = math.acos(max(-1.0, min(1.0, (trace - 1) * 0.5)))
+    if trace == -1:
+        # Half turn: any non-zero column of (R + I) lies on the axis.
+        for c in range(3):
+            column = [matrix[r][c] + (1 if r == c else 0) for r in range(3)]
+            if any(column):
+                break
+    else:
+        column = [
+            matrix[2][1] - matrix[1][2],
+            matrix[0][2] - matrix[2][0],
+            matrix[1][0] - matrix[0][1],
+        ]
+    length = math.sqrt(sum(v * v for v in column))
+    return tuple(v / length for v in column), angle
+
+
+def apply_moves(doc, moves, cube=None, snap=True):
+    # Play a whole sequence inside the caller's transaction. Every cubie is
+    # placed once by its net rotation about the cube origin, and cubies
+    # sharing a rotation move together, so the API cost does not grow with
+    # the sequence length. State and slot map are written once at the end.
+    # With snap=False the cubies are only squared to the grid when the slot
+    # map's move count calls for it, as for single turns.
+    state = ensure_state(doc, exitscript_on_error=False, require_initialized=True, cube=cube)
+    cube = state["cube"]
+    cubies = collect_target_cubies(doc, cube)
+    by_mark = dict((mark, elem) for elem, _, mark in cubies)
+
+    slot_map = _load_slot_map(doc, cube)
+    if not _slot_map_matches(slot_map, cubies):
+        marks = _slot_marks_from_geometry(cubies, cube)
+        if marks is None:
+            raise Exception("Cubies are not on the expected -1/0/+1 grid.")
+        slot_map = {"marks": marks, "moves_since_check": 0}
+
+    origin, rotation = compose_moves(moves)
+    groups = {}
+    for i, matrix in enumerate(rotation):
+        if matrix != IDENTITY:
+            groups.setdefault(matrix, []).append(by_mark[slot_map["marks"][origin[i]]].Id)
+    with span("RotateElements"):
+        for matrix, ids in groups.items():
+            (ax, ay, az), angle = _axis_angle(matrix)
+            axis = Line.CreateBound(cube["origin"], cube["origin"] + XYZ(ax * 10, ay * 10, az * 10))
+            ElementTransformUtils.RotateElements(doc, List[ElementId](ids), axis, angle)
+
+    state["coords"] = _move_coords(state["coords"], moves)
+    _save_state(doc, cube, state)
+    _append_history(doc, cube, moves, state["coords"])
+    slot_map["marks"] = [slot_map["marks"][j] for j in origin]
+    if snap:
+        slot_map["moves_since_check"] = 0
+        snap_placement(doc, slot_map["marks"], cube=cube)
+    else:
+        # Each cubie turned once, so the batch adds the drift of one turn.
+        slot_map["moves_since_check"] += 1
+        _snap_when_due(doc, cube, slot_map)
+    _save_slot_map(doc, cube, slot_map)
+    return state["coords"]
+
+
+def _planar_faces(elem):
+    faces = []
+    for obj in elem.get_Geometry(Options()):
+        if isinstance(obj, GeometryInstance):
+            solids = obj.GetInstanceGeometry()
+        else:
+            solids = [obj]
+        for solid in solids:
+            if not isinstance(solid, Solid) or solid.Volume <= 0:
+                continue
+            for face in solid.Faces:
+                if isinstance(face, PlanarFace):
+                    faces.append(face)
+    return faces
+
+
+def _nearest_axis(v):
+    # Exact signed basis vector closest to v.
+    values = (v.X, v.Y, v.Z)
+    k = max(range(3), key=lambda i: abs(values[i]))
+    out = [0.0, 0.0, 0.0]
+    out[k] = 1.0 if values[k] > 0 else -1.0
+    return XYZ(*out)
+
+
+def _orientation_correction(elem):
+    # Small rotation taking the cubie's face normals exactly onto grid axes,
+    # as (axis, angle), or None when it is already aligned.
+    normals = [face.FaceNormal for face in _planar_faces(elem)]
+    if not normals:
+        return None
+    a = normals[0].Normalize()
+    b = None
+    for n in normals[1:]:
+        if abs(a.DotProduct(n)) < 0.5:
+            b = n
+            break
+    if b is None:
+        return None
+    b = (b - a * a.DotProduct(b)).Normalize()
+    c = a.CrossProduct(b)
+    ta = _nearest_axis(a)
+    tb = _nearest_axis(b)
+    tc = ta.CrossProduct(tb)
+
+    # R = T * A^T maps the measured frame onto the exact one.
+    def row(t_r, getter):
+        return (
+            t_r[0] * getter(a) + t_r[1] * getter(b) + t_r[2] * getter(c)
+        )
+
+    targets = [(ta.X, tb.X, tc.X), (ta.Y, tb.Y, tc.Y), (ta.Z, tb.Z, tc.Z)]
+    getters = (lambda v: v.X, lambda v: v.Y, lambda v: v.Z)
+    m = [[row(targets[r], getters[col]) for col in range(3)] for r in range(3)]
+    skew = XYZ(m[2][1] - m[1][2], m[0][2] - m[2][0], m[1][0] - m[0][1])
+    sin2 = skew.GetLength()
+    # atan2 keeps precision for the tiny angles drift produces.
+    angle = math.atan2(sin2, m[0][0] + m[1][1] + m[2][2] - 1)
+    if angle < SNAP_TOLERANCE_RAD or sin2 == 0:
+        return None
+    return skew * (1.0 / sin2), angle
+
+
+@timed("snap_placement")
+def snap_placement(doc, slot_marks=None, cube=None):
+    # Drift-free placement: put every cubie exactly on the center of its
+    # logical slot and square its faces to the grid axes. Must run inside a
+    # transaction; returns the number of cubies that were corrected.
+    cube = _resolve_cube(doc, cube)
+    cubies = collect_target_cubies(doc, cube)
+    if slot_marks is None:
+        slot_map = _load_slot_map(doc, cube)
+        if not _slot_map_matches(slot_map, cubies):
+            raise Exception("Slot map not found. Click 'Initialize' first.")
+        slot_marks = slot_map["marks"]
+
+    doc.Regenerate()
+    by_mark = dict((mark, elem) for elem, _, mark in cubies)
+    corrected = 0
+    for i, mark in enumerate(slot_marks):
+        elem = by_mark[mark]
+        center = _get_center(elem)
+        target = slot_point(cube, SLOTS[i])
+        if center is None or center.DistanceTo(target) > GRID_TOLERANCE * cube["size"]:
+            raise Exception("Cubie '{}' is not near its tracked slot.".format(mark))
+
+        changed = False
+        correction = _orientation_correction(elem)
+        if correction:
+            axis, angle = correction
+            line = Line.CreateBound(center, center + axis)
+            ElementTransformUtils.RotateElement(doc, elem.Id, line, angle)
+            changed = True
+        offset = target - center
+        if offset.GetLength() > SNAP_TOLERANCE_FT:
+            ElementTransformUtils.MoveElement(doc, elem.Id, offset)
+            changed = True
+        if changed:
+            corrected += 1
+    return corrected
+
+
+def _outer_face_materials(elem):
+    # Grid direction -> material of the outermost planar face pointing that
+    # way, so sticker solids win over the body face behind them.
+    best = {}
+    for face in _planar_faces(elem):
+        normal = face.FaceNormal
+        axis = _nearest_axis(normal)
+        if normal.DotProduct(axis) < 0.99:
+            continue
+        key = (int(axis.X), int(axis.Y), int(axis.Z))
+        offset = face.Origin.DotProduct(axis)
+        if key not in best or offset > best[key][0]:
+            best[key] = (offset, face.MaterialElementId)
+    return dict((key, material) for key, (_, material) in best.items())
+
+
+def _facelet_positions():
+    # (slot index, outward direction) of every config facelet, in config order.
+    Cube, _, _, _ = _get_solver_modules()
+    positions = []
+    for cubie, facing in Cube.CUBE_MAP:
+        slot = [0, 0, 0]
+        for letter in cubie:
+            for i, v in enumerate(FACE_NORMALS[letter]):
+                slot[i] += v
+        positions.append((SLOT_INDEX[tuple(slot)], FACE_NORMALS[facing]))
+    return positions
+
+
+@timed("read_geometry")
+def read_config_from_geometry(doc, cube=None):
+    # One pass over the cubie geometry: the slot of each cubie comes from its
+    # center and the colour of each facelet from the material of the face
+    # pointing out of the cube there. The fixed center cubies tell which
+    # material belongs to which face. Returns (config, report lines);
+    # config is None when the geometry cannot be read.
+    cube = _resolve_cube(doc, cube)
+    cubies = collect_target_cubies(doc, cube)
+    problems = []
+    by_slot = {}
+    for elem, _, mark in cubies:
+        center = _get_center(elem)
+        slot = _grid_slot(center, cube) if center else None
+        if slot not in SLOT_INDEX or SLOT_INDEX[slot] in by_slot:
+            problems.append("Cubie '{}' is not on a free grid slot.".format(mark))
+            continue
+        by_slot[SLOT_INDEX[slot]] = (mark, _outer_face_materials(elem))
+    if len(by_slot) != len(SLOTS):
+        return None, problems or ["Expected 26 cubies on the grid."]
+
+    face_of_material = {}
+    for face, normal in FACE_NORMALS.items():
+        material = by_slot[SLOT_INDEX[normal]][1].get(normal)
+        if material is None or material in face_of_material:
+            return None, ["Center cubie of face {} has no distinct material.".format(face)]
+        face_of_material[material] = face
+
+    config = []
+    for slot_index, direction in _facelet_positions():
+        mark, materials = by_slot[slot_index]
+        face = face_of_material.get(materials.get(direction))
+        if face is None:
+            problems.append("Cubie '{}' has no known sticker facing {}.".format(mark, direction))
+            config.append("?")
+        else:
+            config.append(FACE_COLOURS[face])
+    if problems:
+        return None, problems
+
+    # Each tagged cubie must still carry the colours of its home slot.
+    colours_at = {}
+    for (slot_index, _), colour in zip(_facelet_positions(), config):
+        colours_at.setdefault(by_slot[slot_index][0], []).append(colour)
+    for elem, _, mark in cubies:
+        tag = _read_tag(elem)
+        if tag is None:
+            continue
+        home = SLOTS[tag["home_slot"]]
+        expected = sorted(FACE_COLOURS[f] for f, n in FACE_NORMALS.items() if _on_face(home, n))
+        if sorted(colours_at[mark]) != expected:
+            problems.append("Cubie '{}' does not carry the colours of its home slot.".format(mark))
+    if problems:
+        return None, problems
+    return "".join(config), []
+
+
+def resync_state(doc, cube=None):
+    # Replace the stored config and slot map with what the geometry shows.
+    # Must run inside a transaction; Marks and project binding are kept.
+    state = ensure_state(doc, exitscript_on_error=False, require_initialized=True, cube=cube)
+    cube = state["cube"]
+    config, problems = read_config_from_geometry(doc, cube)
+    if config is None:
+        raise Exception("\n".join(problems))
+    cubies = collect_target_cubies(doc, cube)
+    marks = _slot_marks_from_geometry(cubies, cube)
+    if marks is None:
+        raise Exception("Cubies are not on the expected -1/0/+1 grid.")
+
+    coords = _coords_from_config(config)
+    changed = state["coords"] != coords
+    state["coords"] = coords
+    _save_state(doc, cube, state)
+    if changed:
+        _save_history(doc, cube, [])
+    _save_slot_map(doc, cube, {"marks": marks, "moves_since_check": 0})
+    return changed
+
+
+def collect_target_cubies(doc, cube=None):
+    # Cubie entries (element, center, Mark) of one cube, the active one by
+    # default. center is from the last scan, or None once the cubie moved;
+    # read _get_center(element) for the current one.
+    cube = _resolve_cube(doc, cube)
+    if cube is None:
+        return []
+    return _get_cubie_index(doc).cubies(cube["key"])
+
+
+@timed("ensure_state")
+def ensure_state(doc, exitscript_on_error=True, require_initialized=False, cube=None):
     # Validate cubie population and identity before any move/solve call.
-    cubies = _collect_target_cubies(doc)
+    # Works on the active cube unless one is given; the returned state
+    # carries its cube under "cube".
+    cube = _resolve_cube(doc, cube, exitscript_on_error)
+    cubies = collect_target_cubies(doc, cube) if cube is not None else []
     if len(cubies) != 26:
         msg = (
             "Expected 26 DirectShape Generic Model cubies with Comments='{}', found {}."
-            .format(TARGET_COMMENTS, len(cubies))
+            .format(cube_comments(cube["name"]) if cube is not None else TARGET_COMMENTS, len(cubies))
         )
         if exitscript_on_error:
             forms.alert(msg, exitscript=True)
@@ -233,9 +1702,9 @@ def ensure_state(doc, exitscript_on_error=True, require_initialized=False):
             forms.alert(msg, exitscript=True)
         raise Exception(msg)
 
-    signature = "|".join(sorted(marks))
+    mark_hash = _get_cubie_index(doc).mark_hash(cube["key"])
     project_key = _project_key(doc)
-    state = _load_state(doc)
+    state = _load_state(doc, cube)
     if not state:
         msg = "State is not initialized. Click 'Initialize' before rotating or solving."
         if require_initialized:
@@ -243,9 +1712,10 @@ def ensure_state(doc, exitscript_on_error=True, require_initialized=False):
                 forms.alert(msg, exitscript=True)
             raise Exception(msg)
         state = {
-            "config": _solved_config(),
-            "mark_signature": signature,
+            "coords": SOLVED_COORDS,
+            "mark_hash": mark_hash,
             "project_key": project_key,
+            "cube": cube,
         }
         return state
 
@@ -259,13 +1729,14 @@ def ensure_state(doc, exitscript_on_error=True, require_initialized=False):
                 forms.alert(msg, exitscript=True)
             raise Exception(msg)
         state = {
-            "config": _solved_config(),
-            "mark_signature": signature,
+            "coords": SOLVED_COORDS,
+            "mark_hash": mark_hash,
             "project_key": project_key,
+            "cube": cube,
         }
         return state
 
-    if state.get("mark_signature") != signature:
+    if state.get("mark_hash") != mark_hash:
         msg = (
             "Saved state does not match current Mark set. "
             "Click 'Initialize' to reset solver state."
@@ -275,82 +1746,299 @@ def ensure_state(doc, exitscript_on_error=True, require_initialized=False):
                 forms.alert(msg, exitscript=True)
             raise Exception(msg)
         state = {
-            "config": _solved_config(),
-            "mark_signature": signature,
+            "coords": SOLVED_COORDS,
+            "mark_hash": mark_hash,
             "project_key": project_key,
         }
+    state["cube"] = cube
     return state
 
 
-def apply_move(doc, move_notation):
+def apply_move(doc, move_notation, cube=None):
     # Apply move to saved config inside the same transaction as geometry.
-    _, Move, _, _ = _get_solver_modules()
-    state = ensure_state(doc, exitscript_on_error=False, require_initialized=True)
-    cube = _build_cube_from_config(state["config"])
-    cube.move(Move(move_notation))
-    state["config"] = cube.to_naive_cube().get_cube()
-    _save_state(doc, state)
-    return state["config"]
+    state = ensure_state(doc, exitscript_on_error=False, require_initialized=True, cube=cube)
+    cube = state["cube"]
+    state["coords"] = _move_coords(state["coords"], [move_notation])
+    _save_state(doc, cube, state)
+    _append_history(doc, cube, [move_notation], state["coords"])
+    _apply_slot_move(doc, cube, move_notation)
+    return state["coords"]
 
 
-def solve_current(doc):
+def solve_current(doc, cube=None):
     # Return notation only; geometry is changed by rotation buttons.
-    _, _, _, rubik_utils = _get_solver_modules()
-    state = ensure_state(doc, exitscript_on_error=False, require_initialized=True)
-    if state.get("config") == _solved_config():
+    state = ensure_state(doc, exitscript_on_error=False, require_initialized=True, cube=cube)
+    if state["coords"] == SOLVED_COORDS:
         return ""
-    moves = rubik_utils.solve(state["config"], "Kociemba")
-    return " ".join(str(m) for m in moves)
+    moves = cached_solution(doc, state)
+    if moves is None:
+        moves = _search_solution(doc, state)
+        remember_solution(state["coords"], moves)
+    return " ".join(moves)
+
+
+@timed("search")
+def _search_solution(doc, state):
+    history = history_solution(doc, state)
+    if history is not None and len(history) <= SEARCH_MAX_DEPTH + 1:
+        # Undoing a short scramble is instant; a search only wins if shorter.
+        if len(history) <= 1:
+            return history
+        try:
+            return search_coords(state["coords"], len(history) - 1, HISTORY_SEARCH_SECONDS)
+        except search_errors():
+            return history
+    import rubiks_solver_worker
+    moves = None
+    try:
+        # Prefer the CPython worker; it keeps the tables loaded between
+        # solves. This runs on the UI thread, so a cold worker is only
+        # launched here and this solve runs in-process. A cube the worker
+        # rejects would fail in-process too, so that error is not caught.
+        moves = rubiks_solver_worker.solve(state_config(state), "Kociemba", start_timeout=0).split()
+    except (rubiks_solver_worker.WorkerUnavailable, socket.error):
+        pass
+    if moves is None:
+        moves = search_coords(state["coords"])
+    if history is not None and len(history) <= len(moves):
+        return history
+    return moves
+
+
+def search_errors():
+    # Exceptions search_coords raises when nothing fits the depth or time.
+    _get_coord_modules()
+    from rubik_solver.Solver.Kociemba.Search import NoSolution, SolverTimeoutError
+    return NoSolution, SolverTimeoutError
+
+
+def search_lock():
+    # One lock per session, shared by every copy of this module. A search
+    # started while another runs waits for it to finish.
+    domain = AppDomain.CurrentDomain
+    with _search_lock_guard:
+        lock = domain.GetData(SEARCH_LOCK_SLOT)
+        if lock is None:
+            lock = threading.Lock()
+            domain.SetData(SEARCH_LOCK_SLOT, lock)
+    return lock
+
+
+def search_coords(coords, max_depth=SEARCH_MAX_DEPTH, time_out=100, progress=None):
+    # Kociemba search straight from the stored coordinates, as move strings.
+    _, Search = _get_coord_modules()
+    cubie = _cubie_from_coords(coords)
+    with search_lock():
+        return Search.solutionFromCubieCube(cubie, max_depth, time_out, progress=progress)
+
+
+def _tag_cubies(doc, cube, cubies, slot_marks):
+    home = dict((mark, i) for i, mark in enumerate(slot_marks))
+    for elem, _, mark in cubies:
+        _stamp_cubie(elem, cube["id"], home[mark])
+
+
+def _remove_stale_storage(doc, members, cube_ids):
+    # After Initialize: untag cubies that left the cubes just written or lost
+    # their cubie Comments, delete records no cubie refers to any more, and
+    # drop the state on ProjectInformation once no cube relies on it.
+    schema = _get_tag_schema()
+    referenced = set()
+    for elem, _, _ in _collect_tagged_cubies(doc):
+        tag = _read_tag(elem)
+        if elem.Id in members:
+            referenced.add(tag["cube_id"])
+        elif tag is None or tag["cube_id"] in cube_ids or _cube_label(_get_comments(elem)) is None:
+            elem.DeleteEntity(schema)
+        else:
+            referenced.add(tag["cube_id"])
+
+    records = _collect_cube_records(doc)
+    for cube_id, record in records.items():
+        if cube_id not in referenced:
+            doc.Delete(record["host"].Id)
+    if not referenced - set(records):
+        host = doc.ProjectInformation
+        for guid in (SCHEMA_GUID, LEGACY_SCHEMA_GUID, SLOT_SCHEMA_GUID, HISTORY_SCHEMA_GUID, SOLUTION_SCHEMA_GUID):
+            schema = Schema.Lookup(guid)
+            if schema:
+                ent = host.GetEntity(schema)
+                if ent and ent.IsValid():
+                    host.DeleteEntity(schema)
+
+
+def _write_solved_cube(doc, cube, cubies, slot_marks):
+    # Record, solved state, empty history, slot map and cubie tags of one
+    # cube; a cube without a host gets a new DataStorage element.
+    if cube["host"] is None:
+        cube["host"] = DataStorage.Create(doc)
+    _save_cube_record(cube)
+    state = {
+        "coords": SOLVED_COORDS,
+        "mark_hash": _mark_hash([mark for _, _, mark in cubies]),
+        "project_key": _project_key(doc),
+    }
+    _save_state(doc, cube, state)
+    _save_history(doc, cube, [])
+    _save_slot_map(doc, cube, {"marks": slot_marks, "moves_since_check": 0})
+    _tag_cubies(doc, cube, cubies, slot_marks)
 
 
 def initialize_state(doc, exitscript_on_error=True):
     # Fast reset: trust user-provided baseline and set solved state directly.
-    cubies = _collect_target_cubies(doc)
-    if len(cubies) != 26:
+    # Membership always comes from Comments here; the tags follow from it.
+    # Each Comments name forms one cube, placed where its cubies stand. With
+    # cubies selected only their cubes are reset, otherwise every cube is.
+    # Returns the initialized cubes.
+    groups = _group_commented_cubies(doc)
+    selected = _selected_ids(doc)
+    chosen = dict(
+        (name, cubies) for name, cubies in groups.items()
+        if any(elem.Id in selected for elem, _, _ in cubies)
+    )
+    if chosen:
+        groups = chosen
+    if not groups:
         msg = (
-            "Expected 26 DirectShape Generic Model cubies with Comments='{}', found {}."
-            .format(TARGET_COMMENTS, len(cubies))
+            "Expected 26 DirectShape Generic Model cubies with Comments='{}', found 0."
+            .format(TARGET_COMMENTS)
         )
         if exitscript_on_error:
             forms.alert(msg, exitscript=True)
         raise Exception(msg)
 
-    marks = [m for _, _, m in cubies]
-    if any(not m for m in marks):
-        msg = "Every cubie needs a unique non-empty Mark value."
-        if exitscript_on_error:
-            forms.alert(msg, exitscript=True)
-        raise Exception(msg)
+    # Check every cube before anything is written.
+    records = _collect_cube_records(doc)
+    plans = []
+    used_ids = set()
+    for name in sorted(groups):
+        cubies = groups[name]
+        comments = cube_comments(name)
+        if len(cubies) != 26:
+            msg = (
+                "Expected 26 DirectShape Generic Model cubies with Comments='{}', found {}."
+                .format(comments, len(cubies))
+            )
+            if exitscript_on_error:
+                forms.alert(msg, exitscript=True)
+            raise Exception(msg)
 
-    if len(set(marks)) != 26:
-        msg = "Cubie Marks are not unique. Provide 26 unique Mark values."
-        if exitscript_on_error:
-            forms.alert(msg, exitscript=True)
-        raise Exception(msg)
+        marks = [m for _, _, m in cubies]
+        if any(not m for m in marks):
+            msg = "Every cubie needs a unique non-empty Mark value (Comments='{}').".format(comments)
+            if exitscript_on_error:
+                forms.alert(msg, exitscript=True)
+            raise Exception(msg)
 
-    state = {
-        "config": _solved_config(),
-        "mark_signature": "|".join(sorted(marks)),
-        "project_key": _project_key(doc),
-    }
-    _save_state(doc, state)
-    return state
+        if len(set(marks)) != 26:
+            msg = "Cubie Marks are not unique. Provide 26 unique Mark values (Comments='{}').".format(comments)
+            if exitscript_on_error:
+                forms.alert(msg, exitscript=True)
+            raise Exception(msg)
 
+        # Rounded, so a cube modeled on round coordinates keeps them exactly.
+        origin, size = _placement_from_cubies(cubies)
+        cube = {
+            "name": name,
+            "origin": XYZ(round(origin.X, 6), round(origin.Y, 6), round(origin.Z, 6)),
+            "size": round(size, 6),
+        }
+        slot_marks = _slot_marks_from_geometry(cubies, cube) if cube["size"] > 0 else None
+        if slot_marks is None:
+            msg = "Cubies with Comments='{}' are not on a -1/0/+1 grid around their center.".format(comments)
+            if exitscript_on_error:
+                forms.alert(msg, exitscript=True)
+            raise Exception(msg)
+
+        # Re-initializing keeps the cube's id and storage element.
+        tags = [_read_tag(elem) for elem, _, _ in cubies]
+        ids = set(tag["cube_id"] for tag in tags if tag is not None)
+        cube_id = ids.pop() if len(ids) == 1 else None
+        if cube_id is None or cube_id in used_ids:
+            cube_id = Guid.NewGuid().ToString()
+        used_ids.add(cube_id)
+        cube["id"] = cube["key"] = cube_id
+        cube["host"] = records[cube_id]["host"] if cube_id in records else None
+        plans.append((cube, cubies, slot_marks))
+
+    members = set()
+    for cube, cubies, slot_marks in plans:
+        _write_solved_cube(doc, cube, cubies, slot_marks)
+        members.update(elem.Id for elem, _, _ in cubies)
+    _remove_stale_storage(doc, members, used_ids)
+    invalidate_cubie_index(doc)
+
+    cubes = [plan[0] for plan in plans]
+    if len(cubes) == 1:
+        set_active_cube(doc, cubes[0])
+    return cubes
+
+
+def add_solved_cube(doc, cube, cubies):
+    # Store a cube whose cubies were just created on their home slots, as
+    # (element, center, Mark) in SLOTS order, and make it the active cube.
+    # Must run inside a transaction.
+    _write_solved_cube(doc, cube, cubies, [mark for _, _, mark in cubies])
+    invalidate_cubie_index(doc)
+    set_active_cube(doc, cube)
+
+
+def scramble_moves(length=SCRAMBLE_LENGTH, rng=random):
+    # Random face turns, never the same face twice in a row.
+    moves = []
+    while len(moves) < length:
+        face = rng.choice("UDLRFB")
+        if moves and moves[-1][0] == face:
+            continue
+        moves.append(face + rng.choice(("", "'", "2")))
+    return moves
+
+
+def cube_states(doc):
+    # (cube, state) of every cube ready for moves, and a line for each cube
+    # that is not, for the commands that work on all cubes at once.
+    ready = []
+    problems = []
+    for cube in list_cubes(doc):
+        try:
+            ready.append((cube, ensure_state(doc, exitscript_on_error=False, require_initialized=True, cube=cube)))
+        except Exception as ex:
+            problems.append("{}: {}".format(cube_name(cube), ex))
+    return ready, problems
 
-def validate_state(doc):
+
+def validate_state(doc, cube=None):
     report = []
     ok = True
 
-    cubies = _collect_target_cubies(doc)
-    report.append("Target cubies (Comments='{}'): {}".format(TARGET_COMMENTS, len(cubies)))
+    cube = _resolve_cube(doc, cube)
+    cubies = collect_target_cubies(doc, cube)
+    if cube is not None:
+        origin = cube["origin"]
+        report.append(
+            "Cube '{}' at ({:.3f}, {:.3f}, {:.3f}), cubie size {:.3f} ft."
+            .format(cube_name(cube), origin.X, origin.Y, origin.Z, cube["size"])
+        )
+    report.append("Target cubies (Comments='{}'): {}".format(
+        cube_comments(cube["name"]) if cube is not None else TARGET_COMMENTS, len(cubies)))
     if len(cubies) != 26:
         ok = False
 
+    tags = [_read_tag(elem) for elem, _, _ in cubies]
+    if all(tags) and len(set(t["cube_id"] for t in tags)) == 1:
+        report.append("Cubies are identified by their storage tag.")
+    elif not any(tags):
+        report.append("Cubies are not tagged yet; click Initialize to tag them.")
+    else:
+        ok = False
+        report.append("Cubie storage tags are incomplete or mixed; click Initialize.")
+
     # Strict geometry checks to avoid false positives.
     slots = []
     bad_slot = False
-    for _, pt, _ in cubies:
-        s = _grid_slot(pt)
+    for elem, _, _ in cubies:
+        center = _get_center(elem)
+        s = _grid_slot(center, cube) if center else None
         if s is None:
             bad_slot = True
         else:
@@ -368,21 +2056,21 @@ def validate_state(doc):
         else:
             report.append("All cubies occupy unique grid slots.")
 
-        if (0.0, 0.0, 0.0) in set(slots):
+        if (0, 0, 0) in set(slots):
             ok = False
             report.append("Center slot (0,0,0) is occupied; expected 26-cubie shell.")
         else:
             report.append("Center slot is empty as expected.")
 
         for axis_name, idx in (("X", 0), ("Y", 1), ("Z", 2)):
-            counts = {-1.0: 0, 0.0: 0, 1.0: 0}
+            counts = {-1: 0, 0: 0, 1: 0}
             for s in slots:
                 counts[s[idx]] += 1
-            if counts[-1.0] != 9 or counts[0.0] != 8 or counts[1.0] != 9:
+            if counts[-1] != 9 or counts[0] != 8 or counts[1] != 9:
                 ok = False
                 report.append(
                     "{} layer counts invalid (-1/0/+1 = {}/{}/{}; expected 9/8/9)."
-                    .format(axis_name, counts[-1.0], counts[0.0], counts[1.0])
+                    .format(axis_name, counts[-1], counts[0], counts[1])
                 )
             else:
                 report.append("{} layer counts valid (9/8/9).".format(axis_name))
@@ -400,11 +2088,12 @@ def validate_state(doc):
     else:
         report.append("Mark values are unique.")
 
-    state = _load_state(doc)
+    state = _load_state(doc, cube)
     if not state:
         ok = False
         report.append("Saved state not found. Click Initialize.")
         return ok, report
+    state["cube"] = cube
 
     report.append("Saved state found.")
     if state.get("project_key") != _project_key(doc):
@@ -413,34 +2102,50 @@ def validate_state(doc):
     else:
         report.append("Saved state is bound to this project.")
 
-    signature = "|".join(sorted(marks))
-    if state.get("mark_signature") != signature:
+    if state.get("mark_hash") != _mark_hash(marks):
         ok = False
-        report.append("Saved state signature does not match current Mark set.")
+        report.append("Saved state Mark hash does not match current Mark set.")
+    else:
+        report.append("Saved state Mark hash matches Mark set.")
+
+    coords_ok = True
+    limits = (40320, 2187, 479001600, 2048)
+    if any(not 0 <= value < limit for value, limit in zip(state["coords"], limits)):
+        coords_ok = False
+        report.append("Saved cube coordinates are out of range: {}.".format(state["coords"]))
     else:
-        report.append("Saved state signature matches Mark set.")
+        try:
+            _cubie_from_coords(state["coords"]).verify()
+        except Exception as ex:
+            coords_ok = False
+            report.append("Saved cube is not solvable: {}.".format(ex))
+    if coords_ok:
+        report.append("Saved cube coordinates are valid.")
+    else:
+        ok = False
 
-    config = state.get("config", "")
-    if len(config) != 54:
+    geometry_config, problems = read_config_from_geometry(doc, cube)
+    if geometry_config is None:
         ok = False
-        report.append("Saved config length is {}, expected 54.".format(len(config)))
+        report.append("Could not read the cube from geometry: {}".format(" ".join(problems)))
+    elif not coords_ok or geometry_config != state_config(state):
+        ok = False
+        report.append("Saved config does not match the geometry. Click Resync to adopt the geometry.")
+    else:
+        report.append("Saved config matches the geometry.")
+
+    if coords_ok and history_solution(doc, state) is not None:
+        report.append("Move history leads to the saved cube; Solve can undo it directly.")
     else:
-        report.append("Saved config length is valid (54).")
+        report.append("Move history is not usable as a solution; Solve runs a full search.")
 
-    allowed = set("wrgbyo")
-    if not config or any(ch not in allowed for ch in config):
+    drifted = verify_slot_map(doc, cube)
+    if drifted is None:
+        report.append("Slot map not found or stale; it is rebuilt on the next rotation.")
+    elif drifted:
         ok = False
-        report.append("Saved config contains invalid color symbols.")
+        report.append("Cubies away from their tracked slot: {}.".format(", ".join(drifted)))
     else:
-        bad_counts = []
-        for ch in sorted(allowed):
-            cnt = config.count(ch)
-            if cnt != 9:
-                bad_counts.append("{}={}".format(ch, cnt))
-        if bad_counts:
-            ok = False
-            report.append("Saved config color counts invalid: {}.".format(", ".join(bad_counts)))
-        else:
-            report.append("Saved config color counts are valid (9 each).")
+        report.append("Slot map matches cubie geometry.")
 
     return ok, report
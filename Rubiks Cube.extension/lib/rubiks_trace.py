@@ -0,0 +1,312 @@
+import os
+import sys
+import threading
+import time
+
+try:
+    from System import AppDomain
+except ImportError:
+    # Plain CPython, for the report command line below.
+    AppDomain = None
+
+# Opt-in timing of each command and of the phases inside it. Off unless the
+# environment variable is "1" or the flag file exists in the log folder;
+# Diagnostics switches the flag file. While off, command() and span() hand
+# out a shared no-op and timed() functions only check for an open command.
+ENV_FLAG = "RUBIKS_CUBE_TIMING"
+ENV_DIR = "RUBIKS_CUBE_TIMING_DIR"
+FLAG_NAME = "timings.on"
+LOG_NAME = "timings.log"
+# Ring buffer on disk: once the log passes this size it replaces the
+# previous one, so the two files never hold much more than twice this.
+LOG_MAX_BYTES = 1024 * 1024
+# AppDomain slot holding the open command. Scripts and the session engine
+# may load separate copies of this module; the slot is what they share.
+COMMAND_SLOT = "RubiksCube.TraceCommand"
+PERCENTILES = (50, 95, 99)
+_command = None
+
+
+def log_dir():
+    path = os.environ.get(ENV_DIR)
+    if not path:
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        path = os.path.join(base, "RubiksCube")
+    return path
+
+
+def log_paths():
+    # Oldest first: the previous log, then the current one.
+    current = os.path.join(log_dir(), LOG_NAME)
+    return [current + ".1", current]
+
+
+def is_enabled():
+    return os.environ.get(ENV_FLAG) == "1" or os.path.exists(os.path.join(log_dir(), FLAG_NAME))
+
+
+def set_enabled(enabled):
+    flag = os.path.join(log_dir(), FLAG_NAME)
+    if enabled:
+        if not os.path.isdir(log_dir()):
+            os.makedirs(log_dir())
+        open(flag, "w").close()
+    elif os.path.exists(flag):
+        os.remove(flag)
+
+
+def clear_log():
+    for path in log_paths():
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _open_command():
+    if AppDomain is not None:
+        return AppDomain.CurrentDomain.GetData(COMMAND_SLOT)
+    return _command
+
+
+def _set_open_command(command):
+    global _command
+    if AppDomain is not None:
+        AppDomain.CurrentDomain.SetData(COMMAND_SLOT, command)
+    else:
+        _command = command
+
+
+def _traced_command():
+    # The open command, if this thread opened it. Work on other threads,
+    # such as the background solve, is not attributed to it.
+    command = _open_command()
+    if command is None or command.thread is not threading.current_thread():
+        return None
+    return command
+
+
+class _NoTrace(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+
+_NO_TRACE = _NoTrace()
+
+
+class Span(object):
+    # One timed phase. Used as a context manager, or with start() and stop()
+    # where the phase does not fit a with block, e.g. a transaction commit.
+
+    def __init__(self, command, phase):
+        self.command = command
+        self.phase = phase
+        self.began = None
+
+    def start(self):
+        self.began = time.time()
+        return self
+
+    def stop(self):
+        if self.began is not None:
+            self.command.add(self.phase, time.time() - self.began)
+            self.began = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+class CommandTrace(object):
+    # Collects the spans of one command and appends them to the log when
+    # the command ends, with the phase "total" for the whole command.
+
+    def __init__(self, name):
+        self.name = name
+        self.thread = threading.current_thread()
+        self.spans = []
+        self.began = None
+
+    def add(self, phase, seconds):
+        self.spans.append((phase, seconds))
+
+    def __enter__(self):
+        _set_open_command(self)
+        self.began = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _set_open_command(None)
+        # A command that stopped on an error, or was left through an alert
+        # with exitscript, is not a latency sample.
+        if exc_type is None:
+            self.spans.append(("total", time.time() - self.began))
+            write_spans(self.name, self.spans)
+        return False
+
+
+def command(name):
+    # Time one command. A command inside another becomes one of its spans.
+    if _traced_command() is not None:
+        return span(name)
+    if not is_enabled():
+        return _NO_TRACE
+    return CommandTrace(name)
+
+
+def span(phase):
+    command = _traced_command()
+    if command is None:
+        return _NO_TRACE
+    return Span(command, phase)
+
+
+def timed(phase):
+    # Decorator: time each call of the function as a span of the open command.
+    def decorate(function):
+        def traced(*args, **kwargs):
+            command = _traced_command()
+            if command is None:
+                return function(*args, **kwargs)
+            began = time.time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                command.add(phase, time.time() - began)
+
+        traced.__name__ = function.__name__
+        traced.__doc__ = function.__doc__
+        return traced
+
+    return decorate
+
+
+class TimedTransaction(object):
+    # Wraps a transaction context manager, e.g. revit.Transaction, so that
+    # leaving it is timed as the "commit" span.
+
+    def __init__(self, transaction):
+        self.transaction = transaction
+
+    def __enter__(self):
+        return self.transaction.__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        with span("commit"):
+            return self.transaction.__exit__(exc_type, exc, tb)
+
+
+def write_spans(name, spans):
+    # Tracing must never break a command: write errors are dropped.
+    try:
+        previous, current = log_paths()
+        if not os.path.isdir(log_dir()):
+            os.makedirs(log_dir())
+        if os.path.exists(current) and os.path.getsize(current) > LOG_MAX_BYTES:
+            if os.path.exists(previous):
+                os.remove(previous)
+            os.rename(current, previous)
+        stamp = time.time()
+        lines = [
+            "{:.3f}\t{}\t{}\t{:.3f}\n".format(stamp, name, phase, 1000.0 * seconds)
+            for phase, seconds in spans
+        ]
+        with open(current, "a") as log:
+            log.write("".join(lines))
+    except (IOError, OSError):
+        pass
+
+
+def record(name, spans):
+    # Log a command timed elsewhere, e.g. a search on a worker thread.
+    if is_enabled():
+        write_spans(name, spans)
+
+
+def read_records(paths=None):
+    # (time, command, phase, milliseconds) of every logged span, oldest first.
+    records = []
+    for path in paths or log_paths():
+        if not os.path.exists(path):
+            continue
+        with open(path) as log:
+            for line in log:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 4:
+                    continue
+                try:
+                    records.append((float(parts[0]), parts[1], parts[2], float(parts[3])))
+                except ValueError:
+                    continue
+    return records
+
+
+def percentile(values, p):
+    # Nearest-rank percentile of a non-empty list.
+    ordered = sorted(values)
+    rank = max(1, -(-p * len(ordered) // 100))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(records):
+    # One row per command and phase: (command, phase, count, p50, p95, p99,
+    # max) in milliseconds. Each command's total comes first, then its
+    # phases by their p95, largest first.
+    samples = {}
+    for _, name, phase, ms in records:
+        samples.setdefault((name, phase), []).append(ms)
+    rows = []
+    for (name, phase), values in samples.items():
+        row = [name, phase, len(values)]
+        row.extend(percentile(values, p) for p in PERCENTILES)
+        row.append(max(values))
+        rows.append(tuple(row))
+    rows.sort(key=lambda row: (row[0], row[1] != "total", -row[4]))
+    return rows
+
+
+def format_table(rows):
+    lines = ["{:<24} {:<20} {:>6} {:>10} {:>10} {:>10} {:>10}".format(
+        "command", "phase", "count", "p50 ms", "p95 ms", "p99 ms", "max ms")]
+    for row in rows:
+        lines.append("{:<24} {:<20} {:>6} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}".format(*row))
+    return lines
+
+
+def format_markdown(rows):
+    lines = [
+        "| Command | Phase | Count | p50 ms | p95 ms | p99 ms | Max ms |",
+        "| --- | --- | ---: | ---: | ---: | ---: | ---: |",
+    ]
+    for row in rows:
+        lines.append("| {} | {} | {} | {:.2f} | {:.2f} | {:.2f} | {:.2f} |".format(*row))
+    return lines
+
+
+def main(argv):
+    # python rubiks_trace.py [log files]: print the percentile table.
+    records = read_records(argv[1:] or None)
+    if not records:
+        sys.stdout.write("No timings logged in {}.\n".format(log_dir()))
+        return 1
+    sys.stdout.write("{} spans from {} to {}\n\n".format(
+        len(records),
+        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(records[0][0])),
+        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(records[-1][0])),
+    ))
+    sys.stdout.write("\n".join(format_table(summarize(records))) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,164 @@
+"""Stand-in for Autodesk.Revit.DB.ExtensibleStorage."""
+from Autodesk.Revit.DB import ElementFilter, count
+
+_SCHEMAS = {}
+
+
+def reset_schemas():
+    _SCHEMAS.clear()
+
+
+class AccessLevel(object):
+    Public = 1
+    Vendor = 2
+    Application = 3
+
+
+class Field(object):
+    def __init__(self, schema, name, value_type, container=None):
+        self.Schema = schema
+        self.FieldName = name
+        self.ValueType = value_type
+        self.ContainerType = container
+
+
+class FieldBuilder(object):
+    def __init__(self, name, value_type, container=None):
+        self.name = name
+        self.value_type = value_type
+        self.container = container
+
+    def SetDocumentation(self, text):
+        return self
+
+
+class Schema(object):
+    def __init__(self, guid, name, fields):
+        self.GUID = guid
+        self.SchemaName = name
+        self.IsValidObject = True
+        self._fields = dict((f.name, Field(self, f.name, f.value_type, f.container)) for f in fields)
+
+    @staticmethod
+    def Lookup(guid):
+        count("Schema.Lookup")
+        return _SCHEMAS.get(guid)
+
+    @staticmethod
+    def ListSchemas():
+        return list(_SCHEMAS.values())
+
+    def GetField(self, name):
+        return self._fields.get(name)
+
+    def ListFields(self):
+        return list(self._fields.values())
+
+
+class SchemaBuilder(object):
+    def __init__(self, guid):
+        self._guid = guid
+        self._name = ""
+        self._fields = []
+
+    def SetSchemaName(self, name):
+        self._name = name
+
+    def SetReadAccessLevel(self, level):
+        pass
+
+    def SetWriteAccessLevel(self, level):
+        pass
+
+    def SetVendorId(self, vendor):
+        pass
+
+    def SetDocumentation(self, text):
+        pass
+
+    def AddSimpleField(self, name, value_type):
+        field = FieldBuilder(name, value_type)
+        self._fields.append(field)
+        return field
+
+    def AddArrayField(self, name, value_type):
+        field = FieldBuilder(name, value_type, "array")
+        self._fields.append(field)
+        return field
+
+    def Finish(self):
+        count("SchemaBuilder.Finish")
+        if self._guid in _SCHEMAS:
+            raise Exception("A schema with this GUID already exists.")
+        schema = Schema(self._guid, self._name, self._fields)
+        _SCHEMAS[self._guid] = schema
+        return schema
+
+
+class _Generic(object):
+    """Supports the IronPython `entity.Get[String](field)` idiom."""
+
+    def __init__(self, function):
+        self._function = function
+
+    def __getitem__(self, value_type):
+        return lambda *args: self._function(value_type, *args)
+
+    def __call__(self, *args):
+        return self._function(None, *args)
+
+
+class Entity(object):
+    def __init__(self, schema=None):
+        self.Schema = schema
+        self._values = {}
+
+    # Built on access; stored helpers would tie each entity into a reference
+    # cycle and leave freeing it to the garbage collector's pauses.
+    @property
+    def Get(self):
+        return _Generic(self._get)
+
+    @property
+    def Set(self):
+        return _Generic(self._set)
+
+    def IsValid(self):
+        return self.Schema is not None
+
+    def _name(self, field):
+        return field if isinstance(field, str) else field.FieldName
+
+    def _get(self, value_type, field, *unit):
+        count("Entity.Get")
+        name = self._name(field)
+        if self.Schema is None or self.Schema.GetField(name) is None:
+            raise Exception("Field {} is not part of the schema.".format(name))
+        value = self._values.get(name)
+        if value is None:
+            declared = self.Schema.GetField(name)
+            if declared.ContainerType == "array":
+                return []
+            return "" if declared.ValueType is str else declared.ValueType()
+        return list(value) if isinstance(value, list) else value
+
+    def _set(self, value_type, field, value, *unit):
+        count("Entity.Set")
+        name = self._name(field)
+        if self.Schema is None or self.Schema.GetField(name) is None:
+            raise Exception("Field {} is not part of the schema.".format(name))
+        self._values[name] = list(value) if isinstance(value, (list, tuple)) else value
+
+    def copy(self):
+        entity = Entity(self.Schema)
+        entity._values = dict((k, list(v) if isinstance(v, list) else v) for k, v in self._values.items())
+        return entity
+
+
+class ExtensibleStorageFilter(ElementFilter):
+    def __init__(self, schema_guid):
+        count("ExtensibleStorageFilter")
+        self.schema_guid = schema_guid
+
+    def passes(self, element):
+        return self.schema_guid in element._entities
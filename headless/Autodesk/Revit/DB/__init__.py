@@ -0,0 +1,942 @@
+"""Pure-Python stand-in for the Autodesk.Revit.DB subset used by the extension.
+
+Every public API entry point bumps a counter in CALLS so that benchmarks can
+report API calls per command next to wall-clock time.
+"""
+import collections
+import math
+
+CALLS = collections.Counter()
+
+
+def count(name):
+    CALLS[name] += 1
+
+
+def reset_calls():
+    CALLS.clear()
+
+
+class XYZ(object):
+    __slots__ = ("X", "Y", "Z")
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.X = float(x)
+        self.Y = float(y)
+        self.Z = float(z)
+
+    def __add__(self, other):
+        return XYZ(self.X + other.X, self.Y + other.Y, self.Z + other.Z)
+
+    def __sub__(self, other):
+        return XYZ(self.X - other.X, self.Y - other.Y, self.Z - other.Z)
+
+    def __mul__(self, factor):
+        return XYZ(self.X * factor, self.Y * factor, self.Z * factor)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return XYZ(-self.X, -self.Y, -self.Z)
+
+    def Add(self, other):
+        return self + other
+
+    def Subtract(self, other):
+        return self - other
+
+    def Multiply(self, factor):
+        return self * factor
+
+    def Negate(self):
+        return -self
+
+    def DotProduct(self, other):
+        return self.X * other.X + self.Y * other.Y + self.Z * other.Z
+
+    def CrossProduct(self, other):
+        return XYZ(
+            self.Y * other.Z - self.Z * other.Y,
+            self.Z * other.X - self.X * other.Z,
+            self.X * other.Y - self.Y * other.X,
+        )
+
+    def GetLength(self):
+        return math.sqrt(self.DotProduct(self))
+
+    def Normalize(self):
+        length = self.GetLength()
+        return XYZ(self.X / length, self.Y / length, self.Z / length)
+
+    def DistanceTo(self, other):
+        return (self - other).GetLength()
+
+    def IsAlmostEqualTo(self, other, tolerance=1e-9):
+        return self.DistanceTo(other) <= tolerance
+
+    def __repr__(self):
+        return "XYZ({:.6f}, {:.6f}, {:.6f})".format(self.X, self.Y, self.Z)
+
+
+XYZ.Zero = XYZ(0, 0, 0)
+XYZ.BasisX = XYZ(1, 0, 0)
+XYZ.BasisY = XYZ(0, 1, 0)
+XYZ.BasisZ = XYZ(0, 0, 1)
+
+
+class Line(object):
+    def __init__(self, start, end):
+        self._start = start
+        self._end = end
+
+    @staticmethod
+    def CreateBound(start, end):
+        count("Line.CreateBound")
+        return Line(start, end)
+
+    @staticmethod
+    def CreateUnbound(origin, direction):
+        count("Line.CreateUnbound")
+        return Line(origin, origin + direction)
+
+    @property
+    def Origin(self):
+        return self._start
+
+    @property
+    def Direction(self):
+        return (self._end - self._start).Normalize()
+
+    def GetEndPoint(self, index):
+        return self._start if index == 0 else self._end
+
+
+def rotation_matrix(axis, angle):
+    """Rodrigues rotation matrix (rows) for a unit axis XYZ."""
+    x, y, z = axis.X, axis.Y, axis.Z
+    c, s = math.cos(angle), math.sin(angle)
+    t = 1.0 - c
+    return (
+        (t * x * x + c, t * x * y - s * z, t * x * z + s * y),
+        (t * x * y + s * z, t * y * y + c, t * y * z - s * x),
+        (t * x * z - s * y, t * y * z + s * x, t * z * z + c),
+    )
+
+
+def apply_matrix(matrix, point):
+    return XYZ(
+        matrix[0][0] * point.X + matrix[0][1] * point.Y + matrix[0][2] * point.Z,
+        matrix[1][0] * point.X + matrix[1][1] * point.Y + matrix[1][2] * point.Z,
+        matrix[2][0] * point.X + matrix[2][1] * point.Y + matrix[2][2] * point.Z,
+    )
+
+
+class Transform(object):
+    """Rigid transform: BasisX/Y/Z columns plus Origin."""
+
+    def __init__(self, basis_x=None, basis_y=None, basis_z=None, origin=None):
+        self.BasisX = basis_x or XYZ(1, 0, 0)
+        self.BasisY = basis_y or XYZ(0, 1, 0)
+        self.BasisZ = basis_z or XYZ(0, 0, 1)
+        self.Origin = origin or XYZ(0, 0, 0)
+
+    @staticmethod
+    def CreateTranslation(vector):
+        return Transform(origin=vector)
+
+    @staticmethod
+    def CreateRotationAtPoint(axis, angle, point):
+        m = rotation_matrix(axis.Normalize(), angle)
+        columns = [XYZ(m[0][i], m[1][i], m[2][i]) for i in range(3)]
+        origin = point - apply_matrix(m, point)
+        return Transform(columns[0], columns[1], columns[2], origin)
+
+    def OfVector(self, v):
+        return self.BasisX * v.X + self.BasisY * v.Y + self.BasisZ * v.Z
+
+    def OfPoint(self, p):
+        return self.Origin + self.OfVector(p)
+
+    def Multiply(self, other):
+        return Transform(
+            self.OfVector(other.BasisX),
+            self.OfVector(other.BasisY),
+            self.OfVector(other.BasisZ),
+            self.OfPoint(other.Origin),
+        )
+
+    @property
+    def Inverse(self):
+        rows = (self.BasisX, self.BasisY, self.BasisZ)
+        bx = XYZ(rows[0].X, rows[1].X, rows[2].X)
+        by = XYZ(rows[0].Y, rows[1].Y, rows[2].Y)
+        bz = XYZ(rows[0].Z, rows[1].Z, rows[2].Z)
+        inverse = Transform(bx, by, bz)
+        inverse.Origin = -inverse.OfVector(self.Origin)
+        return inverse
+
+
+Transform.Identity = Transform()
+
+
+class ElementId(object):
+    __slots__ = ("IntegerValue",)
+
+    def __init__(self, value):
+        self.IntegerValue = int(value)
+
+    @property
+    def Value(self):
+        return self.IntegerValue
+
+    def __eq__(self, other):
+        return isinstance(other, ElementId) and other.IntegerValue == self.IntegerValue
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.IntegerValue)
+
+    def __repr__(self):
+        return "ElementId({})".format(self.IntegerValue)
+
+
+ElementId.InvalidElementId = ElementId(-1)
+
+
+class BuiltInCategory(object):
+    OST_GenericModel = -2000151
+
+
+class BuiltInParameter(object):
+    ALL_MODEL_MARK = -1001203
+    ALL_MODEL_INSTANCE_COMMENTS = -1010106
+
+
+class Category(object):
+    def __init__(self, bic):
+        self.Id = ElementId(bic)
+
+
+class Parameter(object):
+    def __init__(self, element, value=""):
+        self._element = element
+        self._value = value
+
+    def AsString(self):
+        count("Parameter.AsString")
+        return self._value
+
+    def AsValueString(self):
+        return self._value
+
+    def Set(self, value):
+        count("Parameter.Set")
+        self._element.Document._require_transaction()
+        self._value = value
+        self._element.Document._touch(self._element)
+        return True
+
+
+class Location(object):
+    pass
+
+
+class LocationPoint(Location):
+    def __init__(self, point):
+        self.Point = point
+
+
+class BoundingBoxXYZ(object):
+    def __init__(self, minimum, maximum):
+        self.Min = minimum
+        self.Max = maximum
+
+
+class Element(object):
+    def __init__(self, document, category=None):
+        self.Document = document
+        self.Id = document._next_id()
+        self.Category = Category(category) if category is not None else None
+        self.IsValidObject = True
+        self._parameters = {}
+        self._entities = {}
+
+    def get_Parameter(self, bip):
+        count("Element.get_Parameter")
+        return self._parameters.get(bip)
+
+    def GetEntity(self, schema):
+        count("Element.GetEntity")
+        from .ExtensibleStorage import Entity
+        entity = self._entities.get(schema.GUID)
+        return entity.copy() if entity else Entity()
+
+    def SetEntity(self, entity):
+        count("Element.SetEntity")
+        self.Document._require_transaction()
+        self._entities[entity.Schema.GUID] = entity.copy()
+        self.Document._touch(self)
+
+    def DeleteEntity(self, schema):
+        count("Element.DeleteEntity")
+        self.Document._require_transaction()
+        removed = self._entities.pop(schema.GUID, None) is not None
+        self.Document._touch(self)
+        return removed
+
+    def GetEntitySchemaGuids(self):
+        return list(self._entities.keys())
+
+    @property
+    def Location(self):
+        return Location()
+
+    def get_BoundingBox(self, view):
+        return None
+
+    def _snapshot(self):
+        return (
+            dict((k, p._value) for k, p in self._parameters.items()),
+            dict((k, e.copy()) for k, e in self._entities.items()),
+        )
+
+    def _restore(self, snapshot):
+        parameters, entities = snapshot
+        for k, v in parameters.items():
+            self._parameters[k]._value = v
+        self._entities = dict((k, e.copy()) for k, e in entities.items())
+
+
+class ProjectInfo(Element):
+    def __init__(self, document):
+        Element.__init__(self, document)
+        self.UniqueId = "0c1f6f86-3b43-4b3f-9c61-000000000001-0000c3a1"
+
+
+class Color(object):
+    def __init__(self, red, green, blue):
+        self.Red = red
+        self.Green = green
+        self.Blue = blue
+
+
+class Material(Element):
+    def __init__(self, document, name):
+        Element.__init__(self, document)
+        self.Name = name
+        self.Color = None
+
+    @staticmethod
+    def Create(document, name):
+        count("Material.Create")
+        document._require_transaction()
+        material = Material(document, name)
+        document._add(material)
+        return material.Id
+
+
+class DataStorage(Element):
+    @staticmethod
+    def Create(document):
+        count("DataStorage.Create")
+        document._require_transaction()
+        storage = DataStorage(document)
+        document._add(storage)
+        return storage
+
+
+class DirectShape(Element):
+    """Axis-aligned cube of side size, moved rigidly by rotate/move calls.
+
+    rotation holds the image of the local X/Y/Z axes as matrix columns and
+    face_materials maps local face normals to material ids, which is what
+    get_Geometry exposes through PlanarFace objects.
+    """
+
+    def __init__(self, document, category):
+        Element.__init__(self, document, category)
+        self.center = XYZ(0, 0, 0)
+        self.rotation = ((1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+        self.size = 0.0
+        self.face_materials = {}
+        self.ApplicationId = ""
+        self.ApplicationDataId = ""
+        self._parameters[BuiltInParameter.ALL_MODEL_MARK] = Parameter(self)
+        self._parameters[BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS] = Parameter(self)
+
+    @staticmethod
+    def CreateElement(document, category_id):
+        count("DirectShape.CreateElement")
+        document._require_transaction()
+        shape = DirectShape(document, category_id.IntegerValue)
+        document._add(shape)
+        return shape
+
+    def SetShape(self, shape):
+        # The largest solid is the cubie body; every smaller one is a
+        # sticker and colours the body face on its side, which is all the
+        # outermost-face reading of the extension can tell apart.
+        count("DirectShape.SetShape")
+        self.Document._require_transaction()
+        solids = sorted((item for item in shape if isinstance(item, Solid)), key=lambda solid: -solid.Volume)
+        if solids:
+            body = solids[0]
+            self.center = body.center
+            self.rotation = body.rotation
+            self.size = 2.0 * body.half[0]
+            self.face_materials = dict(body.face_materials)
+            for sticker in solids[1:]:
+                offset = sticker.center - body.center
+                local = [sum(body.rotation[r][c] * getattr(offset, "XYZ"[r]) for r in range(3)) for c in range(3)]
+                k = max(range(3), key=lambda i: abs(local[i]))
+                normal = tuple((1 if local[k] > 0 else -1) if i == k else 0 for i in range(3))
+                self.face_materials[normal] = list(sticker.face_materials.values())[0]
+        self.Document._touch(self)
+
+    @staticmethod
+    def CreateGeometryInstance(document, definition_id, transform):
+        count("DirectShape.CreateGeometryInstance")
+        library = DirectShapeLibrary.GetDirectShapeLibrary(document)
+        return [solid._transformed(transform) for solid in library.FindDefinition(definition_id)]
+
+    def SetName(self, name):
+        self.Name = name
+
+    def get_BoundingBox(self, view):
+        count("Element.get_BoundingBox")
+        if not self.size:
+            return None
+        half = self.size * 0.5
+        extent = [half * sum(abs(self.rotation[row][col]) for col in range(3)) for row in range(3)]
+        c = self.center
+        return BoundingBoxXYZ(
+            XYZ(c.X - extent[0], c.Y - extent[1], c.Z - extent[2]),
+            XYZ(c.X + extent[0], c.Y + extent[1], c.Z + extent[2]),
+        )
+
+    def get_Geometry(self, options):
+        count("Element.get_Geometry")
+        return [Solid(self.center, self.rotation, self.size, self.face_materials)]
+
+    def _transform(self, matrix, pivot):
+        self.center = pivot + apply_matrix(matrix, self.center - pivot)
+        self.rotation = tuple(
+            tuple(sum(matrix[r][k] * self.rotation[k][c] for k in range(3)) for c in range(3))
+            for r in range(3)
+        )
+
+    def _snapshot(self):
+        return (Element._snapshot(self), self.center, self.rotation, self.size, dict(self.face_materials))
+
+    def _restore(self, snapshot):
+        base, self.center, self.rotation, self.size, materials = snapshot
+        self.face_materials = dict(materials)
+        Element._restore(self, base)
+
+
+class Options(object):
+    def __init__(self):
+        self.ComputeReferences = False
+
+
+class PlanarFace(object):
+    def __init__(self, normal, origin, material_id):
+        self.FaceNormal = normal
+        self.Origin = origin
+        self.MaterialElementId = material_id
+
+
+class GeometryObject(object):
+    pass
+
+
+class Solid(GeometryObject):
+    """Box of half extents half along its local axes; a cube by default."""
+
+    def __init__(self, center, rotation, size, face_materials, half=None):
+        self.center = center
+        self.rotation = rotation
+        self.size = size
+        self.face_materials = face_materials
+        self.half = half or (size * 0.5,) * 3
+
+    LOCAL_NORMALS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+
+    @property
+    def Faces(self):
+        faces = []
+        for local in Solid.LOCAL_NORMALS:
+            material = self.face_materials.get(local, ElementId.InvalidElementId)
+            normal = apply_matrix(self.rotation, XYZ(*local))
+            extent = sum(abs(v) * h for v, h in zip(local, self.half))
+            faces.append(PlanarFace(normal, self.center + normal * extent, material))
+        return faces
+
+    @property
+    def Volume(self):
+        return 8.0 * self.half[0] * self.half[1] * self.half[2]
+
+    def _transformed(self, transform):
+        basis = (transform.BasisX, transform.BasisY, transform.BasisZ)
+        matrix = tuple(tuple(getattr(basis[c], axis) for c in range(3)) for axis in "XYZ")
+        rotation = tuple(
+            tuple(sum(matrix[r][k] * self.rotation[k][c] for k in range(3)) for c in range(3))
+            for r in range(3)
+        )
+        return Solid(transform.OfPoint(self.center), rotation, self.size, dict(self.face_materials), self.half)
+
+
+class SolidOptions(object):
+    def __init__(self, material_id, graphics_style_id):
+        self.MaterialId = material_id
+        self.GraphicsStyleId = graphics_style_id
+
+
+class CurveLoop(object):
+    def __init__(self):
+        self._curves = []
+
+    def Append(self, curve):
+        self._curves.append(curve)
+
+
+class GeometryCreationUtilities(object):
+    @staticmethod
+    def CreateExtrusionGeometry(profile_loops, direction, distance, options):
+        # Only what the cubie builder needs: one rectangular loop in a
+        # plane normal to the axis-aligned extrusion direction.
+        count("GeometryCreationUtilities.CreateExtrusionGeometry")
+        points = [line.GetEndPoint(0) for loop in profile_loops for line in loop._curves]
+        low = [min(getattr(p, axis) for p in points) for axis in "XYZ"]
+        high = [max(getattr(p, axis) for p in points) for axis in "XYZ"]
+        for i, axis in enumerate("XYZ"):
+            step = getattr(direction, axis) * distance
+            low[i], high[i] = min(low[i], low[i] + step), max(high[i], high[i] + step)
+        center = XYZ(*[(a + b) * 0.5 for a, b in zip(low, high)])
+        half = tuple((b - a) * 0.5 for a, b in zip(low, high))
+        materials = dict((normal, options.MaterialId) for normal in Solid.LOCAL_NORMALS)
+        identity = ((1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+        return Solid(center, identity, 2.0 * max(half), materials, half)
+
+
+class DirectShapeLibrary(object):
+    """Per-document definitions, kept for the session like Revit does."""
+
+    def __init__(self):
+        self._definitions = {}
+
+    @staticmethod
+    def GetDirectShapeLibrary(document):
+        count("DirectShapeLibrary.GetDirectShapeLibrary")
+        if not hasattr(document, "_shape_library"):
+            document._shape_library = DirectShapeLibrary()
+        return document._shape_library
+
+    def Contains(self, definition_id):
+        return definition_id in self._definitions
+
+    def AddDefinition(self, definition_id, shapes):
+        count("DirectShapeLibrary.AddDefinition")
+        self._definitions[definition_id] = list(shapes)
+
+    def FindDefinition(self, definition_id):
+        return list(self._definitions.get(definition_id, []))
+
+
+class GeometryInstance(object):
+    def __init__(self, objects):
+        self._objects = objects
+
+    def GetInstanceGeometry(self):
+        return list(self._objects)
+
+
+class ElementTransformUtils(object):
+    @staticmethod
+    def _rotate(document, element_ids, axis, angle):
+        document._require_transaction()
+        matrix = rotation_matrix(axis.Direction, angle)
+        for element_id in element_ids:
+            element = document.GetElement(element_id, _counted=False)
+            element._transform(matrix, axis.Origin)
+            document._touch(element)
+        # Revit regenerates the moved elements once per transform call
+        document._regenerations += 1
+
+    @staticmethod
+    def RotateElement(document, element_id, axis, angle):
+        count("ElementTransformUtils.RotateElement")
+        ElementTransformUtils._rotate(document, [element_id], axis, angle)
+
+    @staticmethod
+    def RotateElements(document, element_ids, axis, angle):
+        count("ElementTransformUtils.RotateElements")
+        ElementTransformUtils._rotate(document, list(element_ids), axis, angle)
+
+    @staticmethod
+    def MoveElement(document, element_id, translation):
+        count("ElementTransformUtils.MoveElement")
+        ElementTransformUtils._move(document, [element_id], translation)
+
+    @staticmethod
+    def MoveElements(document, element_ids, translation):
+        count("ElementTransformUtils.MoveElements")
+        ElementTransformUtils._move(document, list(element_ids), translation)
+
+    @staticmethod
+    def _move(document, element_ids, translation):
+        document._require_transaction()
+        for element_id in element_ids:
+            element = document.GetElement(element_id, _counted=False)
+            element.center = element.center + translation
+            document._touch(element)
+        document._regenerations += 1
+
+
+class ElementFilter(object):
+    def passes(self, element):
+        return True
+
+
+class ElementClassFilter(ElementFilter):
+    def __init__(self, cls):
+        self.cls = cls
+
+    def passes(self, element):
+        return isinstance(element, self.cls)
+
+
+class FilteredElementCollector(object):
+    def __init__(self, document, view_id=None):
+        count("FilteredElementCollector")
+        self._document = document
+        self._filters = []
+
+    def OfCategory(self, bic):
+        self._filters.append(lambda e: e.Category is not None and e.Category.Id.IntegerValue == bic)
+        return self
+
+    def OfClass(self, cls):
+        self._filters.append(lambda e: isinstance(e, cls))
+        return self
+
+    def WhereElementIsNotElementType(self):
+        return self
+
+    def WherePasses(self, element_filter):
+        self._filters.append(element_filter.passes)
+        return self
+
+    def _elements(self):
+        out = []
+        for element in self._document._elements.values():
+            # A real collector walks every element of the document
+            self._document._scanned += 1
+            if all(f(element) for f in self._filters):
+                out.append(element)
+        return out
+
+    def ToElements(self):
+        return self._elements()
+
+    def ToElementIds(self):
+        return [e.Id for e in self._elements()]
+
+    def GetElementCount(self):
+        return len(self._elements())
+
+    def FirstElement(self):
+        elements = self._elements()
+        return elements[0] if elements else None
+
+    def __iter__(self):
+        return iter(self._elements())
+
+
+class TransactionStatus(object):
+    Uninitialized = 0
+    Started = 1
+    RolledBack = 2
+    Committed = 3
+
+
+class DocumentChangedEventArgs(object):
+    def __init__(self, document, added, modified, deleted, names):
+        self._document = document
+        self._added = added
+        self._modified = modified
+        self._deleted = deleted
+        self._names = names
+
+    def GetDocument(self):
+        return self._document
+
+    def GetAddedElementIds(self):
+        return list(self._added)
+
+    def GetModifiedElementIds(self):
+        return list(self._modified)
+
+    def GetDeletedElementIds(self):
+        return list(self._deleted)
+
+    def GetTransactionNames(self):
+        return list(self._names)
+
+
+class DocumentClosingEventArgs(object):
+    def __init__(self, document):
+        self.Document = document
+
+
+class Event(object):
+    """Supports the IronPython `event += handler` idiom."""
+
+    def __init__(self):
+        self.handlers = []
+
+    def __iadd__(self, handler):
+        self.handlers.append(handler)
+        return self
+
+    def __isub__(self, handler):
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+        return self
+
+    def fire(self, sender, args):
+        for handler in list(self.handlers):
+            handler(sender, args)
+
+
+class Application(object):
+    def __init__(self):
+        self.DocumentChanged = Event()
+        self.DocumentClosing = Event()
+        self.VersionNumber = "2024"
+
+
+class Transaction(object):
+    def __init__(self, document, name=""):
+        self._document = document
+        self._name = name
+        self._status = TransactionStatus.Uninitialized
+
+    def Start(self, name=None):
+        count("Transaction.Start")
+        if self._document._transaction is not None:
+            raise Exception("Another transaction is already open.")
+        self._name = name or self._name
+        self._document._begin(self)
+        self._status = TransactionStatus.Started
+        return self._status
+
+    def Commit(self):
+        count("Transaction.Commit")
+        self._document._commit(self)
+        self._status = TransactionStatus.Committed
+        return self._status
+
+    def RollBack(self):
+        count("Transaction.RollBack")
+        self._document._rollback(self)
+        self._status = TransactionStatus.RolledBack
+        return self._status
+
+    def GetStatus(self):
+        return self._status
+
+    def GetName(self):
+        return self._name
+
+    def HasStarted(self):
+        return self._status == TransactionStatus.Started
+
+    def Dispose(self):
+        if self._status == TransactionStatus.Started:
+            self.RollBack()
+
+
+class TransactionGroup(object):
+    def __init__(self, document, name=""):
+        self._document = document
+        self._name = name
+        self._status = TransactionStatus.Uninitialized
+
+    def Start(self, name=None):
+        count("TransactionGroup.Start")
+        self._name = name or self._name
+        self._mark = len(self._document.undo_stack)
+        self._snapshot = self._document._snapshot()
+        self._document._groups.append(self)
+        self._status = TransactionStatus.Started
+        return self._status
+
+    def _close(self):
+        self._document._groups.remove(self)
+
+    def Assimilate(self):
+        count("TransactionGroup.Assimilate")
+        self._close()
+        entries = self._document.undo_stack[self._mark:]
+        del self._document.undo_stack[self._mark:]
+        if entries:
+            self._document.undo_stack.append((self._name, entries[0][1]))
+        self._status = TransactionStatus.Committed
+        return self._status
+
+    def Commit(self):
+        count("TransactionGroup.Commit")
+        self._close()
+        self._status = TransactionStatus.Committed
+        return self._status
+
+    def RollBack(self):
+        count("TransactionGroup.RollBack")
+        self._close()
+        del self._document.undo_stack[self._mark:]
+        self._document._restore(self._snapshot)
+        self._status = TransactionStatus.RolledBack
+        return self._status
+
+    def GetStatus(self):
+        return self._status
+
+    def HasStarted(self):
+        return self._status == TransactionStatus.Started
+
+
+class Document(object):
+    """In-memory document with undo snapshots and DocumentChanged events."""
+
+    def __init__(self, title="Headless Project", path=""):
+        self.Title = title
+        self.PathName = path
+        self.IsValidObject = True
+        self.Application = Application()
+        self._elements = collections.OrderedDict()
+        self._id = 1000
+        self._transaction = None
+        self._groups = []
+        self._changes = None
+        self._scanned = 0
+        self._regenerations = 0
+        self.undo_stack = []
+        self.redo_stack = []
+        self.ProjectInformation = ProjectInfo(self)
+        self._elements[self.ProjectInformation.Id] = self.ProjectInformation
+
+    def _next_id(self):
+        self._id += 1
+        return ElementId(self._id)
+
+    def GetHashCode(self):
+        return id(self)
+
+    def Equals(self, other):
+        return self is other
+
+    def Close(self, saveModified=False):
+        """Fires DocumentClosing, then invalidates the document and its elements."""
+        self.Application.DocumentClosing.fire(self.Application, DocumentClosingEventArgs(self))
+        self.IsValidObject = False
+        for element in self._elements.values():
+            element.IsValidObject = False
+        return True
+
+    @property
+    def IsModifiable(self):
+        return self._transaction is not None
+
+    def _require_transaction(self):
+        if self._transaction is None:
+            raise Exception("Attempt to modify the model outside of transaction.")
+
+    def GetElement(self, element_id, _counted=True):
+        if _counted:
+            count("Document.GetElement")
+        return self._elements.get(element_id)
+
+    def Regenerate(self):
+        count("Document.Regenerate")
+
+    def _add(self, element):
+        self._elements[element.Id] = element
+        self._changes[0].add(element.Id)
+
+    def Delete(self, element_id):
+        count("Document.Delete")
+        self._require_transaction()
+        element = self._elements.pop(element_id, None)
+        if element is not None:
+            element.IsValidObject = False
+            self._changes[2].add(element_id)
+        return [element_id]
+
+    def _touch(self, element):
+        if self._changes is not None and element.Id not in self._changes[0]:
+            self._changes[1].add(element.Id)
+
+    def _snapshot(self):
+        return dict((eid, (e, e._snapshot())) for eid, e in self._elements.items())
+
+    def _restore(self, snapshot):
+        for eid, element in list(self._elements.items()):
+            if eid not in snapshot:
+                element.IsValidObject = False
+        self._elements = collections.OrderedDict()
+        for eid, (element, state) in sorted(snapshot.items(), key=lambda item: item[0].IntegerValue):
+            element.IsValidObject = True
+            element._restore(state)
+            self._elements[eid] = element
+
+    def _begin(self, transaction):
+        self._transaction = transaction
+        self._before = self._snapshot()
+        self._changes = (set(), set(), set())
+
+    def _commit(self, transaction):
+        self._transaction = None
+        added, modified, deleted = self._changes
+        self._changes = None
+        # Undo restores the snapshot taken when the transaction started
+        self.undo_stack.append((transaction.GetName(), self._before))
+        self.redo_stack = []
+        self._fire(added, modified, deleted, [transaction.GetName()])
+
+    def _rollback(self, transaction):
+        self._transaction = None
+        self._changes = None
+        self._restore(self._before)
+
+    def _fire(self, added, modified, deleted, names):
+        args = DocumentChangedEventArgs(self, sorted(added, key=_id_value), sorted(modified, key=_id_value),
+                                        sorted(deleted, key=_id_value), names)
+        self.Application.DocumentChanged.fire(self.Application, args)
+
+    def Undo(self):
+        """Stand-in for the Undo button: restores the state before the last entry."""
+        name, before = self.undo_stack.pop()
+        after = self._snapshot()
+        self.redo_stack.append((name, after))
+        self._restore(before)
+        self._fire_diff(after, before, name)
+
+    def Redo(self):
+        name, after = self.redo_stack.pop()
+        before = self._snapshot()
+        self.undo_stack.append((name, before))
+        self._restore(after)
+        self._fire_diff(before, after, name)
+
+    def _fire_diff(self, old, new, name):
+        added = [eid for eid in new if eid not in old]
+        deleted = [eid for eid in old if eid not in new]
+        modified = [eid for eid in new if eid in old]
+        self._fire(added, modified, deleted, [name])
+
+
+def _id_value(element_id):
+    return element_id.IntegerValue
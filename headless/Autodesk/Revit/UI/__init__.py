@@ -0,0 +1,104 @@
+"""Stand-in for Autodesk.Revit.UI: ExternalEvents run when the harness pumps them."""
+import threading
+
+from Autodesk.Revit.DB import Event, count
+
+_RAISED = []
+_LOCK = threading.Lock()
+
+
+class IExternalEventHandler(object):
+    def Execute(self, uiapp):
+        raise NotImplementedError
+
+    def GetName(self):
+        return ""
+
+
+class ExternalEventRequest(object):
+    Accepted = 0
+    Pending = 1
+    Denied = 2
+
+
+class ExternalEvent(object):
+    def __init__(self, handler):
+        self._handler = handler
+        self._pending = False
+
+    @staticmethod
+    def Create(handler):
+        count("ExternalEvent.Create")
+        return ExternalEvent(handler)
+
+    def Raise(self):
+        # Callable from any thread, like the real API.
+        count("ExternalEvent.Raise")
+        with _LOCK:
+            if self._pending:
+                return ExternalEventRequest.Pending
+            self._pending = True
+            _RAISED.append(self)
+        return ExternalEventRequest.Accepted
+
+    def Dispose(self):
+        pass
+
+    @staticmethod
+    def pump(uiapp=None):
+        """Runs every raised event on the calling thread, as Revit does when idle."""
+        with _LOCK:
+            raised = _RAISED[:]
+            del _RAISED[:]
+            for event in raised:
+                event._pending = False
+        for event in raised:
+            event._handler.Execute(uiapp)
+        return len(raised)
+
+
+class IdlingEventArgs(object):
+    def __init__(self):
+        self.raise_without_delay = False
+
+    def SetRaiseWithoutDelay(self):
+        self.raise_without_delay = True
+
+
+class UIApplication(object):
+    def __init__(self):
+        self.Idling = Event()
+
+    def idle(self):
+        """Raises Idling once, as Revit does when it has nothing to do.
+
+        Returns True when a handler asked to be raised again right away.
+        """
+        args = IdlingEventArgs()
+        for handler in list(self.Idling.handlers):
+            handler(self, args)
+        return args.raise_without_delay
+
+
+class Selection(object):
+    def __init__(self):
+        self._ids = []
+
+    def GetElementIds(self):
+        return list(self._ids)
+
+    def SetElementIds(self, ids):
+        self._ids = list(ids)
+
+
+class UIDocument(object):
+    def __init__(self, document):
+        self.Document = document
+        self.Selection = Selection()
+        # Called after every redraw; harnesses use it to model drawing cost.
+        self.on_refresh = None
+
+    def RefreshActiveView(self):
+        count("UIDocument.RefreshActiveView")
+        if self.on_refresh is not None:
+            self.on_refresh()
@@ -0,0 +1,23 @@
+"""Stand-in for System.Collections.Generic."""
+
+
+class _GenericList(list):
+    def Add(self, item):
+        self.append(item)
+
+    def AddRange(self, items):
+        self.extend(items)
+
+
+class _ListFactory(object):
+    """Supports the IronPython `List[ElementId](items)` idiom."""
+
+    def __getitem__(self, item_type):
+        return _GenericList
+
+    def __call__(self, items=()):
+        return _GenericList(items)
+
+
+List = _ListFactory()
+IList = List
@@ -0,0 +1,50 @@
+"""Stand-in for the parts of the .NET System namespace the extension uses."""
+
+
+class Guid(object):
+    def __init__(self, value):
+        self._value = str(value).upper()
+
+    @staticmethod
+    def NewGuid():
+        import uuid
+        return Guid(uuid.uuid4())
+
+    def ToString(self):
+        return self._value.lower()
+
+    def __eq__(self, other):
+        return isinstance(other, Guid) and other._value == self._value
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._value)
+
+    def __str__(self):
+        return self.ToString()
+
+    def __repr__(self):
+        return "Guid({})".format(self._value)
+
+
+String = str
+
+
+class AppDomain(object):
+    """Process-wide named slots, like AppDomain.CurrentDomain.Get/SetData."""
+
+    def __init__(self):
+        self._data = {}
+
+    def GetData(self, name):
+        return self._data.get(name)
+
+    def SetData(self, name, value):
+        self._data[name] = value
+
+
+AppDomain.CurrentDomain = AppDomain()
+Int32 = int
+Byte = int
@@ -0,0 +1,69 @@
+"""Drives the background Solve Cube command headless with pumped ExternalEvents.
+
+Reports the progress timeline, UI-thread pump latency, and cancel latency.
+Usage: python headless/bench_background_solve.py [scramble_length] [cancel_after_s]
+"""
+import random
+import sys
+import time
+
+import fixture
+from Autodesk.Revit.UI import ExternalEvent
+from pyrevit import forms, script
+
+import rubiks_solve_job
+
+
+def wait(interval=0.05, timeout=300.0):
+    # Stand-in for the Revit UI loop: pump raised events until the job ends.
+    start = time.time()
+    longest = 0.0
+    while time.time() - start < timeout:
+        tick = time.time()
+        ExternalEvent.pump()
+        longest = max(longest, time.time() - tick)
+        job = rubiks_solve_job.current_job()
+        if job is not None and not job.running:
+            ExternalEvent.pump()
+            return longest
+        time.sleep(interval)
+    raise RuntimeError("solve did not finish")
+
+
+def main(argv):
+    length = int(argv[1]) if len(argv) > 1 else 25
+    cancel_after = float(argv[2]) if len(argv) > 2 else 0.3
+    doc = fixture.make_document()
+    fixture.run(doc, "Solve", "Initialize")
+    rng = random.Random(11)
+    for _ in range(length):
+        fixture.rotate(doc, rng.choice("UDLRFB"), rng.random() < 0.5)
+
+    output = script.get_output()
+    del output.lines[:]
+    start = time.time()
+    fixture.run(doc, "Solve", "Solve Cube")
+    returned = time.time() - start
+    longest = wait()
+    print("button returned after {:.1f} ms; longest UI pump {:.1f} ms".format(1000 * returned, 1000 * longest))
+    for line in output.lines:
+        print("  " + line)
+    print("  result: " + forms.ALERTS[-1][1].replace("\n", " "))
+
+    del output.lines[:]
+    fixture.run(doc, "Solve", "Solve Cube")
+    time.sleep(cancel_after)
+    click = time.time()
+    if not rubiks_solve_job.current_job().running:
+        print("\nsolve finished before the cancel click at {:.1f} s".format(cancel_after))
+        return
+    print("\ncancel click after {:.1f} s: {}".format(cancel_after, fixture.run(doc, "Solve", "Solve Cube")[-1][1]))
+    wait()
+    job = rubiks_solve_job.current_job()
+    print("  stopped {:.1f} ms after the click, cancelled={}, best={}".format(
+        1000 * (time.time() - click), job.cancelled, job.solution() or None))
+    print("  result: " + forms.ALERTS[-1][1].replace("\n", " "))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
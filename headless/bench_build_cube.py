@@ -0,0 +1,67 @@
+"""Build Cube: procedural cubies from cached DirectShapeLibrary definitions.
+
+Runs the button once on an empty document, then builds many cubes in one
+transaction and reports time, API calls and definitions per cube. Every
+built cube must validate, read back as solved from its geometry, and
+survive a scramble and solve.
+Usage: python headless/bench_build_cube.py [cubes]
+"""
+import sys
+import time
+
+import fixture
+from Autodesk.Revit import DB
+from pyrevit import forms
+
+import rubiks_build
+import rubiks_engine
+import rubiks_state
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 50
+    doc = DB.Document()
+    rubiks_engine.warm_state(doc)
+
+    # The button with its suggested name and placement.
+    alerts = fixture.run(doc, "Solve", "Build Cube")
+    print("Build Cube button: {}".format(alerts[-1][1]))
+    ok, report = rubiks_state.validate_state(doc)
+    config, problems = rubiks_state.read_config_from_geometry(doc)
+    print("  validate {}, geometry reads solved {}, undo entries {}".format(
+        ok, config == rubiks_state.SOLVED_CONFIG, len(doc.undo_stack)))
+    forms.RESPONSES[:] = ["", "0, 0, 0, 1"]
+    print("  same name again: {}".format(fixture.run(doc, "Solve", "Build Cube")[-1][1].splitlines()[-1]))
+
+    DB.reset_calls()
+    start = time.time()
+    t = DB.Transaction(doc, "Build Many")
+    t.Start()
+    for i in range(count):
+        size = (0.5, 1.0, 2.0)[i % 3]
+        origin = DB.XYZ(10.0 * (i % 10), 10.0 * (i // 10) + 10.0, 0)
+        rubiks_build.build_cube(rubiks_state, doc, origin, size, "Cube {}".format(i + 2))
+    t.Commit()
+    elapsed = time.time() - start
+    print("\n{} cubes in one transaction: {:.1f} ms, {:.2f} ms per cube".format(
+        count, 1000 * elapsed, 1000 * elapsed / count))
+    for name in ("DirectShapeLibrary.AddDefinition", "GeometryCreationUtilities.CreateExtrusionGeometry",
+                 "DirectShape.CreateGeometryInstance", "DirectShape.CreateElement", "Material.Create",
+                 "FilteredElementCollector"):
+        print("  {:<50} {:7.2f} per cube".format(name, DB.CALLS.get(name, 0) / float(count)))
+
+    cubes = rubiks_state.list_cubes(doc)
+    bad = [rubiks_state.cube_name(cube) for cube in cubes if not rubiks_state.validate_state(doc, cube)[0]]
+    print("\n{} cubes in the model, {} fail validation".format(len(cubes), len(bad)))
+    alerts = fixture.run(doc, "Solve", "Scramble All Cubes")
+    print("Scramble All Cubes: {}".format(alerts[-1][1]))
+    alerts = fixture.run(doc, "Solve", "Solve All Cubes")
+    print("Solve All Cubes: {}".format(alerts[-1][1].splitlines()[0]))
+    solved = sum(
+        rubiks_state.read_config_from_geometry(doc, cube)[0] == rubiks_state.SOLVED_CONFIG for cube in cubes
+    )
+    print("{} of {} cubes read back as solved from their geometry".format(solved, len(cubes)))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,79 @@
+"""Bursts of rotation clicks through the Idling move queue.
+
+Revit raises Idling between clicks; the harness does the same with a real
+clock, so the queue's quiet period decides how clicks batch. Reports click
+latency, transactions, regenerations and RotateElements calls against one transaction per
+click, and checks the cube ends where the clicked moves say.
+Usage: python headless/bench_move_queue.py [bursts] [clicks_per_burst] [click_gap_ms]
+"""
+import random
+import sys
+import time
+
+import fixture
+from Autodesk.Revit import DB
+from pyrevit import HOST_APP
+
+import rubiks_engine
+import rubiks_state
+
+
+def click_burst(doc, moves, gap):
+    latencies = []
+    for move in moves:
+        start = time.time()
+        fixture.rotate(doc, move[0], not move.endswith("'"), flush=False)
+        latencies.append(time.time() - start)
+        # Revit idles between clicks; the queue asks to be raised again.
+        deadline = time.time() + gap
+        while time.time() < deadline:
+            HOST_APP.uiapp.idle()
+            time.sleep(0.005)
+    while HOST_APP.uiapp.idle():
+        time.sleep(0.005)
+    return latencies
+
+
+def main(argv):
+    bursts = int(argv[1]) if len(argv) > 1 else 10
+    clicks = int(argv[2]) if len(argv) > 2 else 8
+    gap = (float(argv[3]) if len(argv) > 3 else 40.0) / 1000.0
+    rng = random.Random(4)
+    plan = []
+    for _ in range(bursts):
+        burst = []
+        for _ in range(clicks):
+            # Every so often undo the last click, as users do.
+            if burst and rng.random() < 0.25:
+                last = burst[-1]
+                burst.append(last[:-1] if last.endswith("'") else last + "'")
+            else:
+                burst.append(rng.choice("UDLRFB") + rng.choice(["", "'"]))
+        plan.append(burst)
+
+    for label, delay in (("one transaction per click", 0.0), ("idle-time queue", rubiks_engine.FLUSH_DELAY)):
+        doc = fixture.make_document()
+        fixture.run(doc, "Solve", "Initialize")
+        rubiks_engine.get_engine().flush_delay = delay
+        DB.reset_calls()
+        doc._regenerations = 0
+        transactions = len(doc.undo_stack)
+        latencies = []
+        start = time.time()
+        for burst in plan:
+            latencies += click_burst(doc, burst, gap)
+        elapsed = time.time() - start
+        expected = rubiks_state._move_coords(rubiks_state.SOLVED_COORDS, [m for b in plan for m in b])
+        state = rubiks_state.ensure_state(doc)
+        latencies.sort()
+        print("{}: {} clicks, {} transactions, {} regenerations, {} RotateElements, click p50 {:.2f} ms max {:.2f} ms, "
+              "{:.1f} s, state matches: {}, drifted: {}".format(
+                  label, len(latencies), len(doc.undo_stack) - transactions, doc._regenerations,
+                  DB.CALLS.get("ElementTransformUtils.RotateElements", 0),
+                  1000 * latencies[len(latencies) // 2], 1000 * latencies[-1], elapsed,
+                  state["coords"] == expected, rubiks_state.verify_slot_map(doc)))
+    rubiks_engine.get_engine().flush_delay = rubiks_engine.FLUSH_DELAY
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,99 @@
+"""Many cubes in one document: grouping, active cube and the batch commands.
+
+Builds cubes of mixed sizes at scattered origins, each named through its
+Comments, then times Initialize, the grouped collector pass, a rotation of
+the selected cube and Scramble/Solve All Cubes, checking every cube after
+each step.
+Usage: python headless/bench_multi_cube.py [cubes]
+"""
+import string
+import sys
+import time
+
+import fixture
+from Autodesk.Revit import DB
+from pyrevit import forms
+
+import rubiks_engine
+import rubiks_state
+
+
+def build(count):
+    doc = DB.Document()
+    t = DB.Transaction(doc, "Build")
+    t.Start()
+    for i in range(count):
+        size = (0.5, 1.0, 2.0)[i % 3]
+        origin = (12.0 * (i % 6) + 0.25, 12.0 * (i // 6) - 3.5, 0.75 * (i % 4))
+        fixture.add_cube(doc, origin, size, "Cubeys:" + string.ascii_uppercase[i % 26] + str(i // 26 or ""))
+    t.Commit()
+    doc.undo_stack = []
+    return doc
+
+
+def check(doc):
+    # (solved cubes, cubes whose saved state disagrees with the geometry)
+    solved, bad = 0, []
+    for cube in rubiks_state.list_cubes(doc):
+        ok, report = rubiks_state.validate_state(doc, cube)
+        if not ok:
+            bad.append((cube["name"], [line for line in report if "not" in line or "does" in line]))
+        state = rubiks_state.ensure_state(doc, exitscript_on_error=False, require_initialized=True, cube=cube)
+        solved += state["coords"] == rubiks_state.SOLVED_COORDS
+    return solved, bad
+
+
+def timed(label, doc, action):
+    DB.reset_calls()
+    undo = len(doc.undo_stack)
+    start = time.time()
+    result = action()
+    print("{:<28} {:8.1f} ms  {:3d} undo entries  {:4d} collectors".format(
+        label, 1000 * (time.time() - start), len(doc.undo_stack) - undo, DB.CALLS.get("FilteredElementCollector", 0)))
+    return result
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 24
+    doc = build(count)
+    print("{} cubes, {} cubies\n".format(count, 26 * count))
+    # Solver tables load once per session; keep them out of the timings.
+    rubiks_engine.warm_state(doc)
+
+    alerts = timed("Initialize", doc, lambda: fixture.run(doc, "Solve", "Initialize"))
+    print("  ", alerts[-1][1].splitlines()[0])
+    rubiks_state.invalidate_cubie_index(doc)
+    cubes = timed("grouped collector pass", doc, lambda: rubiks_state.list_cubes(doc))
+    sizes = sorted(set(cube["size"] for cube in cubes))
+    print("   {} cubes found, cubie sizes {}".format(len(cubes), sizes))
+
+    rubiks_state._active_cubes.clear()
+    alerts = fixture.rotate(doc, "R")
+    print("   rotate with nothing selected: {}".format(alerts[-1][1] if alerts else "no alert"))
+
+    target = cubes[2]
+    fixture.select(doc, [rubiks_state.collect_target_cubies(doc, target)[0][0].Id])
+    timed("rotate R on selected cube", doc, lambda: fixture.rotate(doc, "R"))
+    fixture.select(doc, [])
+    timed("rotate U (same cube)", doc, lambda: fixture.rotate(doc, "U"))
+    solved, bad = check(doc)
+    print("   {} of {} cubes still solved, moved: {}, issues: {}".format(
+        solved, len(cubes), target["name"], bad or "none"))
+
+    timed("Scramble All Cubes", doc, lambda: fixture.run(doc, "Solve", "Scramble All Cubes"))
+    solved, bad = check(doc)
+    print("   {} cubes solved after scrambling, issues: {}".format(solved, bad or "none"))
+
+    alerts = timed("Solve All Cubes", doc, lambda: fixture.run(doc, "Solve", "Solve All Cubes"))
+    print("  ", alerts[-1][1].splitlines()[0])
+    solved, bad = check(doc)
+    print("   {} of {} cubes solved, issues: {}".format(solved, len(cubes), bad or "none"))
+
+    doc.Undo()
+    solved, bad = check(doc)
+    print("Undo Solve All: {} cubes solved, issues: {}".format(solved, bad or "none"))
+    del forms.ALERTS[:]
+
+
+if __name__ == "__main__":
+    main(sys.argv)
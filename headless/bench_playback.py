@@ -0,0 +1,68 @@
+"""Frame pacing of the animated solution playback.
+
+Part one drives FrameScheduler with a simulated clock and a fixed drawing
+cost per frame, showing drawn and skipped frames and the playback length
+against the target. Part two plays a real solution on the stand-in
+document and checks the undo stack and the final state.
+Usage: python headless/bench_playback.py [turns]
+"""
+import random
+import sys
+import time
+
+import fixture
+from Autodesk.Revit import DB
+
+import rubiks_playback
+import rubiks_state
+
+
+class SimulatedClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+
+def pacing(turns, cost):
+    clock = SimulatedClock()
+    scheduler = rubiks_playback.FrameScheduler(clock=clock.clock, sleep=clock.sleep)
+    last = {}
+    for turn, frame in scheduler.frames(turns):
+        clock.now += cost
+        last[turn] = frame
+    complete = all(last[t] == scheduler.frames_per_turn for t in range(turns))
+    target = turns * scheduler.frames_per_turn / scheduler.frame_rate
+    return scheduler.drawn, scheduler.skipped, clock.now, target, complete
+
+
+def main(argv):
+    turns = int(argv[1]) if len(argv) > 1 else 20
+    print("frame cost  drawn  skipped  length   target  every turn completes")
+    for cost in (0.005, 0.03, 0.06, 0.12, 0.5):
+        drawn, skipped, length, target, complete = pacing(turns, cost)
+        print("{:7.0f} ms  {:5d}  {:7d}  {:5.2f} s  {:5.2f} s  {}".format(1000 * cost, drawn, skipped, length, target, complete))
+
+    doc = fixture.make_document()
+    fixture.run(doc, "Solve", "Initialize")
+    rng = random.Random(2)
+    for _ in range(turns + 5):
+        fixture.rotate(doc, rng.choice("UDLRFB"), rng.random() < 0.5)
+    undo = len(doc.undo_stack)
+    DB.reset_calls()
+    start = time.time()
+    alerts = fixture.run(doc, "Solve", "Play Solution")
+    print("\nPlay Solution: {:.2f} s, {} redraws, {} frame transactions, {} new undo entries, solved: {}, drifted: {}{}".format(
+        time.time() - start, DB.CALLS.get("UIDocument.RefreshActiveView", 0), DB.CALLS.get("Transaction.Commit", 0),
+        len(doc.undo_stack) - undo, rubiks_state.ensure_state(doc)["coords"] == rubiks_state.SOLVED_COORDS,
+        rubiks_state.verify_slot_map(doc), " alerts: {}".format(alerts) if alerts else ""))
+    print("undo entry: {}".format(doc.undo_stack[-1][0]))
+    print("Validate:", fixture.run(doc, "Solve", "Validate State")[-1][1].splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main(sys.argv)
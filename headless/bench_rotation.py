@@ -0,0 +1,62 @@
+"""Counts Revit API calls per face turn: per-element loop vs. rotate_layer.
+
+Usage: python headless/bench_rotation.py [moves] [filler_elements]
+"""
+import random
+import sys
+import time
+
+import fixture
+from Autodesk.Revit import DB
+
+import rubiks_state
+
+
+def rotate_per_element(doc, move):
+    # The rotation path the buttons used before rotate_layer.
+    face_layer = rubiks_state.layer_cubies(doc, move[0], exitscript_on_error=False)
+    axis, angle = rubiks_state.move_axis(move, rubiks_state.active_cube(doc))
+    for cubey in face_layer:
+        DB.ElementTransformUtils.RotateElement(doc, cubey.Id, axis, angle)
+    rubiks_state.apply_move(doc, move)
+
+
+def rotate_batched(doc, move):
+    rubiks_state.rotate_layer(doc, move)
+
+
+def run(rotate, moves, filler):
+    doc = fixture.make_document(filler=filler)
+    fixture.run(doc, "Solve", "Initialize")
+    DB.reset_calls()
+    doc._regenerations = 0
+    elapsed = 0.0
+    for move in moves:
+        start = time.time()
+        t = DB.Transaction(doc, "Rotate")
+        t.Start()
+        rotate(doc, move)
+        t.Commit()
+        elapsed += time.time() - start
+    calls = dict(DB.CALLS)
+    return calls, doc._regenerations, elapsed, rubiks_state.verify_slot_map(doc)
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 200
+    filler = int(argv[2]) if len(argv) > 2 else 0
+    rng = random.Random(2024)
+    moves = [rng.choice("UDLRFB") + rng.choice(["", "'", "2"]) for _ in range(count)]
+
+    print("{} moves, {} filler elements".format(count, filler))
+    for name, rotate in (("per-element", rotate_per_element), ("batched", rotate_batched)):
+        calls, regenerations, elapsed, drifted = run(rotate, moves, filler)
+        total = sum(calls.values())
+        print("\n{}: {:.2f} ms/move, {:.1f} API calls/move, {:.1f} regenerations/move, drifted={}".format(
+            name, 1000.0 * elapsed / count, float(total) / count, float(regenerations) / count, drifted))
+        for api, n in sorted(calls.items(), key=lambda item: -item[1]):
+            print("  {:<40} {:>8.2f}".format(api, float(n) / count))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
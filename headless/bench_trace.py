@@ -0,0 +1,47 @@
+"""Cost of the timing spans: rotation clicks with timing off, then on.
+
+Clicks the same random rotations twice on fresh documents, first with
+timing off and then with it on, logging to a temporary folder. Prints
+ms/click for both and the percentile report of the timed run.
+Usage: python headless/bench_trace.py [clicks]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import fixture
+
+import rubiks_trace
+
+
+def run(clicks):
+    doc = fixture.make_document()
+    fixture.run(doc, "Solve", "Initialize")
+    start = time.time()
+    for face, clockwise in clicks:
+        fixture.rotate(doc, face, clockwise)
+    return 1000.0 * (time.time() - start) / len(clicks)
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 1000
+    rng = random.Random(50)
+    clicks = [(rng.choice("UDLRFB"), rng.random() < 0.5) for _ in range(count)]
+    folder = tempfile.mkdtemp()
+    os.environ[rubiks_trace.ENV_DIR] = folder
+    try:
+        os.environ[rubiks_trace.ENV_FLAG] = "0"
+        off = run(clicks)
+        os.environ[rubiks_trace.ENV_FLAG] = "1"
+        on = run(clicks)
+        print("{} clicks: timing off {:.3f} ms/click, on {:.3f} ms/click\n".format(count, off, on))
+        rubiks_trace.main(["rubiks_trace.py"])
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
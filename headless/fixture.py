@@ -0,0 +1,119 @@
+"""Builds a headless document holding the 26 Cubeys and runs button scripts."""
+import os
+import runpy
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXT = os.path.join(os.path.dirname(HERE), "Rubiks Cube.extension")
+TAB = os.path.join(EXT, "Rubiks Cube.tab")
+for p in (HERE, os.path.join(EXT, "lib")):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from Autodesk.Revit import DB  # noqa: E402
+from Autodesk.Revit.DB.ExtensibleStorage import AccessLevel, Entity, Schema, SchemaBuilder  # noqa: E402
+from Autodesk.Revit.UI import UIDocument  # noqa: E402
+from pyrevit import forms, revit  # noqa: E402
+from System import Guid, String  # noqa: E402
+
+# Schema v3, the state the original add-in kept on ProjectInformation.
+V3_SCHEMA_GUID = Guid("6A22FE1F-C4AF-4E74-8A5C-1D1F8946E1D7")
+SOLVED_CONFIG = "yyyyyyyyybbbbbbbbbrrrrrrrrrgggggggggooooooooowwwwwwwww"
+
+COLOURS = {(0, 0, 1): "Yellow", (0, 0, -1): "White", (1, 0, 0): "Green",
+           (-1, 0, 0): "Blue", (0, -1, 0): "Red", (0, 1, 0): "Orange"}
+
+
+def make_document(filler=0, comments="Cubeys"):
+    doc = DB.Document()
+    t = DB.Transaction(doc, "Build")
+    t.Start()
+    add_cube(doc, comments=comments)
+    for i in range(filler):
+        shape = DB.DirectShape.CreateElement(doc, DB.ElementId(DB.BuiltInCategory.OST_GenericModel))
+        shape.center = DB.XYZ(10 + i, 0, 0)
+        shape.size = 0.5
+    t.Commit()
+    doc.undo_stack = []
+    return doc
+
+
+def add_cube(doc, origin=(0, 0, 0), size=1.0, comments="Cubeys"):
+    """Adds 26 solved cubies around origin; call inside a transaction."""
+    materials = dict((m.Name, m.Id) for m in doc._elements.values() if isinstance(m, DB.Material))
+    for normal, name in sorted(COLOURS.items()):
+        if name not in materials:
+            materials[name] = DB.Material.Create(doc, name)
+    shapes = []
+    n = 0
+    for x in (-1, 0, 1):
+        for y in (-1, 0, 1):
+            for z in (-1, 0, 1):
+                if (x, y, z) == (0, 0, 0):
+                    continue
+                n += 1
+                shape = DB.DirectShape.CreateElement(doc, DB.ElementId(DB.BuiltInCategory.OST_GenericModel))
+                faces = {}
+                for normal, name in COLOURS.items():
+                    if (normal[0] and normal[0] == x) or (normal[1] and normal[1] == y) or (normal[2] and normal[2] == z):
+                        faces[normal] = materials[name]
+                shape.center = DB.XYZ(origin[0] + x * size, origin[1] + y * size, origin[2] + z * size)
+                shape.size = 0.95 * size
+                shape.face_materials = faces
+                shape.get_Parameter(DB.BuiltInParameter.ALL_MODEL_MARK)._value = "C{:02d}".format(n)
+                shape.get_Parameter(DB.BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS)._value = comments
+                shapes.append(shape)
+    return shapes
+
+
+def store_v3_state(doc, project_key, config=SOLVED_CONFIG):
+    """Saves the cube the way the original add-in did; call inside a transaction."""
+    schema = Schema.Lookup(V3_SCHEMA_GUID)
+    if schema is None:
+        builder = SchemaBuilder(V3_SCHEMA_GUID)
+        builder.SetSchemaName("RubiksCubeState")
+        builder.SetReadAccessLevel(AccessLevel.Public)
+        builder.SetWriteAccessLevel(AccessLevel.Public)
+        for name in ("config", "mark_signature", "project_key"):
+            builder.AddSimpleField(name, String)
+        schema = builder.Finish()
+    marks = sorted("C{:02d}".format(n) for n in range(1, 27))
+    ent = Entity(schema)
+    ent.Set[String](schema.GetField("config"), config)
+    ent.Set[String](schema.GetField("mark_signature"), "|".join(marks))
+    ent.Set[String](schema.GetField("project_key"), project_key)
+    doc.ProjectInformation.SetEntity(ent)
+
+
+def select(doc, element_ids):
+    """Stand-in for the user selecting elements before a click."""
+    if revit.uidoc is None or revit.uidoc.Document is not doc:
+        revit.uidoc = UIDocument(doc)
+    revit.uidoc.Selection.SetElementIds(element_ids)
+
+
+def button(panel, name):
+    return os.path.join(TAB, panel + ".panel", name + ".pushbutton", "script.py")
+
+
+def run(doc, panel, name):
+    revit.doc = doc
+    if revit.uidoc is None or revit.uidoc.Document is not doc:
+        revit.uidoc = UIDocument(doc)
+    del forms.ALERTS[:]
+    try:
+        runpy.run_path(button(panel, name), run_name="__main__")
+    except SystemExit:
+        pass
+    return list(forms.ALERTS)
+
+
+def rotate(doc, face, clockwise=True, flush=True):
+    names = {"U": "Up", "D": "Down", "L": "Left", "R": "Right", "F": "Front", "B": "Back"}
+    panel = "Clockwise Rotation" if clockwise else "Counter Clockwise Rotation"
+    run(doc, panel, "Rotate " + names[face])
+    if flush:
+        # Stand-in for Revit going idle after the click.
+        import rubiks_engine
+        rubiks_engine.get_engine().flush()
+    return list(forms.ALERTS)
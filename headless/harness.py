@@ -0,0 +1,221 @@
+"""End-to-end run of the buttons headless: latency and API calls per command.
+
+Every step runs the real pushbutton script through fixture.run, against the
+pure-Python API stand-in, so the numbers cover the whole click: script load,
+state checks, collectors, transforms, storage and the commit. It first
+checks that a document saved by the original add-in (v3 state) still works.
+A round is
+Initialize, a scramble of rotation clicks, Validate State, Solve Cube (the
+background search, pumped until its result), Apply Solution and Validate
+State again. The soak then clicks random rotations and checks the stored
+state against the geometry as it goes, ending with a solve.
+
+Prints p50/p95/max latency and mean API calls per command, and exits
+non-zero when any check fails so CI can run it as is.
+Usage: python headless/harness.py [rounds] [soak_moves] [filler_elements]
+"""
+import random
+import sys
+import time
+
+import fixture
+from Autodesk.Revit import DB
+from Autodesk.Revit.UI import ExternalEvent
+
+import rubiks_solve_job
+import rubiks_state
+
+SCRAMBLE_CLICKS = 20
+# Soak: checks and a latency line every this many moves.
+SOAK_WINDOW = 1000
+# Undo entries kept during the soak; Revit caps its undo list too.
+UNDO_KEPT = 100
+
+
+def percentile(values, p):
+    # Nearest-rank percentile of a non-empty list.
+    ordered = sorted(values)
+    rank = max(1, int(-(-p * len(ordered) // 100)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Recorder(object):
+    # Wall time and API calls of each command run, by command name.
+
+    def __init__(self):
+        self.runs = {}
+
+    def measure(self, name, action):
+        before = sum(DB.CALLS.values())
+        start = time.time()
+        result = action()
+        elapsed = time.time() - start
+        self.runs.setdefault(name, []).append((elapsed, sum(DB.CALLS.values()) - before))
+        return result
+
+    def report(self):
+        print("{:<18} {:>5} {:>10} {:>10} {:>10} {:>10}".format(
+            "command", "runs", "p50 ms", "p95 ms", "max ms", "API calls"))
+        for name, runs in sorted(self.runs.items()):
+            times = [1000.0 * elapsed for elapsed, _ in runs]
+            calls = sum(n for _, n in runs) / float(len(runs))
+            print("{:<18} {:>5} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.1f}".format(
+                name, len(runs), percentile(times, 50), percentile(times, 95), max(times), calls))
+
+
+def wait_for_solve(timeout=300.0):
+    # Stand-in for the Revit UI loop: pump raised events until the job ends.
+    start = time.time()
+    while time.time() - start < timeout:
+        ExternalEvent.pump()
+        job = rubiks_solve_job.current_job()
+        if job is not None and not job.running:
+            ExternalEvent.pump()
+            return job
+        time.sleep(0.01)
+    raise RuntimeError("solve did not finish")
+
+
+def click_rotation(doc, rng):
+    face = rng.choice("UDLRFB")
+    clockwise = rng.random() < 0.5
+    return fixture.rotate(doc, face, clockwise)
+
+
+def geometry_matches_state(doc):
+    # Independent check: the cube read back from cubie geometry and materials
+    # must be the stored state, and no cubie may have left its tracked slot.
+    config, problems = rubiks_state.read_config_from_geometry(doc)
+    if config is None:
+        return False, problems
+    coords = rubiks_state.ensure_state(doc, exitscript_on_error=False, require_initialized=True)["coords"]
+    if rubiks_state._coords_from_config(config) != coords:
+        return False, ["stored state differs from the geometry"]
+    drifted = rubiks_state.verify_slot_map(doc)
+    if drifted:
+        return False, ["drifted: " + " ".join(drifted)]
+    return True, []
+
+
+def migration_checks(failures):
+    # A document saved by the original add-in, with untagged Cubeys and the
+    # v3 state on ProjectInformation, rotates and validates before Initialize.
+    doc = fixture.make_document()
+    t = DB.Transaction(doc, "v3 state")
+    t.Start()
+    fixture.store_v3_state(doc, rubiks_state._project_key(doc))
+    t.Commit()
+    doc.undo_stack = []
+    alerts = fixture.rotate(doc, "U")
+    if alerts:
+        failures.append("v3 document, Rotate: " + alerts[-1][1])
+        return
+    alerts = fixture.run(doc, "Solve", "Validate State")
+    if not alerts[-1][0].endswith("OK"):
+        failures.append("v3 document, Validate State: " + alerts[-1][1])
+    ok, problems = geometry_matches_state(doc)
+    if not ok:
+        failures.append("v3 document: " + "; ".join(problems))
+
+    # A cube added after Initialize is listed before its own Initialize.
+    fixture.run(doc, "Solve", "Initialize")
+    t = DB.Transaction(doc, "Add cube")
+    t.Start()
+    fixture.add_cube(doc, origin=(10, 0, 0), comments="Cubeys:B")
+    t.Commit()
+    names = sorted(rubiks_state.cube_name(cube) for cube in rubiks_state.list_cubes(doc))
+    if names != ["B", "Cube"]:
+        failures.append("cube added after Initialize: listed {}".format(names))
+
+
+def run_round(doc, recorder, rng, failures):
+    alerts = recorder.measure("Initialize", lambda: fixture.run(doc, "Solve", "Initialize"))
+    if "initialized" not in alerts[-1][1]:
+        failures.append("Initialize: " + alerts[-1][1])
+    for _ in range(SCRAMBLE_CLICKS):
+        alerts = recorder.measure("Rotate", lambda: click_rotation(doc, rng))
+        if alerts:
+            failures.append("Rotate: " + alerts[-1][1])
+
+    alerts = recorder.measure("Validate State", lambda: fixture.run(doc, "Solve", "Validate State"))
+    if not alerts[-1][0].endswith("OK"):
+        failures.append("Validate State after scramble: " + alerts[-1][1])
+
+    def solve():
+        fixture.run(doc, "Solve", "Solve Cube")
+        return wait_for_solve()
+
+    job = recorder.measure("Solve Cube", solve)
+    if job.error is not None or not job.best:
+        failures.append("Solve Cube: {}".format(job.error or "no solution"))
+
+    recorder.measure("Apply Solution", lambda: fixture.run(doc, "Solve", "Apply Solution"))
+    alerts = recorder.measure("Validate State", lambda: fixture.run(doc, "Solve", "Validate State"))
+    if not alerts[-1][0].endswith("OK"):
+        failures.append("Validate State after solve: " + alerts[-1][1])
+    if rubiks_state.ensure_state(doc, exitscript_on_error=False)["coords"] != rubiks_state.SOLVED_COORDS:
+        failures.append("Apply Solution left the cube unsolved")
+
+
+def soak(doc, moves, rng, failures):
+    print("\nsoak: {} rotation clicks, checked every {}".format(moves, SOAK_WINDOW))
+    print("{:>8} {:>10} {:>10} {:>10} {:>9}  {}".format("moves", "p50 ms", "p95 ms", "max ms", "calls", "check"))
+    window = []
+    DB.reset_calls()
+    for i in range(1, moves + 1):
+        start = time.time()
+        alerts = click_rotation(doc, rng)
+        window.append(1000.0 * (time.time() - start))
+        del doc.undo_stack[:-UNDO_KEPT]
+        if alerts:
+            failures.append("soak move {}: {}".format(i, alerts[-1][1]))
+            return
+        if i % SOAK_WINDOW == 0 or i == moves:
+            ok, problems = geometry_matches_state(doc)
+            if not ok:
+                failures.append("soak move {}: {}".format(i, "; ".join(problems)))
+            print("{:>8} {:>10.2f} {:>10.2f} {:>10.2f} {:>9.1f}  {}".format(
+                i, percentile(window, 50), percentile(window, 95), max(window),
+                sum(DB.CALLS.values()) / float(len(window)), "ok" if ok else "FAILED"))
+            window = []
+            DB.reset_calls()
+
+    fixture.run(doc, "Solve", "Apply Solution")
+    solved = rubiks_state.ensure_state(doc, exitscript_on_error=False)["coords"] == rubiks_state.SOLVED_COORDS
+    ok, problems = geometry_matches_state(doc)
+    print("after Apply Solution: solved {}, geometry matches {}".format(solved, ok))
+    if not (solved and ok):
+        failures.append("soak: final solve failed {}".format("; ".join(problems)))
+
+
+def main(argv):
+    rounds = int(argv[1]) if len(argv) > 1 else 5
+    moves = int(argv[2]) if len(argv) > 2 else 10000
+    filler = int(argv[3]) if len(argv) > 3 else 0
+    rng = random.Random(49)
+    doc = fixture.make_document(filler=filler)
+    failures = []
+
+    migration_checks(failures)
+    print("{} rounds of {} scramble clicks, {} filler elements\n".format(rounds, SCRAMBLE_CLICKS, filler))
+    recorder = Recorder()
+    # The first round loads the solver tables; it is left out of the report.
+    run_round(doc, Recorder(), rng, failures)
+    for _ in range(rounds):
+        run_round(doc, recorder, rng, failures)
+    recorder.report()
+
+    if moves:
+        soak(doc, moves, rng, failures)
+
+    if failures:
+        print("\n{} failures:".format(len(failures)))
+        for line in failures:
+            print("  " + line)
+        return 1
+    print("\nall checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
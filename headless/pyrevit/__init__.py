@@ -0,0 +1,10 @@
+"""Stand-in for the pyRevit modules the extension scripts import."""
+from Autodesk.Revit.UI import UIApplication as _UIApplication
+
+
+class _HostApplication(object):
+    def __init__(self):
+        self.uiapp = _UIApplication()
+
+
+HOST_APP = _HostApplication()
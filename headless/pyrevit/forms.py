@@ -0,0 +1,25 @@
+"""Stand-in for pyrevit.forms: alerts are recorded instead of shown."""
+
+ALERTS = []
+
+
+class ExitScript(SystemExit):
+    pass
+
+
+def alert(message, title="", exitscript=False, **kwargs):
+    ALERTS.append((title, message))
+    if exitscript:
+        raise ExitScript(message)
+    return True
+
+
+# Replies returned by ask_for_string, oldest first; None means cancelled.
+RESPONSES = []
+
+
+def ask_for_string(default=None, prompt=None, title=None, **kwargs):
+    ALERTS.append((title or "", prompt or ""))
+    if RESPONSES:
+        return RESPONSES.pop(0)
+    return default
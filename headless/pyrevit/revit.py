@@ -0,0 +1,41 @@
+"""Stand-in for pyrevit.revit: a module-level doc and the Transaction helper."""
+from Autodesk.Revit.DB import Transaction as _Transaction
+from Autodesk.Revit.DB import TransactionGroup as _TransactionGroup
+
+doc = None
+uidoc = None
+
+
+class Transaction(object):
+    def __init__(self, name="", doc=None, **kwargs):
+        self._transaction = _Transaction(doc or globals()["doc"], name)
+
+    def __enter__(self):
+        self._transaction.Start()
+        return self._transaction
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._transaction.Commit()
+        else:
+            self._transaction.RollBack()
+        return False
+
+
+class TransactionGroup(object):
+    def __init__(self, name="", doc=None, assimilate=True, **kwargs):
+        self._group = _TransactionGroup(doc or globals()["doc"], name)
+        self._assimilate = assimilate
+
+    def __enter__(self):
+        self._group.Start()
+        return self._group
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._group.RollBack()
+        elif self._assimilate:
+            self._group.Assimilate()
+        else:
+            self._group.Commit()
+        return False
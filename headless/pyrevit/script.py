@@ -0,0 +1,24 @@
+"""Stand-in for pyrevit.script."""
+import sys
+
+
+class _Output(object):
+    def __init__(self):
+        self.lines = []
+
+    def print_md(self, text):
+        self.lines.append(text)
+
+    def close(self):
+        pass
+
+
+_OUTPUT = _Output()
+
+
+def get_output():
+    return _OUTPUT
+
+
+def exit():
+    sys.exit(0)